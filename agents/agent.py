@@ -1,4 +1,6 @@
 class Agent:
+    __slots__ = ("id", "x", "y")
+
     def __init__(self, id_, x, y):
         self.id = id_
         self.x = x
@@ -1,8 +1,24 @@
 from .agent import Agent
 
 class Casualty(Agent):
-    def __init__(self, x, y):
-        super().__init__(id_=0, x=x, y=y)
+    __slots__ = ("found_time", "found_by", "rescued_time", "rescued_by")
+
+    def __init__(self, x, y, id_=0):
+        super().__init__(id_=id_, x=x, y=y)
+
+        # Filled in by Simulation
+        self.found_time = None
+        self.found_by = None
+        self.rescued_time = None
+        self.rescued_by = None
+
+    @property
+    def found(self):
+        return self.found_time is not None
+
+    @property
+    def rescued(self):
+        return self.rescued_time is not None
 
     def step(self, env):
-        pass  
+        pass
@@ -1,16 +1,36 @@
 from .agent import Agent
-import random
+from core.coverage import coverage_plan
 
 DRONE_VISION_RADIUS = 5
+DRONE_MOVES_PER_STEP = 2
+
+# random: uniform random walk; coverage: follow a precomputed sweep
+DRONE_MODES = ("random", "coverage")
 
 
 class Drone(Agent):
-    def __init__(self, id_, x, y, vision_radius: int = DRONE_VISION_RADIUS):
+    __slots__ = ("vision_radius", "mode", "has_found", "steps_taken",
+                 "plan", "plan_index", "plan_dir", "joining", "metrics", "rng")
+
+    def __init__(self, id_, x, y, vision_radius: int = DRONE_VISION_RADIUS, mode="random"):
         super().__init__(id_, x, y)
+        if mode not in DRONE_MODES:
+            raise ValueError(f"Unknown drone mode: {mode!r}")
         self.vision_radius = vision_radius
+        self.mode = mode
         self.has_found = False
         self.steps_taken = 0
 
+        # Coverage state: plan, position on it, sweep direction and join cell
+        self.plan = None
+        self.plan_index = 0
+        self.plan_dir = 1
+        self.joining = None
+
+        # Run metrics and random stream (set later by Simulation)
+        self.metrics = None
+        self.rng = None
+
     def neighbours(self, env):
         moves = [
             (self.x + 1, self.y),
@@ -28,16 +48,54 @@ class Drone(Agent):
     def step(self, env):
         if self.has_found:
             return
-        for _ in range(2):
+        if self.mode == "coverage":
+            self._follow_plan(env)
+            return
+        for _ in range(DRONE_MOVES_PER_STEP):
             options = self.neighbours(env)
             if not options:
                 return
-            self.x, self.y = random.choice(options)
+            self.x, self.y = self.rng.choice(options)
             self.steps_taken += 1
+            if self.metrics is not None:
+                self.metrics.drone_move(self)
 
-    def detect_casualty(self, casualty):
-        dist = abs(self.x - casualty.x) + abs(self.y - casualty.y)
-        if dist <= self.vision_radius:
-            self.has_found = True
-            return True
-        return False
+    # COVERAGE MODE
+    def retask(self, env):
+        """Rejoin the sweep at the plan cell nearest to the current position."""
+        # Detection only happens between ticks, so along a lane the drone is
+        # sampled every DRONE_MOVES_PER_STEP cells; narrow the lanes to match
+        radius = max(0, self.vision_radius - DRONE_MOVES_PER_STEP // 2)
+        self.plan = coverage_plan(env.width, env.height, radius)
+        self.plan_index = self.plan.nearest(self.x, self.y)
+        self.joining = self.plan.cell(self.plan_index)
+
+    def _follow_plan(self, env):
+        if self.plan is None or (self.plan.width, self.plan.height) != (env.width, env.height):
+            self.retask(env)
+        plan = self.plan
+
+        for _ in range(DRONE_MOVES_PER_STEP):
+            if self.joining == self.pos:
+                self.joining = None
+
+            if self.joining is not None:
+                # Fly straight to the join cell, x first
+                jx, jy = self.joining
+                if self.x != jx:
+                    self.x += 1 if jx > self.x else -1
+                else:
+                    self.y += 1 if jy > self.y else -1
+            else:
+                # Sweep back and forth along the plan
+                nxt = self.plan_index + self.plan_dir
+                if not 0 <= nxt < len(plan):
+                    self.plan_dir = -self.plan_dir
+                    nxt = self.plan_index + self.plan_dir
+                if not 0 <= nxt < len(plan):
+                    return
+                self.plan_index = nxt
+                self.x, self.y = plan.cell(nxt)
+            self.steps_taken += 1
+            if self.metrics is not None:
+                self.metrics.drone_move(self)
@@ -1,8 +1,13 @@
-import random
 from .agent import Agent
+from core.navigation import distance_field
+from core.visits import VisitCounts, frontier_options
 
 
 class Searcher(Agent):
+    __slots__ = ("vision_radius", "has_found", "at_casualty", "arrival_time", "steps_taken",
+                 "visit_count", "last_pos", "shared_visit_count", "metrics", "rng", "mode",
+                 "target")
+
     def __init__(self, id_, x, y, vision_radius=0):
         super().__init__(id_, x, y)
 
@@ -13,18 +18,24 @@ class Searcher(Agent):
         self.arrival_time = None
         self.steps_taken = 0
 
-        # Local memory
-        self.visited = {self.pos}
-        self.visit_count = {self.pos: 1}
+        # Local memory: compact per-cell counts, only where this searcher has been
+        self.visit_count = VisitCounts([self.pos])
         self.last_pos = None
 
-        # Shared memory (set later by Simulation)
+        # Shared memory, run metrics and random stream (set later by Simulation)
         self.shared_visit_count = None
+        self.metrics = None
+        self.rng = None
 
         # Modes
         self.mode = "search"     
         self.target = None       
 
+    @property
+    def visited(self):
+        """Cells this searcher has been on; supports ``in``, len and iteration."""
+        return self.visit_count
+
     # Neighbour cells
     def neighbours(self, env):
         candidates = [
@@ -40,57 +51,42 @@ class Searcher(Agent):
         if self.at_casualty:
             return
 
+        # One stream value per step, read even when unused; a second only to
+        # avoid stepping back
+        rng = self.rng
      
-        # RESCUE MODE: move toward the known casualty location
+        # RESCUE MODE: follow the shared shortest-path field to the casualty
         if self.mode == "rescue" and self.target:
-            tx, ty = self.target
-
-            dx = tx - self.x
-            dy = ty - self.y
-
-            move_x = 1 if dx > 0 else -1 if dx < 0 else 0
-            move_y = 1 if dy > 0 else -1 if dy < 0 else 0
-
-            new_x = self.x + move_x
-            new_y = self.y + move_y
-
-            if env.is_free(new_x, new_y):
-                self._apply_move(new_x, new_y)
+            step = distance_field(env, self.target).next_cell(self.x, self.y)
+            if step is not None:
+                rng.next()
+                self._apply_move(*step)
                 return
 
-            # fallback
+            # fallback: casualty unreachable from here
             options = self.neighbours(env)
             if options:
-                new_x, new_y = random.choice(options)
+                new_x, new_y = rng.choice(options)
                 self._apply_move(new_x, new_y)
+            else:
+                rng.next()
             return
 
        
         # SEARCH MODE: cooperative frontier-based exploration
         options = self.neighbours(env)
         if not options:
+            rng.next()
             return
 
-        # Initialise shared counters
-        for pos in options:
-            if pos not in self.shared_visit_count:
-                self.shared_visit_count[pos] = 0
-
-        # Prefer unvisited cells globally
-        unvisited = [pos for pos in options if self.shared_visit_count[pos] == 0]
-
-        if unvisited:
-            chosen = random.choice(unvisited)
-        else:
-            # Take the least globally visited option
-            min_visits = min(self.shared_visit_count[pos] for pos in options)
-            best_options = [pos for pos in options if self.shared_visit_count[pos] == min_visits]
-            chosen = random.choice(best_options)
+        # Prefer unvisited cells globally, else head for the nearest frontier
+        counts = [self.shared_visit_count[pos] for pos in options]
+        chosen = rng.choice(frontier_options(options, counts, self.pos, self.shared_visit_count))
 
         # Avoid oscillating back and forth
         if self.last_pos and chosen == self.last_pos and len(options) > 1:
             alternatives = [p for p in options if p != self.last_pos]
-            chosen = random.choice(alternatives)
+            chosen = rng.choice(alternatives)
 
         new_x, new_y = chosen
         self._apply_move(new_x, new_y)
@@ -104,19 +100,10 @@ class Searcher(Agent):
         self.steps_taken += 1
 
         # Local memory
-        self.visited.add(self.pos)
-        self.visit_count[self.pos] = self.visit_count.get(self.pos, 0) + 1
+        own = self.visit_count.add(new_x, new_y)
 
         # Shared memory
-        self.shared_visit_count[self.pos] = self.shared_visit_count.get(self.pos, 0) + 1
+        shared = self.shared_visit_count.visit(new_x, new_y)
 
-   
-    # Detect casualty
-    def detect_casualty(self, casualty, t):
-        if (self.x, self.y) == (casualty.x, casualty.y):
-            if not self.at_casualty:
-                self.at_casualty = True
-                self.arrival_time = t
-                self.has_found = True
-            return True
-        return False
+        if self.metrics is not None:
+            self.metrics.searcher_move(shared, own)
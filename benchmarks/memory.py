@@ -0,0 +1,96 @@
+"""Memory footprint of a large headless episode.
+
+Runs a search phase and reports the bytes held by each part of the
+simulation state, counted from the live objects, plus the peak RSS of the
+process. The default is 10k searchers on a 2000x2000 grid.
+
+    python -m benchmarks.memory
+    python -m benchmarks.memory --searchers 100 --width 200 --height 200 --steps 2000
+"""
+import argparse
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from core.simulation import Simulation
+
+
+def _nbytes(*arrays):
+    # Arrays allocated on first use are None until then
+    return sum(a.nbytes for a in arrays if a is not None)
+
+
+def searcher_bytes(s):
+    memory = s.visit_count
+    size = sys.getsizeof(s) + sys.getsizeof(memory) + sys.getsizeof(memory.tiles)
+    for key, tile in memory.tiles.items():
+        size += sys.getsizeof(key) + sys.getsizeof(tile)
+    return size
+
+
+def footprint(sim):
+    """Bytes per part of the simulation state."""
+    visits = sim.shared_visit_count
+    parts = {
+        "environment": _nbytes(sim.env.blocked),
+        "shared visit map": _nbytes(visits.counts, visits.frontier, visits.block_frontier),
+        "run metrics": _nbytes(sim.metrics.sensed_cells, sim.metrics.series.steps,
+                               sim.metrics.series.values),
+    }
+    if sim.swarm is not None:
+        engine = sim.swarm
+        parts["swarm arrays"] = _nbytes(engine.x, engine.y, engine.last_x, engine.last_y,
+                                        engine.mode, engine.steps, engine.at_casualty,
+                                        engine.arrival_time, engine.has_found,
+                                        engine.target_x, engine.target_y, engine.free,
+                                        engine._lowest, engine._landed)
+    else:
+        parts["searchers"] = sum(searcher_bytes(s) for s in sim.searchers)
+    return parts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the memory of a large episode.")
+    parser.add_argument("--width", type=int, default=2000)
+    parser.add_argument("--height", type=int, default=2000)
+    parser.add_argument("--searchers", type=int, default=10000)
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--engine", default="objects", choices=("objects", "swarm"))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    sim = Simulation(step_clock=True, num_searchers=args.searchers, engine=args.engine,
+                     width=args.width, height=args.height, seed=args.seed)
+    sim.start()
+    # Park the casualty off the map so the whole run is search phase
+    sim.move_casualty(sim.casualty, -10 ** 6, -10 ** 6)
+
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        sim.update()
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.searchers} searchers on {args.width}x{args.height}, {args.engine} engine, "
+          f"{args.steps} steps ({1000 * elapsed / max(1, args.steps):.1f} ms/step)")
+    parts = footprint(sim)
+    for name, size in parts.items():
+        print(f"  {name:<18} {size / 2 ** 20:9.1f} MB")
+    total = sum(parts.values())
+    print(f"  {'total':<18} {total / 2 ** 20:9.1f} MB, {total / max(1, args.searchers):.0f} B/searcher")
+
+    if args.engine == "objects":
+        cells = sum(len(s.visit_count) for s in sim.searchers)
+        print(f"  searcher memory: {cells} cells remembered, "
+              f"{parts['searchers'] / max(1, cells):.1f} B/cell")
+
+    # ru_maxrss is in KiB on Linux
+    if resource is not None:
+        print(f"  peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""Performance benchmarks for the simulation hot paths.
+
+Measures calls per second and peak traced memory for Simulation.update
+(object and swarm engines, and the swarm split into tiles on large maps),
+Searcher.step, Drone.step (random and coverage), Environment.is_free,
+Simulation.fork, an obstacle toggle with rescue-route repair and an
+offscreen Renderer.draw (plain and with the heatmap overlay). Each runs over
+a sweep of grid sizes and agent counts. An agent's pick from its own random
+stream is timed next to random.choice. Results are compared against a JSON
+baseline per profile, and the exit status is non-zero when any case
+regresses beyond the tolerance or has no baseline entry.
+
+Speeds are compared relative to the ``CALIBRATION`` case, which runs every
+time: the baseline is scaled by how fast this machine runs it now against
+when the baseline was recorded, so a baseline from one machine holds on
+another. Saving with ``--only`` updates those cases, rescaled to the
+baseline's calibration, and keeps the rest of the baseline.
+
+    python -m benchmarks.run --profile quick            # compare to baseline
+    python -m benchmarks.run --profile full --save      # record a new baseline
+    python -m benchmarks.run --only fork/ --save        # record the fork cases
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from core.environment import Environment
+from core.navigation import distance_field
+from core.rng import SEARCHER, AgentStream
+from core.simulation import Simulation
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+PROFILES = {
+    "quick": {
+        "grids": [(25, 18), (200, 200)],
+        "agents": [3, 100],
+    },
+    "full": {
+        "grids": [(25, 18), (100, 100), (500, 500), (2000, 2000)],
+        "agents": [3, 100, 1000, 10000],
+    },
+}
+
+MIN_TIME = 0.5
+MAX_CALLS = 2000
+MEMORY_CALLS = 5
+IS_FREE_BATCH = 1000
+CHOICE_BATCH = 1000
+FORK_WARMUP_STEPS = 20
+
+# Run with every selection; the other speeds are compared relative to it
+CALIBRATION = "choice/random"
+
+# Worker processes for the tiled swarm, and the smallest map worth splitting
+BENCH_TILES = 4
+TILED_MIN_CELLS = 500 * 500
+
+
+# CASE SETUP: each returns (callable, operations per call)
+def _sim(width, height, agents, engine, drone_mode="random", tiles=1):
+    sim = Simulation(step_clock=True, num_searchers=agents, engine=engine,
+                     width=width, height=height, drone_mode=drone_mode, tiles=tiles, seed=0)
+    sim.start()
+
+    # Park the casualty off the map so every call measures the search phase
+    # instead of an episode that has already finished
+    sim.move_casualty(sim.casualty, -10 ** 6, -10 ** 6)
+    return sim
+
+
+def setup_update(width, height, agents, engine, tiles=1):
+    sim = _sim(width, height, agents, engine, tiles=tiles)
+    return sim.update, 1
+
+
+def setup_searcher_step(width, height, agents):
+    sim = _sim(width, height, agents, "objects")
+    env = sim.env
+    searchers = sim.searchers
+
+    def step():
+        for s in searchers:
+            s.step(env)
+    return step, len(searchers)
+
+
+def setup_drone_step(width, height, mode="random"):
+    sim = _sim(width, height, 1, "objects", mode)
+    return (lambda: sim.drone.step(sim.env)), 1
+
+
+def setup_is_free(width, height):
+    random.seed(0)
+    env = Environment(width, height, seed=0)
+    cells = [(random.randint(-1, width), random.randint(-1, height)) for _ in range(IS_FREE_BATCH)]
+    is_free = env.is_free
+
+    def probe():
+        for x, y in cells:
+            is_free(x, y)
+    return probe, IS_FREE_BATCH
+
+
+def setup_choice(source):
+    # One of four neighbours, from an agent's own stream or the global RNG
+    options = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+    if source == "stream":
+        choose = AgentStream(0, SEARCHER, 1).choice
+    else:
+        random.seed(0)
+        choose = random.choice
+
+    def pick_many():
+        for _ in range(CHOICE_BATCH):
+            choose(options)
+    return pick_many, CHOICE_BATCH
+
+
+def setup_fork(width, height, agents, engine):
+    sim = _sim(width, height, agents, engine)
+    for _ in range(FORK_WARMUP_STEPS):
+        sim.update()
+    return sim.fork, 1
+
+
+def setup_obstacle_toggle(width, height):
+    random.seed(0)
+    env = Environment(width, height, seed=0)
+    target = (width // 2, height // 2)
+    env.remove_obstacles([target[0]], [target[1]])
+    distance_field(env, target)
+    cells = [(random.randrange(width), random.randrange(height)) for _ in range(64)]
+    cells = [c for c in cells if c != target]
+    calls = iter(range(10 ** 9))
+
+    def toggle():
+        # Alternately block and clear a cell, then bring the route up to date
+        i = next(calls)
+        x, y = cells[(i // 2) % len(cells)]
+        env.set_blocked([x], [y], not env.blocked[x, y])
+        distance_field(env, target)
+    return toggle, 1
+
+
+def setup_draw(width, height, agents, heatmap=False):
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    import pygame
+    from core.constants import WINDOW_WIDTH, WINDOW_HEIGHT
+    from renderer.renderer import Renderer
+
+    pygame.init()
+    sim = _sim(width, height, agents, "objects")
+    renderer = Renderer(pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT)), sim)
+    if heatmap:
+        renderer.toggle_heatmap()
+
+    def frame():
+        sim.update()
+        renderer.draw()
+    return frame, 1
+
+
+def cases(profile):
+    grids = PROFILES[profile]["grids"]
+    agents = PROFILES[profile]["agents"]
+
+    yield "choice/stream", setup_choice, ("stream",)
+    yield "choice/random", setup_choice, ("random",)
+
+    for w, h in grids:
+        yield f"is_free/{w}x{h}", setup_is_free, (w, h)
+        yield f"drone_step/{w}x{h}", setup_drone_step, (w, h)
+        yield f"drone_step/coverage/{w}x{h}", setup_drone_step, (w, h, "coverage")
+        yield f"obstacle_toggle/{w}x{h}", setup_obstacle_toggle, (w, h)
+
+        for n in agents:
+            if n > w * h // 4:
+                continue
+            yield f"searcher_step/{w}x{h}/n{n}", setup_searcher_step, (w, h, n)
+            yield f"update/objects/{w}x{h}/n{n}", setup_update, (w, h, n, "objects")
+            yield f"update/swarm/{w}x{h}/n{n}", setup_update, (w, h, n, "swarm")
+            if w * h >= TILED_MIN_CELLS and n >= 1000:
+                yield (f"update/swarm-tiles{BENCH_TILES}/{w}x{h}/n{n}", setup_update,
+                       (w, h, n, "swarm", BENCH_TILES))
+            yield f"fork/objects/{w}x{h}/n{n}", setup_fork, (w, h, n, "objects")
+            yield f"fork/swarm/{w}x{h}/n{n}", setup_fork, (w, h, n, "swarm")
+
+    # The renderer draws a fixed-size window: frame time should not follow map size
+    for w, h in grids:
+        for n in agents:
+            if n <= 1000 and n <= w * h // 4:
+                yield f"draw/{w}x{h}/n{n}", setup_draw, (w, h, n)
+                yield f"draw/heatmap/{w}x{h}/n{n}", setup_draw, (w, h, n, True)
+
+
+# MEASUREMENT
+def measure(setup, args):
+    call, ops = setup(*args)
+    call()  # warm-up
+
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < MIN_TIME and calls < MAX_CALLS:
+        call()
+        calls += 1
+        elapsed = time.perf_counter() - start
+
+    # Separate pass for memory: tracing slows everything down
+    tracemalloc.start()
+    call, _ = setup(*args)
+    for _ in range(MEMORY_CALLS):
+        call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "ops_per_sec": calls * ops / elapsed,
+        "calls": calls,
+        "peak_mb": peak / 2 ** 20,
+    }
+
+
+def machine_speed(results, baseline):
+    """How fast this run did the calibration case, relative to the baseline."""
+    if CALIBRATION not in results or CALIBRATION not in baseline:
+        return 1.0
+    return results[CALIBRATION]["ops_per_sec"] / baseline[CALIBRATION]["ops_per_sec"]
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    speed = machine_speed(results, baseline)
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base is None:
+            regressions.append(f"{name}: no baseline")
+            continue
+        expected = base["ops_per_sec"] * speed
+        if r["ops_per_sec"] < expected * (1 - tolerance):
+            regressions.append(f"{name}: {r['ops_per_sec']:.0f} ops/s vs baseline {expected:.0f}"
+                               f" (scaled by {speed:.2f})")
+        if r["peak_mb"] > base["peak_mb"] * (1 + tolerance) + 0.5:
+            regressions.append(f"{name}: {r['peak_mb']:.1f} MB peak vs baseline {base['peak_mb']:.1f}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark simulation hot paths.")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--only", help="run cases whose name contains this text")
+    parser.add_argument("--save", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    parser.add_argument("--json", help="also write raw results here")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, setup, case_args in cases(args.profile):
+        if args.only and args.only not in name and name != CALIBRATION:
+            continue
+        r = measure(setup, case_args)
+        results[name] = r
+        print(f"{name:<40} {r['ops_per_sec']:>14,.0f} ops/s {r['peak_mb']:>9.1f} MB")
+
+    report = {
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    path = os.path.join(BASELINE_DIR, f"{args.profile}.json")
+    if args.save:
+        # With --only, the other cases keep their recorded results
+        if args.only and os.path.exists(path):
+            with open(path) as f:
+                old = json.load(f)["results"]
+            speed = machine_speed(results, old)
+            results = {name: {**r, "ops_per_sec": r["ops_per_sec"] / speed}
+                       for name, r in results.items()}
+            report["results"] = {**old, **results}
+            if CALIBRATION in old:
+                report["results"][CALIBRATION] = old[CALIBRATION]
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {path}")
+        return
+
+    if not os.path.exists(path):
+        print(f"No baseline at {path}; run with --save to create one")
+        return
+
+    with open(path) as f:
+        baseline = json.load(f)["results"]
+    print(f"\nMachine speed vs baseline ({CALIBRATION}): {machine_speed(results, baseline):.2f}")
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nNo regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
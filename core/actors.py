@@ -0,0 +1,191 @@
+"""Optional asyncio actor runtime for searchers and drones.
+
+With ``Simulation(comms="actors")`` every searcher and drone is an actor: a
+long-lived asyncio task woken once per tick with the batch of messages the
+bus delivered to it. Nobody writes rescue orders onto another agent. An
+agent that sees a casualty, or first hears of one, broadcasts the fact
+within its radio range, and every actor picks its own target from what it
+knows. Facts are re-announced every ``BEACON_INTERVAL`` ticks, so agents
+that were out of range catch up later.
+
+Actors in a group are woken in index order and do not await mid-tick, so a
+tick runs them in the same order as the plain loop and runs are
+reproducible.
+"""
+import asyncio
+
+from core.messaging import MessageBus
+
+COMM_RADIUS = 10
+DRONE_COMM_RADIUS = 25
+BEACON_INTERVAL = 10
+
+FOUND = "found"
+RESCUED = "rescued"
+
+
+class Actor:
+    def __init__(self, runtime, agent, radius):
+        self.runtime = runtime
+        self.agent = agent
+        self.radius = radius
+        self.wake = None
+        self.reset()
+
+    def reset(self):
+        # Casualty ids this agent knows were found / reached
+        self.found = set()
+        self.rescued = set()
+
+    # KNOWLEDGE
+    def learn(self, kind, cid):
+        known = self.rescued if kind == RESCUED else self.found
+        if cid in known:
+            return
+        known.add(cid)
+        self.found.add(cid)
+        # Relay anything new once, straight away
+        self.runtime.bus.broadcast(self.agent, kind, cid, self.radius, self.runtime.step)
+
+    def beacon(self):
+        bus, step = self.runtime.bus, self.runtime.step
+        for cid in sorted(self.found):
+            kind = RESCUED if cid in self.rescued else FOUND
+            bus.broadcast(self.agent, kind, cid, self.radius, step)
+
+    # TICK
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self.wake = loop.create_future()
+            batch = await self.wake
+            try:
+                self.act(batch)
+            except Exception as exc:
+                self.runtime.failed(exc)
+            else:
+                self.runtime.finished()
+
+    def act(self, batch):
+        runtime = self.runtime
+        if batch:
+            runtime.bus.handled(batch)
+            for msg in batch:
+                self.learn(msg.kind, msg.payload)
+        if self.found and (self.agent.id + runtime.step) % runtime.beacon_interval == 0:
+            self.beacon()
+        self.decide()
+        self.move()
+
+    def decide(self):
+        pass
+
+    def move(self):
+        self.agent.step(self.runtime.sim.env)
+
+
+class SearcherActor(Actor):
+    def view(self):
+        """(open casualties, unfound count) as far as this searcher knows."""
+        casualties = self.runtime.sim.casualties
+        open_cs = [casualties[i] for i in sorted(self.found - self.rescued)]
+        return open_cs, len(casualties) - len(self.found)
+
+    def decide(self):
+        s = self.agent
+        if s.at_casualty:
+            return
+
+        # Same rule as Simulation.rescue_targets, on local knowledge
+        open_cs, unfound = self.view()
+        if open_cs or unfound:
+            targets = open_cs
+        else:
+            casualties = self.runtime.sim.casualties
+            targets = [casualties[i] for i in sorted(self.found)]
+
+        if not targets:
+            s.mode = "search"
+            s.target = None
+        elif s.mode == "search" or s.target not in {c.pos for c in targets}:
+            s.mode = "rescue"
+            s.target = targets[self.runtime.sim._nearest([s.x], [s.y], targets)[0]].pos
+
+    def move(self):
+        if not self.agent.at_casualty:
+            self.agent.step(self.runtime.sim.env)
+
+
+class ActorRuntime:
+    def __init__(self, sim, comm_radius=COMM_RADIUS, drone_comm_radius=DRONE_COMM_RADIUS,
+                 beacon_interval=BEACON_INTERVAL):
+        self.sim = sim
+        self.beacon_interval = beacon_interval
+        self.bus = MessageBus(bucket=comm_radius)
+        self.step = 0
+        self.batches = {}
+
+        self.searchers = [SearcherActor(self, s, comm_radius) for s in sim.searchers]
+        self.drones = [Actor(self, d, drone_comm_radius) for d in sim.drones]
+        self.actors = {a.agent: a for a in self.searchers + self.drones}
+
+        self._left = 0
+        self._done = None
+        self.loop = asyncio.new_event_loop()
+        self._tasks = self.loop.run_until_complete(self._spawn())
+
+    async def _spawn(self):
+        tasks = [asyncio.ensure_future(a.run()) for a in self.actors.values()]
+        # Let every actor reach its first await
+        await asyncio.sleep(0)
+        return tasks
+
+    def reset(self):
+        self.bus.clear()
+        self.batches = {}
+        for a in self.actors.values():
+            a.reset()
+
+    def close(self):
+        if self.loop.is_closed():
+            return
+        for task in self._tasks:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*self._tasks, return_exceptions=True))
+        self.loop.close()
+
+    # TICKS
+    def deliver(self, step):
+        self.step = step
+        self.batches = self.bus.deliver(self.actors, step)
+
+    def tick(self, group):
+        """Wake every actor in ``group`` (a list of actors) once and wait for all."""
+        if group:
+            self.loop.run_until_complete(self._tick(group))
+
+    async def _tick(self, group):
+        self._left = len(group)
+        self._done = self.loop.create_future()
+        for actor in group:
+            actor.wake.set_result(self.batches.pop(actor.agent, ()))
+        await self._done
+
+    def finished(self):
+        self._left -= 1
+        if self._left == 0:
+            self._done.set_result(None)
+
+    def failed(self, exc):
+        if not self._done.done():
+            self._done.set_exception(exc)
+
+    # OBSERVATIONS (an agent seeing a casualty for itself)
+    def observe(self, agent, casualty):
+        actor = self.actors[agent]
+        actor.learn(FOUND, casualty.id)
+        if casualty.rescued:
+            actor.learn(RESCUED, casualty.id)
+
+    def view(self, searcher):
+        return self.actors[searcher].view()
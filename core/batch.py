@@ -0,0 +1,191 @@
+"""Headless Monte Carlo runner.
+
+Runs many seeded episodes without pygame, spread over a process pool, and
+aggregates the outcome of each one, including the final run metrics. Time
+is measured in simulation steps.
+
+    python -m core.batch --episodes 1000 --workers 8
+    python -m core.batch --episodes 100 --engine swarm --searchers 1000 --width 200 --height 200
+"""
+import argparse
+import json
+import os
+import math
+import statistics
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from agents.drone import DRONE_MODES
+from core.metrics import SERIES
+from core.simulation import COMMS_MODES, Simulation
+
+DEFAULT_MAX_STEPS = 5000
+
+
+# SINGLE EPISODE
+def run_episode(seed, max_steps=DEFAULT_MAX_STEPS, profile=False, series=False, **sim_kwargs):
+    sim = Simulation(step_clock=True, profile=profile, seed=seed, **sim_kwargs)
+    sim.start()
+    while not sim.finished and sim.step_count < max_steps:
+        sim.update()
+
+    result = {
+        "seed": seed,
+        "steps": sim.step_count,
+        "time_to_find": sim.time_to_find,
+        "found_by": sim.found_by,
+        "all_rescued_time": sim.all_rescued_time,
+        "found_times": [c.found_time for c in sim.casualties],
+        "rescued_times": [c.rescued_time for c in sim.casualties],
+        # NaN (not measured by this engine) becomes None, like a missing time
+        "metrics": {k: None if math.isnan(v) else v
+                    for k, v in sim.metrics.current(len(sim.env.free_cells)).items()},
+    }
+    if series:
+        steps, values = sim.metrics.series.arrays()
+        result["series"] = {"step": steps.tolist(), **{k: v.tolist() for k, v in values.items()}}
+    if profile:
+        result["profile"] = {**sim.profiler.totals, **sim.profiler.counters}
+    if sim.runtime is not None:
+        result["messages"] = sim.runtime.bus.stats()
+    sim.close()
+    return result
+
+
+# MANY EPISODES
+def run_batch(episodes, seed=0, max_steps=DEFAULT_MAX_STEPS, workers=None, profile=False,
+              series=False, **sim_kwargs):
+    seeds = range(seed, seed + episodes)
+    job = partial(run_episode, max_steps=max_steps, profile=profile, series=series,
+                  **sim_kwargs)
+
+    if workers == 1:
+        return [job(s) for s in seeds]
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, episodes // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(job, seeds, chunksize=chunksize))
+
+
+# AGGREGATION
+def _percentile(ordered, q):
+    if len(ordered) == 1:
+        return ordered[0]
+    pos = (len(ordered) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def distribution(values):
+    done = sorted(v for v in values if v is not None)
+    summary = {"count": len(done), "missing": len(values) - len(done)}
+    if not done:
+        return summary
+
+    summary.update(
+        mean=statistics.fmean(done),
+        stdev=statistics.pstdev(done),
+        min=done[0],
+        p10=_percentile(done, 0.10),
+        median=_percentile(done, 0.50),
+        p90=_percentile(done, 0.90),
+        max=done[-1],
+    )
+    return summary
+
+
+def aggregate(results):
+    found_by = Counter(r["found_by"] or "none" for r in results)
+    report = {
+        "episodes": len(results),
+        "time_to_find": distribution([r["time_to_find"] for r in results]),
+        "all_rescued_time": distribution([r["all_rescued_time"] for r in results]),
+        # Pooled over every casualty of every episode
+        "casualty_found_time": distribution([t for r in results for t in r["found_times"]]),
+        "casualty_rescued_time": distribution([t for r in results for t in r["rescued_times"]]),
+        "found_by": dict(found_by.most_common()),
+        # Run metrics at the end of each episode
+        "metrics": {name: distribution([r["metrics"][name] for r in results]) for name in SERIES},
+    }
+
+    # Phase seconds and hot-path counts summed over all episodes
+    profiles = [r["profile"] for r in results if "profile" in r]
+    if profiles:
+        report["profile"] = {k: sum(p[k] for p in profiles) for k in profiles[0]}
+    return report
+
+
+def format_report(report):
+    lines = [f"Episodes: {report['episodes']}"]
+
+    for name in ("time_to_find", "all_rescued_time", "casualty_found_time", "casualty_rescued_time"):
+        d = report[name]
+        line = f"{name}: n={d['count']} missing={d['missing']}"
+        if d["count"]:
+            line += (f" mean={d['mean']:.1f} sd={d['stdev']:.1f}"
+                     f" min={d['min']} p10={d['p10']:.1f} median={d['median']:.1f}"
+                     f" p90={d['p90']:.1f} max={d['max']}")
+        lines.append(line)
+
+    lines.append("metrics at episode end:")
+    for name, d in report["metrics"].items():
+        line = f"  {name:>21}: n={d['count']}"
+        if d["count"]:
+            line += f" mean={d['mean']:.3f} median={d['median']:.3f} p90={d['p90']:.3f}"
+        lines.append(line)
+
+    total = report["episodes"] or 1
+    lines.append("found_by:")
+    for who, n in report["found_by"].items():
+        lines.append(f"  {who:>6}: {n} ({100 * n / total:.1f}%)")
+
+    if "profile" in report:
+        lines.append("profile (summed over episodes):")
+        for name, value in report["profile"].items():
+            shown = f"{value:.3f}s" if isinstance(value, float) else f"{value}"
+            lines.append(f"  {name:>24}: {shown}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run headless search & rescue episodes.")
+    parser.add_argument("-n", "--episodes", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first episode")
+    parser.add_argument("--max-steps", type=int, default=DEFAULT_MAX_STEPS)
+    parser.add_argument("--workers", type=int, default=None, help="defaults to all cores")
+    parser.add_argument("--json", help="write per-episode results and the summary here")
+    parser.add_argument("--profile", action="store_true", help="time update phases per episode")
+    parser.add_argument("--series", action="store_true",
+                        help="keep each episode's metric time series in the --json output")
+    parser.add_argument("--width", type=int, default=None)
+    parser.add_argument("--height", type=int, default=None)
+    parser.add_argument("--engine", choices=("objects", "swarm"), default=None)
+    parser.add_argument("--searchers", type=int, default=None)
+    parser.add_argument("--casualties", type=int, default=None)
+    parser.add_argument("--drones", type=int, default=None)
+    parser.add_argument("--drone-mode", choices=DRONE_MODES, default=None)
+    parser.add_argument("--comms", choices=COMMS_MODES, default=None,
+                        help="actors: agents share what they know over a range-limited bus")
+    args = parser.parse_args(argv)
+
+    sim_kwargs = {f"num_{name}": getattr(args, name)
+                  for name in ("searchers", "casualties", "drones")
+                  if getattr(args, name) is not None}
+    for name in ("width", "height", "engine", "drone_mode", "comms"):
+        if getattr(args, name) is not None:
+            sim_kwargs[name] = getattr(args, name)
+    results = run_batch(args.episodes, args.seed, args.max_steps, args.workers, args.profile,
+                        args.series, **sim_kwargs)
+    report = aggregate(results)
+    print(format_report(report))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"summary": report, "episodes": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Boustrophedon coverage paths for drones.
+
+A plan sweeps the grid in horizontal lanes ``2 * radius + 1`` rows apart, so
+every cell comes within Manhattan distance ``radius`` of some lane cell.
+Consecutive plan cells are one orthogonal move apart. Drones fly over
+obstacles, so a plan depends only on the grid size and the radius and is
+computed once per combination.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+
+class CoveragePlan:
+    def __init__(self, width, height, radius):
+        self.width = width
+        self.height = height
+        self.radius = radius
+        self.xs, self.ys = self._sweep(width, height, radius)
+
+    @staticmethod
+    def _lanes(height, radius):
+        spacing = 2 * radius + 1
+        lanes = list(range(min(radius, height - 1), height, spacing))
+        # The last lane must still see the bottom row
+        if lanes[-1] + radius < height - 1:
+            lanes.append(height - 1)
+        return lanes
+
+    @classmethod
+    def _sweep(cls, width, height, radius):
+        across = np.arange(width)
+        xs, ys = [], []
+        for i, lane in enumerate(cls._lanes(height, radius)):
+            if i:
+                # Drop down from the previous lane at the current end column
+                prev = ys[-1][-1]
+                xs.append(np.full(lane - prev - 1, xs[-1][-1]))
+                ys.append(np.arange(prev + 1, lane))
+            xs.append(across if i % 2 == 0 else across[::-1])
+            ys.append(np.full(width, lane))
+        return np.concatenate(xs).astype(np.int32), np.concatenate(ys).astype(np.int32)
+
+    def __len__(self):
+        return self.xs.size
+
+    def cell(self, i):
+        return int(self.xs[i]), int(self.ys[i])
+
+    def nearest(self, x, y):
+        """Index of the plan cell closest to (x, y), for joining mid-sweep."""
+        return int(np.argmin(np.abs(self.xs - x) + np.abs(self.ys - y)))
+
+
+@lru_cache(maxsize=16)
+def coverage_plan(width, height, radius):
+    return CoveragePlan(width, height, radius)
@@ -0,0 +1,208 @@
+"""Spatial domain decomposition: one swarm stepped by several processes.
+
+The map is cut into ``tiles`` strips along x, each owned by a worker
+process. Searcher state, the padded free mask and the shared visit map,
+frontier index included, live in memory-mapped files that every process
+maps, so nothing is copied between them. At each step boundary every
+searcher is handed to the worker owning the strip it stands in. Workers
+read one column past their strip for neighbour counts, the ghost cells,
+straight from the shared arrays.
+
+Each tick the workers choose the first-round moves of their searchers and
+look up the nearest frontier cell for the saturated ones, the bulk of the
+work on a large, well-covered map. Everything that depends on index order
+stays with the simulation's process: the stream draws, the later rounds,
+the serial pass, frontier closing, metrics, rescue routes and detection.
+Runs therefore match SwarmEngine exactly for the same seed.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+import weakref
+
+import numpy as np
+
+from core.swarm import SEARCH, UNKNOWN, SwarmEngine, choose_search
+from core.visits import VisitMap
+
+# Per-mover arrays written every tick, and their shape past the first axis
+_TICK = (("movers", np.int64, ()), ("order", np.int64, ()), ("u", np.int64, (2,)),
+         ("new_x", np.int64, ()), ("new_y", np.int64, ()), ("moved", bool, ()),
+         ("saturated", bool, ()), ("back", bool, ()), ("hints", np.int64, ()))
+_VISITS = ("counts", "frontier", "block_frontier")
+
+WORKER_TIMEOUT = 10
+
+
+def _map(path, shape, dtype, mode):
+    # A file cannot map zero bytes; empty arrays map one element and slice it away
+    shape = tuple(np.atleast_1d(shape).tolist())
+    size = int(np.prod(shape))
+    array = np.memmap(path, dtype=dtype, mode=mode, shape=(max(1, size),))
+    return array[:size].reshape(shape).view(np.ndarray)
+
+
+class SharedArrays:
+    """NumPy arrays in memory-mapped files that worker processes map as well.
+
+    The files sit on a RAM-backed file system where there is one. They are
+    unlinked once every worker has mapped them, and the memory goes away
+    with the last mapping.
+    """
+
+    def __init__(self):
+        base = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        self.dir = tempfile.mkdtemp(prefix="swarm-tiles-", dir=base)
+        self.specs = {}
+
+    def new(self, name, shape, dtype):
+        path = os.path.join(self.dir, name)
+        self.specs[name] = (path, shape, np.dtype(dtype).str)
+        return _map(path, shape, dtype, "w+")
+
+    def copy(self, name, array):
+        out = self.new(name, array.shape, array.dtype)
+        out[...] = array
+        return out
+
+    def unlink(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+# WORKER PROCESS
+def _work(conn, specs, width, height, block):
+    a = {name: _map(path, shape, dtype, "r+") for name, (path, shape, dtype) in specs.items()}
+    visits = object.__new__(VisitMap)
+    visits.__dict__.update(width=width, height=height, block=block, _nearest=None,
+                           **{name: a[name] for name in _VISITS})
+    conn.send(True)
+
+    while True:
+        job = conn.recv()
+        if job is None:
+            return
+        try:
+            # The simulation's process has moved the frontier since the last job
+            visits._nearest = None
+            _choose_tile(a, visits, *job)
+        except Exception as exc:
+            conn.send(exc)
+        else:
+            conn.send(True)
+
+
+def _choose_tile(a, visits, lo, hi):
+    slots = a["order"][lo:hi]
+    idx = a["movers"][slots]
+    x, y = a["x"][idx], a["y"][idx]
+    new_x, new_y, moved, saturated, back = choose_search(
+        x, y, a["last_x"][idx], a["last_y"][idx], a["free"], a["counts"], a["u"][slots])
+    a["new_x"][slots] = new_x
+    a["new_y"][slots] = new_y
+    a["moved"][slots] = moved
+    a["saturated"][slots] = saturated
+    a["back"][slots] = back
+
+    # Saturated searchers will need the frontier; find it before anyone moves
+    hints = np.full(slots.size, UNKNOWN, dtype=np.int64)
+    searching = (a["mode"][idx] == SEARCH) | (a["target_x"][idx] < 0)
+    j = np.flatnonzero(saturated & searching)
+    hints[j] = visits.nearest_frontiers(x[j], y[j])
+    a["hints"][slots] = hints
+
+
+def _stop(conns, procs):
+    for conn in conns:
+        try:
+            conn.send(None)
+        except OSError:
+            pass
+    for p in procs:
+        p.join(WORKER_TIMEOUT)
+        if p.is_alive():
+            p.terminate()
+    for conn in conns:
+        conn.close()
+
+
+# COORDINATOR
+class TiledSwarmEngine(SwarmEngine):
+    def __init__(self, env, positions, ids=None, visits=None, seed=None, tiles=2):
+        if tiles < 1:
+            raise ValueError("tiles must be at least 1")
+        self.tiles = tiles
+        self._shared = SharedArrays()
+        try:
+            super().__init__(env, positions, ids, visits, seed)
+            for name in _VISITS:
+                setattr(self.visits, name, self._shared.copy(name, getattr(self.visits, name)))
+            self._tick = {name: self._shared.new(name, (self.n,) + shape, dtype)
+                          for name, dtype, shape in _TICK}
+
+            # Strip k holds the columns cuts[k - 1] <= x < cuts[k]
+            self._cuts = np.linspace(0, env.width, tiles + 1)[1:-1].astype(np.int64)
+            self._start(env)
+        finally:
+            self._shared.unlink()
+
+    def _array(self, name, shape, dtype):
+        return self._shared.new(name, shape, dtype)
+
+    def _start(self, env):
+        # Spawned rather than forked: the simulation may be running threads
+        ctx = multiprocessing.get_context("spawn")
+        conns, procs = [], []
+        self._finalizer = weakref.finalize(self, _stop, conns, procs)
+        for k in range(self.tiles):
+            parent, child = ctx.Pipe()
+            p = ctx.Process(target=_work, name=f"swarm-tile-{k}", daemon=True,
+                            args=(child, self._shared.specs, env.width, env.height,
+                                  self.visits.block))
+            p.start()
+            child.close()
+            conns.append(parent)
+            procs.append(p)
+        self._conns = conns
+        for conn in conns:
+            conn.recv()
+
+    def close(self):
+        """Stop the worker processes."""
+        self._finalizer()
+
+    # STEP
+    def _draw(self, movers):
+        u = self._tick["u"][:movers.size]
+        u[...] = super()._draw(movers)
+        return u
+
+    def _frontier(self, j, x, y):
+        # Looked up by the workers for searchers saturated at the start of the tick
+        hints = self._tick["hints"][j]
+        unknown = hints == UNKNOWN
+        if unknown.any():
+            hints[unknown] = super()._frontier(j[unknown], x, y)
+        return hints
+
+    def _choose(self, movers, x, y, u):
+        n = movers.size
+        tick = self._tick
+        tick["movers"][:n] = movers
+
+        # Hand every mover to the worker owning its strip
+        tile = np.searchsorted(self._cuts, x, side="right")
+        order = np.argsort(tile, kind="stable")
+        tick["order"][:n] = order
+        spans = np.searchsorted(tile[order], np.arange(self.tiles + 1)).tolist()
+        for k, conn in enumerate(self._conns):
+            conn.send((spans[k], spans[k + 1]))
+        for conn in self._conns:
+            reply = conn.recv()
+            if isinstance(reply, Exception):
+                raise reply
+
+        new_x, new_y, moved = tick["new_x"][:n], tick["new_y"][:n], tick["moved"][:n]
+        back = tick["back"][:n]
+        self._rescue(movers, x, y, u, new_x, new_y, moved, back)
+        return new_x, new_y, moved, tick["saturated"][:n], back
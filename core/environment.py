@@ -1,39 +1,137 @@
-import random
+from collections import deque
 from dataclasses import dataclass
 
+import numpy as np
+
+from core.freecells import FreeCells
+from core.rng import ENVIRONMENT, episode_seed, generator
+
+OBSTACLE_RATIO = 0.08
+
+# Obstacle changes kept for incremental consumers; older ones force a rebuild
+CHANGE_LOG_SIZE = 1024
+
 @dataclass
 class Cell:
     x: int
     y: int
 
 class Environment:
-    def __init__(self, width, height, obstacle_ratio=0.08):
+    def __init__(self, width, height, obstacle_ratio=OBSTACLE_RATIO, seed=None):
         self.width = width
         self.height = height
-        self.obstacles = self._generate_obstacles(obstacle_ratio)
+
+        # Episode stream for the map and random free cells
+        self.seed = episode_seed(seed)
+        self.rng = generator(self.seed, ENVIRONMENT)
+
+        # Occupancy grid indexed as blocked[x, y]; True means obstacle
+        self.blocked = self._generate_obstacles(obstacle_ratio)
+
+        # Bumped whenever obstacles change; the log lets derived caches catch up
+        self.version = 0
+        self._changes = deque(maxlen=CHANGE_LOG_SIZE)
+        self._free_cells = None
+
+        # List view for the renderer, built on first use
+        self._obstacles = None
+
+    @classmethod
+    def from_blocked(cls, blocked, seed=0):
+        """Environment over an existing occupancy grid, e.g. one read from a trace."""
+        env = cls.__new__(cls)
+        env.width, env.height = blocked.shape
+        env.seed = episode_seed(seed)
+        env.rng = generator(env.seed, ENVIRONMENT)
+        env.blocked = np.array(blocked, dtype=bool)
+        env.version = 0
+        env._changes = deque(maxlen=CHANGE_LOG_SIZE)
+        env._free_cells = None
+        env._obstacles = None
+        return env
+
+    def copy(self):
+        """Independent copy with the same version and change log."""
+        env = Environment.from_blocked(self.blocked, self.seed)
+        env.version = self.version
+        env._changes = self._changes.copy()
+        return env
+
+    # DYNAMIC OBSTACLES
+    def add_obstacles(self, xs, ys):
+        return self.set_blocked(xs, ys, True)
+
+    def remove_obstacles(self, xs, ys):
+        return self.set_blocked(xs, ys, False)
+
+    def set_blocked(self, xs, ys, value):
+        """Block or clear cells; returns the (xs, ys) that actually changed."""
+        xs = np.asarray(xs, dtype=np.int64).ravel()
+        ys = np.asarray(ys, dtype=np.int64).ravel()
+        if ((xs < 0) | (xs >= self.width) | (ys < 0) | (ys >= self.height)).any():
+            raise ValueError("Obstacle cells must lie on the map")
+
+        flat = np.unique(xs * self.height + ys)
+        xs, ys = flat // self.height, flat % self.height
+        changed = self.blocked[xs, ys] != value
+        xs, ys = xs[changed], ys[changed]
+        if xs.size:
+            self.blocked[xs, ys] = value
+            self.version += 1
+            self._changes.append((xs, ys))
+            self._obstacles = None
+            if self._free_cells is not None:
+                if value:
+                    self._free_cells.remove(xs, ys)
+                else:
+                    self._free_cells.add(xs, ys)
+        return xs, ys
+
+    def changes_since(self, version):
+        """(xs, ys) of every cell changed after ``version``, or None when no longer logged.
+
+        A cell may appear more than once; its current state is in ``blocked``.
+        """
+        missing = self.version - version
+        if missing == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        if missing < 0 or missing > len(self._changes):
+            return None
+        recent = list(self._changes)[-missing:]
+        return np.concatenate([c[0] for c in recent]), np.concatenate([c[1] for c in recent])
 
     def _generate_obstacles(self, ratio):
-        obstacles = []
         total = self.width * self.height
         count = int(total * ratio)
 
-        while len(obstacles) < count:
-            x = random.randint(0, self.width - 1)
-            y = random.randint(0, self.height - 1)
-            if (x, y) not in obstacles:
-                obstacles.append((x, y))
-        return obstacles
+        # Draw distinct flat indices in one go
+        flat = self.rng.choice(total, size=count, replace=False)
+
+        blocked = np.zeros((self.width, self.height), dtype=bool)
+        blocked[flat // self.height, flat % self.height] = True
+        return blocked
+
+    @property
+    def obstacles(self):
+        if self._obstacles is None:
+            xs, ys = np.nonzero(self.blocked)
+            self._obstacles = list(zip(xs.tolist(), ys.tolist()))
+        return self._obstacles
+
+    @property
+    def free_cells(self):
+        """Index of the free cells, built on first use and kept up to date."""
+        if self._free_cells is None:
+            self._free_cells = FreeCells(self.blocked)
+        return self._free_cells
 
     def is_free(self, x, y):
         if x < 0 or x >= self.width:
             return False
         if y < 0 or y >= self.height:
             return False
-        return (x, y) not in self.obstacles
+        return not self.blocked[x, y]
 
     def random_free_cell(self):
-        while True:
-            x = random.randint(0, self.width - 1)
-            y = random.randint(0, self.height - 1)
-            if self.is_free(x, y):
-                return Cell(x, y)
+        return Cell(*self.free_cells.random(self.rng))
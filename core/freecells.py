@@ -0,0 +1,126 @@
+"""Index of the free cells of a grid, for uniform sampling and placement.
+
+The free cells are kept as a packed array of flat indices ``x * height + y``
+together with each cell's slot in that array. Drawing a uniform free cell
+is one random slot, and blocking or clearing a cell moves at most one other
+entry, so the index follows obstacle edits in time proportional to the edit.
+
+``sample`` draws distinct cells under placement constraints: an exclusion
+mask and a Manhattan distance band around a point. A band that is small
+next to the map is sampled from the cells inside it directly. Otherwise
+candidates are drawn from the index in growing batches and filtered, which
+ends after at most one pass over all free cells, however few of them
+qualify.
+"""
+import numpy as np
+
+# First batch of candidates per requested cell when rejecting
+OVERSAMPLE = 2
+GROWTH = 4
+
+
+class FreeCells:
+    def __init__(self, blocked):
+        self.height = blocked.shape[1]
+        free = np.flatnonzero(~blocked)
+        # Eight bytes per cell for both arrays while flat indices fit in int32
+        dtype = np.int32 if blocked.size < 2 ** 31 else np.int64
+        self.cells = np.empty(blocked.size, dtype=dtype)
+        self.cells[:free.size] = free
+        self.size = free.size
+        self.slot = np.full(blocked.size, -1, dtype=dtype)
+        self.slot[free] = np.arange(free.size)
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, pos):
+        x, y = pos
+        return self.slot[x * self.height + y] >= 0
+
+    # EDITS
+    def add(self, xs, ys):
+        flat = np.unique(np.asarray(xs, dtype=np.int64) * self.height + ys)
+        flat = flat[self.slot[flat] < 0]
+        end = self.size + flat.size
+        self.cells[self.size:end] = flat
+        self.slot[flat] = np.arange(self.size, end)
+        self.size = end
+
+    def remove(self, xs, ys):
+        flat = np.unique(np.asarray(xs, dtype=np.int64) * self.height + ys)
+        flat = flat[self.slot[flat] >= 0]
+        end = self.size - flat.size
+
+        # Fill the holes left below the new end with the survivors above it
+        holes = self.slot[flat]
+        holes = np.sort(holes[holes < end])
+        tail = self.cells[end:self.size]
+        movers = tail[~np.isin(tail, flat)]
+        self.cells[holes] = movers
+        self.slot[movers] = holes
+        self.slot[flat] = -1
+        self.size = end
+
+    # SAMPLING
+    def random(self, rng):
+        """One uniform free (x, y), drawn from the NumPy Generator ``rng``."""
+        if not self.size:
+            raise ValueError("No free cells")
+        return divmod(int(self.cells[rng.integers(self.size)]), self.height)
+
+    def sample(self, k, rng, exclude=None, center=None, min_dist=0, max_dist=None):
+        """``k`` distinct free cells, uniform among those meeting the constraints.
+
+        ``exclude`` is a boolean (width, height) mask of cells to skip and
+        ``center``, ``min_dist`` and ``max_dist`` bound the Manhattan distance
+        to a point. Returns (xs, ys) arrays; raises ValueError when fewer than
+        ``k`` cells qualify.
+        """
+        # A band whose square holds fewer cells than the index is scanned directly
+        if max_dist is not None and center is not None and (2 * max_dist + 1) ** 2 <= self.size:
+            flat = self._band(exclude, center, min_dist, max_dist)
+            if flat.size < k:
+                raise ValueError(f"Only {flat.size} free cells meet the constraints, {k} needed")
+            flat = flat[rng.choice(flat.size, size=k, replace=False)]
+            return flat // self.height, flat % self.height
+
+        n = self.size
+        m = min(n, OVERSAMPLE * k)
+        while True:
+            # A fresh uniform order each round, so the first k kept are uniform too
+            flat = self.cells[rng.choice(n, size=m, replace=False)]
+            flat = flat[self._accept(flat, exclude, center, min_dist, max_dist)]
+            if flat.size >= k or m == n:
+                break
+            m = min(n, m * GROWTH)
+        if flat.size < k:
+            raise ValueError(f"Only {flat.size} free cells meet the constraints, {k} needed")
+        flat = flat[:k]
+        return flat // self.height, flat % self.height
+
+    def _accept(self, flat, exclude, center, min_dist, max_dist):
+        xs, ys = flat // self.height, flat % self.height
+        keep = np.ones(flat.size, dtype=bool)
+        if exclude is not None:
+            keep &= ~exclude[xs, ys]
+        if center is not None:
+            dist = np.abs(xs - center[0]) + np.abs(ys - center[1])
+            keep &= dist >= min_dist
+            if max_dist is not None:
+                keep &= dist <= max_dist
+        return keep
+
+    def _band(self, exclude, center, min_dist, max_dist):
+        # Only the square around the band is scanned
+        width = self.slot.size // self.height
+        cx, cy = center
+        x0, x1 = max(0, cx - max_dist), min(width, cx + max_dist + 1)
+        y0, y1 = max(0, cy - max_dist), min(self.height, cy + max_dist + 1)
+        if x1 <= x0 or y1 <= y0:
+            return np.zeros(0, dtype=np.int64)
+        xs = np.arange(x0, x1)[:, None]
+        ys = np.arange(y0, y1)[None, :]
+        flat = (xs * self.height + ys).ravel()
+        flat = flat[self.slot[flat] >= 0]
+        return flat[self._accept(flat, exclude, center, min_dist, max_dist)]
@@ -0,0 +1,86 @@
+"""Per-tick message bus with range-limited broadcast.
+
+Messages sent during a tick are held in an outbox and delivered together at
+the start of the next one, as one batch per recipient. A broadcast reaches
+every agent within its Manhattan radius. Recipients come from a spatial hash
+of agent positions, built only on ticks that have something to deliver.
+"""
+import time
+from collections import Counter
+
+from core.spatial import SpatialHash
+
+
+class Message:
+    __slots__ = ("sender", "kind", "payload", "x", "y", "radius", "step", "sent_at")
+
+    def __init__(self, sender, kind, payload, x, y, radius, step):
+        # sender is the agent object: ids of searchers and drones may overlap
+        self.sender = sender
+        self.kind = kind
+        self.payload = payload
+        self.x = x
+        self.y = y
+        self.radius = radius
+        self.step = step
+        self.sent_at = time.perf_counter()
+
+
+class MessageBus:
+    def __init__(self, bucket=8):
+        self.bucket = bucket
+        self.clear()
+
+    def clear(self):
+        self.outbox = []
+        self.sent = Counter()
+        self.delivered = 0
+        self.batches = 0
+        self.latency_ticks = 0
+        self.latency_seconds = 0.0
+        self.max_latency_seconds = 0.0
+
+    def broadcast(self, sender, kind, payload, radius, step):
+        self.outbox.append(Message(sender, kind, payload, sender.x, sender.y, radius, step))
+        self.sent[kind] += 1
+
+    def deliver(self, agents, step):
+        """Batches for this tick as {agent: [Message, ...]}; empties the outbox."""
+        if not self.outbox:
+            return {}
+
+        index = SpatialHash(self.bucket)
+        for agent in agents:
+            index.insert(agent, agent.x, agent.y)
+
+        batches = {}
+        for msg in self.outbox:
+            for agent in index.within(msg.x, msg.y, msg.radius):
+                if agent is not msg.sender:
+                    batches.setdefault(agent, []).append(msg)
+                    self.delivered += 1
+                    self.latency_ticks += step - msg.step
+        self.outbox = []
+        self.batches += len(batches)
+        return batches
+
+    def handled(self, batch):
+        # Wall time from send to the recipient acting on it
+        now = time.perf_counter()
+        for msg in batch:
+            dt = now - msg.sent_at
+            self.latency_seconds += dt
+            if dt > self.max_latency_seconds:
+                self.max_latency_seconds = dt
+
+    def stats(self):
+        n = self.delivered or 1
+        return {
+            "sent": sum(self.sent.values()),
+            "sent_by_kind": dict(self.sent),
+            "delivered": self.delivered,
+            "batches": self.batches,
+            "mean_latency_ticks": self.latency_ticks / n,
+            "mean_latency_ms": 1000 * self.latency_seconds / n,
+            "max_latency_ms": 1000 * self.max_latency_seconds,
+        }
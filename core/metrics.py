@@ -0,0 +1,204 @@
+"""Run metrics kept up to date move by move.
+
+Counters, all since the episode started:
+
+* covered: cells searchers have stepped on, the non-zero cells of the
+  shared visit map;
+* moves, and redundant moves onto a cell the team had already covered;
+* revisits: redundant moves onto a cell the searcher had been on itself.
+  The rest of the redundant moves are team overlap. Only the object engine
+  keeps per-searcher memory; with the swarm engine both are NaN;
+* sensed: cells that came within sight of a drone anywhere along its path.
+
+A searcher move costs a few integer updates. A drone move only records
+where the drone went; the sight diamonds of the recorded positions are
+marked together in one NumPy pass when they are read, or once
+``SENSE_BATCH`` positions have piled up, and only the newly seen cells are
+added to the count. Every ``every`` steps the current
+ratios are appended to a ring buffer, which holds the most recent
+``capacity`` samples. Readers copy at most that many values and add nothing
+to the cost of a step.
+"""
+import numpy as np
+
+from core.spatial import diamond
+
+METRICS_EVERY = 10
+METRICS_CAPACITY = 1024
+
+# Drone positions recorded before their sight is marked
+SENSE_BATCH = 4096
+
+SERIES = ("coverage", "redundancy", "overlap", "revisits_per_searcher", "sensed")
+
+
+class RingSeries:
+    """Fixed-capacity time series; the oldest samples are overwritten."""
+
+    def __init__(self, names, capacity=METRICS_CAPACITY):
+        self.names = names
+        self.capacity = capacity
+        self.steps = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros((capacity, len(names)))
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, step, values):
+        i = self.count % self.capacity
+        self.steps[i] = step
+        self.values[i] = values
+        self.count += 1
+
+    def clear(self):
+        self.count = 0
+
+    def arrays(self):
+        """(steps, {name: values}), oldest sample first."""
+        n = len(self)
+        order = (np.arange(n) + self.count - n) % self.capacity
+        return self.steps[order], {name: self.values[order, j] for j, name in enumerate(self.names)}
+
+
+class RunMetrics:
+    def __init__(self, width, height, num_searchers, self_memory=True, every=METRICS_EVERY,
+                 capacity=METRICS_CAPACITY):
+        self.width = width
+        self.height = height
+        self.num_searchers = num_searchers
+        # Whether searchers report their own visit counts, splitting revisits from overlap
+        self.self_memory = self_memory
+        self.every = every
+        self.series = RingSeries(SERIES, capacity)
+        self._sensed = np.zeros((width, height), dtype=bool)
+        # Drone positions not marked yet, as (radius * width + x) * height + y
+        self._seen = []
+        self._diamonds = {}
+        self.reset()
+
+    def reset(self):
+        self.moves = 0
+        self.covered = 0
+        self.redundant = 0
+        self.revisits = 0
+        self.sensed = 0
+        self._sensed[...] = False
+        self._seen = []
+        self.series.clear()
+
+    # SEARCHERS
+    def searcher_move(self, shared, own=None):
+        """One move onto a cell with ``shared`` team visits and ``own`` by the mover."""
+        self.moves += 1
+        if shared == 0:
+            self.covered += 1
+        else:
+            self.redundant += 1
+            if own:
+                self.revisits += 1
+
+    def searcher_moves(self, shared, flat):
+        """Moves onto the cells ``flat`` whose team visit counts were ``shared``."""
+        fresh = np.unique(flat[shared == 0]).size
+        self.moves += flat.size
+        self.covered += fresh
+        self.redundant += flat.size - fresh
+
+    # DRONES
+    @property
+    def sensed_cells(self):
+        """Boolean grid of the cells some drone has seen."""
+        self._sense()
+        return self._sensed
+
+    def drone_at(self, drone):
+        self.drone_move(drone)
+
+    def drone_move(self, drone):
+        # Only the new position is kept: its diamond covers whatever the move brought into sight
+        seen = self._seen
+        seen.append((drone.vision_radius * self.width + drone.x) * self.height + drone.y)
+        if len(seen) >= SENSE_BATCH:
+            self._sense()
+
+    def _sense(self):
+        # Mark the sight of every drone position recorded since the last call
+        if not self._seen:
+            return
+        w, h = self.width, self.height
+        radius, flat = np.divmod(np.unique(np.array(self._seen, dtype=np.int64)), w * h)
+        self._seen = []
+        x, y = np.divmod(flat, h)
+        grid = self._sensed.reshape(-1)
+        for r in np.unique(radius).tolist():
+            offsets = self._diamonds.get(r)
+            if offsets is None:
+                ox, oy = diamond(r)
+                offsets = self._diamonds[r] = (ox, oy, ox * h + oy)
+            ox, oy, flat_offsets = offsets
+            sel = radius == r
+            inside = sel & (x >= r) & (x < w - r) & (y >= r) & (y < h - r)
+            self._mark(grid, (flat[inside, None] + flat_offsets).ravel())
+
+            # Near the edge: only the part of the diamond on the map
+            edge = sel & ~inside
+            cx = x[edge, None] + ox
+            cy = y[edge, None] + oy
+            on_map = (cx >= 0) & (cx < w) & (cy >= 0) & (cy < h)
+            self._mark(grid, cx[on_map] * h + cy[on_map])
+
+    def _mark(self, grid, cells):
+        # Count only the cells seen for the first time, so reading the total stays O(1)
+        fresh = cells[~grid[cells]]
+        if fresh.size:
+            grid[fresh] = True
+            self.sensed += np.unique(fresh).size
+
+    # READING
+    def current(self, free):
+        """Current ratios; ``free`` is the number of free cells on the map."""
+        self._sense()
+        moves = self.moves or 1
+        if self.self_memory:
+            overlap = (self.redundant - self.revisits) / moves
+            revisits = self.revisits / max(1, self.num_searchers)
+        else:
+            overlap = revisits = float("nan")
+        return {
+            "coverage": self.covered / max(1, free),
+            "redundancy": self.redundant / moves,
+            "overlap": overlap,
+            "revisits_per_searcher": revisits,
+            "sensed": self.sensed / (self.width * self.height),
+        }
+
+    def tick(self, step, free):
+        if step % self.every == 0:
+            self.series.append(step, tuple(self.current(free).values()))
+
+    # SNAPSHOTS
+    def copy(self):
+        self._sense()
+        other = object.__new__(RunMetrics)
+        other.__dict__.update(self.__dict__)
+        other._sensed = self._sensed.copy()
+        other._seen = []
+        other.series = RingSeries(self.series.names, self.series.capacity)
+        self._copy_series(self.series, other.series)
+        return other
+
+    def load(self, other):
+        """Take over the state of ``other`` in place."""
+        other._sense()
+        series, sensed = self.series, self._sensed
+        self.__dict__.update(other.__dict__)
+        self.series, self._sensed, self._seen = series, sensed, []
+        sensed[...] = other._sensed
+        self._copy_series(other.series, series)
+
+    @staticmethod
+    def _copy_series(source, target):
+        target.steps[...] = source.steps
+        target.values[...] = source.values
+        target.count = source.count
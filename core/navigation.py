@@ -0,0 +1,237 @@
+"""Shared BFS distance fields for rescue-mode navigation.
+
+A field is computed once per (environment, target) over the free cells and
+shared by every searcher heading there. Rescue moves may be diagonal, so the
+field is 8-connected. Each cell also stores the direction of one downhill
+neighbour, so following the field costs one lookup per step.
+
+When obstacles change, a cached field is repaired from the environment's
+change log the next time it is used, in the manner of LPA*: cells that lost
+their only way downhill are cleared and refilled from their neighbours, and
+freed cells lower distances outwards. The work is proportional to the cells
+whose distance changes. The least recently used targets are evicted once the
+cache outgrows ``FIELD_CACHE_BYTES``.
+"""
+import weakref
+
+import numpy as np
+
+# Orthogonal moves first, then diagonals
+OFFSETS = np.array([(1, 0), (-1, 0), (0, 1), (0, -1),
+                    (1, 1), (1, -1), (-1, 1), (-1, -1)])
+NO_STEP = -1
+
+# Memory for cached fields per environment; each costs five bytes per cell
+FIELD_CACHE_BYTES = 256 * 2 ** 20
+MIN_FIELDS = 4
+
+# Past this share of the grid changed at once, a full BFS is cheaper
+REPAIR_SHARE = 0.05
+
+_FIELDS = weakref.WeakKeyDictionary()
+
+# Offset index by (sign dx + 1, sign dy + 1)
+_GREEDY = np.full((3, 3), NO_STEP, dtype=np.int8)
+for _k, (_ox, _oy) in enumerate(OFFSETS.tolist()):
+    _GREEDY[_ox + 1, _oy + 1] = _k
+
+_UNREACHED = np.iinfo(np.int32).max
+
+
+def _steps(h):
+    return OFFSETS[:, 0] * h + OFFSETS[:, 1]
+
+
+def _wave(dist, is_free, steps, seeds, levels):
+    """Breadth-first relaxation from ``seeds`` entering at ``levels``.
+
+    Writes every free cell whose distance is unknown or larger than the one
+    found, lowest level first, and returns the flat indices written.
+    """
+    order = np.argsort(levels, kind="stable")
+    seeds, levels = seeds[order], levels[order]
+    owner = np.empty(dist.size, dtype=np.int32)
+    written = []
+    front = seeds[:0]
+    d, i = int(levels[0]), 0
+    while True:
+        j = np.searchsorted(levels, d, side="right")
+        cells = np.concatenate([(front[:, None] + steps).ravel(), seeds[i:j]])
+        i = j
+        cells = cells[is_free(cells)]
+        cells = cells[(dist[cells] < 0) | (dist[cells] > d)]
+
+        # Drop duplicates without sorting: keep the last writer of each cell
+        slot = np.arange(cells.size, dtype=np.int32)
+        owner[cells] = slot
+        front = cells[owner[cells] == slot]
+        dist[front] = d
+        written.append(front)
+
+        if front.size:
+            d += 1
+        elif i < seeds.size:
+            d = int(levels[i])
+        else:
+            return np.concatenate(written)
+
+
+class DistanceField:
+    def __init__(self, env, target):
+        self.target = target
+        self._compute(env)
+
+    def _compute(self, env):
+        self.version = env.version
+        # Padded with one unreachable cell on every side; ``dist`` is a view
+        self._dist = self._bfs(env, self.target)
+        self.dist = self._dist[1:-1, 1:-1]
+        self.direction = self._downhill(self.target)
+
+    @staticmethod
+    def _bfs(env, target):
+        # Work on a flat grid padded with one blocked cell on every side
+        w, h = env.width + 2, env.height + 2
+        free = np.zeros((w, h), dtype=bool)
+        free[1:-1, 1:-1] = ~env.blocked
+        free = free.ravel()
+        dist = np.full(w * h, -1, dtype=np.int32)
+
+        tx, ty = target
+        if env.is_free(tx, ty):
+            seed = np.array([(tx + 1) * h + ty + 1])
+            _wave(dist, free.__getitem__, _steps(h), seed, np.zeros(1, dtype=np.int32))
+        return dist.reshape(w, h)
+
+    def _downhill(self, target):
+        w, h = self.dist.shape
+        padded = self._dist
+        want = np.where(self.dist > 0, self.dist - 1, -2)
+
+        # Greedy direction towards the target, used when it is downhill
+        tx, ty = target
+        sx = np.sign(tx - np.arange(w))[:, None]
+        sy = np.sign(ty - np.arange(h))[None, :]
+        greedy = np.full((w, h), NO_STEP, dtype=np.int8)
+        for k, (ox, oy) in enumerate(OFFSETS.tolist()):
+            greedy[(sx == ox) & (sy == oy)] = k
+
+        direction = np.full((w, h), NO_STEP, dtype=np.int8)
+        for k, (ox, oy) in enumerate(OFFSETS.tolist()):
+            downhill = padded[1 + ox:w + 1 + ox, 1 + oy:h + 1 + oy] == want
+            direction[downhill & ((direction == NO_STEP) | (greedy == k))] = k
+        return direction
+
+    # REPAIR
+    def update(self, env):
+        """Catch up with the obstacle changes made since the field was built."""
+        if env.version == self.version:
+            return
+        changes = env.changes_since(self.version)
+        if (changes is None or changes[0].size > REPAIR_SHARE * self.dist.size
+                or not env.is_free(*self.target) or self.dist[self.target] != 0):
+            self._compute(env)
+            return
+
+        h = env.height + 2
+        steps = _steps(h)
+        dist = self._dist.reshape(-1)
+
+        def is_free(cells):
+            xs, ys = cells // h - 1, cells % h - 1
+            inside = (xs >= 0) & (xs < env.width) & (ys >= 0) & (ys < env.height)
+            free = inside.copy()
+            free[inside] = ~env.blocked[xs[inside], ys[inside]]
+            return free
+
+        cells = np.unique((changes[0] + 1) * h + changes[1] + 1)
+        freed = is_free(cells)
+
+        # DELETION: clear cells left without a downhill neighbour, level by level
+        removed = np.zeros(dist.size, dtype=bool)
+        front = cells[~freed & (dist[cells] >= 0)]
+        removed[front] = True
+        lost = [front]
+        while front.size:
+            up = front[:, None] + steps
+            up = np.unique(up[dist[up] == dist[front][:, None] + 1])
+            up = up[~removed[up]]
+            around = up[:, None] + steps
+            kept = ((dist[around] == dist[up][:, None] - 1) & ~removed[around]).any(axis=1)
+            front = up[~kept]
+            removed[front] = True
+            lost.append(front)
+        lost = np.concatenate(lost)
+        dist[lost] = -1
+
+        # INSERTION: refill from reached neighbours and from freed cells, lowest first
+        seeds = np.concatenate([lost, cells[freed]])
+        seeds = seeds[is_free(seeds)]
+        around = dist[seeds[:, None] + steps]
+        best = np.where(around >= 0, around, _UNREACHED).min(axis=1)
+        reached = best < _UNREACHED
+        changed = lost
+        if reached.any():
+            written = _wave(dist, is_free, steps, seeds[reached], best[reached] + 1)
+            changed = np.concatenate([lost, written])
+
+        # DIRECTIONS: changed cells and the neighbours that may point at them
+        if changed.size:
+            near = np.unique((changed[:, None] + np.append(steps, 0)).ravel())
+            self._redirect(near[is_free(near) | removed[near]], h)
+        self.version = env.version
+
+    def _redirect(self, cells, h):
+        dist = self._dist.reshape(-1)
+        xs, ys = cells // h - 1, cells % h - 1
+        want = dist[cells] - 1
+        want[want < 0] = -2
+
+        tx, ty = self.target
+        greedy = _GREEDY[np.sign(tx - xs) + 1, np.sign(ty - ys) + 1]
+        direction = np.full(cells.size, NO_STEP, dtype=np.int8)
+        for k, step in enumerate(_steps(h).tolist()):
+            downhill = dist[cells + step] == want
+            direction[downhill & ((direction == NO_STEP) | (greedy == k))] = k
+        self.direction[xs, ys] = direction
+
+    def copy(self):
+        field = object.__new__(DistanceField)
+        field.target = self.target
+        field.version = self.version
+        field._dist = self._dist.copy()
+        field.dist = field._dist[1:-1, 1:-1]
+        field.direction = self.direction.copy()
+        return field
+
+    def next_cell(self, x, y):
+        k = self.direction[x, y]
+        if k == NO_STEP:
+            return None
+        ox, oy = OFFSETS[k]
+        return x + int(ox), y + int(oy)
+
+
+def copy_fields(env, other):
+    """Seed the cache of ``other``, a copy of ``env``, with copies of its fields."""
+    fields = _FIELDS.get(env)
+    if fields:
+        _FIELDS[other] = {target: field.copy() for target, field in fields.items()}
+
+
+def distance_field(env, target):
+    fields = _FIELDS.get(env)
+    if fields is None:
+        fields = _FIELDS[env] = {}
+
+    field = fields.pop(target, None)
+    if field is None:
+        field = DistanceField(env, target)
+        limit = max(MIN_FIELDS, FIELD_CACHE_BYTES // (5 * env.width * env.height))
+        if len(fields) >= limit:
+            # Least recently used first: dicts keep insertion order
+            del fields[next(iter(fields))]
+    else:
+        field.update(env)
+    fields[target] = field
+    return field
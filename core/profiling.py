@@ -0,0 +1,113 @@
+"""Per-phase timing and hot-path counters for Simulation.update.
+
+A Simulation only carries a Profiler while profiling is on. With it off,
+update pays one ``is None`` check per phase and Environment methods are the
+plain class methods.
+
+Totals and counters cover the whole run; the per-step rows exported to CSV
+are the most recent ``PROFILE_HISTORY``.
+"""
+import csv
+import json
+import time
+from collections import deque
+
+PHASES = (
+    "searcher_step",
+    "searcher_detect",
+    "rescue_broadcast",
+    "drone_step",
+    "drone_detect",
+)
+
+COUNTERS = (
+    "is_free",
+)
+
+PROFILE_WINDOW = 100
+
+# Most recent per-step rows kept for export
+PROFILE_HISTORY = 10000
+
+
+class Profiler:
+    def __init__(self, window=PROFILE_WINDOW, history=PROFILE_HISTORY):
+        self.window = window
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.totals = dict.fromkeys(PHASES, 0.0)
+
+        # One row per step: step, phase seconds..., counter deltas...
+        self.steps = 0
+        self.rows = deque(maxlen=history)
+        self.recent = deque(maxlen=window)
+
+        self._times = None
+        self._mark = 0.0
+        self._counts_at_start = None
+
+    # RECORDING
+    def begin_step(self):
+        self._times = [0.0] * len(PHASES)
+        self._counts_at_start = [self.counters[c] for c in COUNTERS]
+        self._mark = time.perf_counter()
+
+    def lap(self, phase):
+        # Time since the previous lap, charged to ``phase``
+        now = time.perf_counter()
+        self._times[PHASES.index(phase)] += now - self._mark
+        self._mark = now
+
+    def end_step(self, step):
+        for phase, dt in zip(PHASES, self._times):
+            self.totals[phase] += dt
+        deltas = [self.counters[c] - n for c, n in zip(COUNTERS, self._counts_at_start)]
+        row = (step, *self._times, *deltas)
+        self.steps += 1
+        self.rows.append(row)
+        self.recent.append(row)
+
+    # QUERIES
+    def summary(self):
+        """Mean per-step seconds and counts over the rolling window."""
+        n = len(self.recent)
+        if n == 0:
+            return {"steps": 0, "phases": {}, "counters": {}}
+
+        columns = list(zip(*self.recent))
+        phases = {p: sum(columns[1 + i]) / n for i, p in enumerate(PHASES)}
+        counters = {c: sum(columns[1 + len(PHASES) + i]) / n for i, c in enumerate(COUNTERS)}
+        return {"steps": n, "phases": phases, "counters": counters}
+
+    def report(self):
+        return {
+            "steps": self.steps,
+            "totals": dict(self.totals),
+            "counters": dict(self.counters),
+            "window": self.summary(),
+        }
+
+    # EXPORT
+    def to_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("step", *PHASES, *COUNTERS))
+            writer.writerows(self.rows)
+
+    def to_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+def count_is_free(env, counters):
+    """Shadow env.is_free with a counting wrapper; undone by uncount_is_free."""
+    inner = type(env).is_free.__get__(env)
+
+    def is_free(x, y):
+        counters["is_free"] += 1
+        return inner(x, y)
+
+    env.is_free = is_free
+
+
+def uncount_is_free(env):
+    env.__dict__.pop("is_free", None)
@@ -0,0 +1,138 @@
+"""Seeded random streams: a few per episode and one per agent.
+
+Every stream is named by the episode seed and a key: its kind, and for
+agent streams the agent id. Bulk draws (obstacles, placement) use a NumPy
+Generator seeded from that name through SeedSequence.
+
+Agent streams are counter-based. Value ``i`` of a stream is SplitMix64's
+mixing function applied to the stream's key plus ``i`` times the golden
+gamma, so it depends only on (seed, key, i). It does not depend on which
+process computes it or on the order agents are stepped in. Agents only
+ever pick one of a few options, so a value is kept as an integer below
+``PICK_BASE``, scaled from the top bits of the mixed word, and picks option
+``value * len(options) // PICK_BASE``, uniform for any count dividing
+``PICK_BASE``. Each value fits in a byte, so an AgentStream holds a block
+of them in a bytes object; iterating it yields shared small-int objects,
+one C call per read.
+
+The batched swarm engine draws the next values of every mover in one
+vectorized call. A Searcher or Drone reads the same values from a block
+computed ahead, so a seed gives the same trajectories on every engine, in
+a process pool or not.
+"""
+import random
+from operator import length_hint
+
+import numpy as np
+
+# Stream kinds
+ENVIRONMENT = 1
+PLACEMENT = 2
+SEARCHER = 3
+DRONE = 4
+
+# Values an AgentStream computes at a time
+STREAM_BLOCK = 512
+
+# Range of stream values: divisible by every option count up to 6, and
+# below 256 to fit in a byte
+PICK_BASE = 240
+
+_MASK = (1 << 64) - 1
+_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_M1 = np.uint64(0xBF58476D1CE4E5B9)
+_M2 = np.uint64(0x94D049BB133111EB)
+_BASE = np.uint64(PICK_BASE)
+_ONE, _S11, _S27, _S30, _S31, _S53 = (np.uint64(k) for k in (1, 11, 27, 30, 31, 53))
+_BLOCK_STEPS = np.arange(STREAM_BLOCK, dtype=np.uint64) * _GAMMA
+
+
+def episode_seed(seed=None):
+    """``seed`` as a 64-bit int, or a fresh one from the global RNG when None."""
+    return random.getrandbits(64) if seed is None else int(seed) & _MASK
+
+
+def generator(seed, kind):
+    """NumPy Generator for the episode-level stream ``kind``."""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(kind,)))
+
+
+def _mix(z):
+    # SplitMix64 finalizer, in place; uint64 arrays wrap around silently
+    z ^= z >> _S30
+    z *= _M1
+    z ^= z >> _S27
+    z *= _M2
+    z ^= z >> _S31
+    return z
+
+
+def stream_keys(seed, kind, ids):
+    """uint64 key of the agent stream (kind, id) of episode ``seed``, per id."""
+    ids = np.asarray(ids, dtype=np.uint64).reshape(-1)
+    base = _mix(np.array([seed, kind], dtype=np.uint64) * _GAMMA)
+    return _mix((base[0] ^ base[1]) + ids * _GAMMA)
+
+
+def _scale(z):
+    # floor(PICK_BASE * top 53 bits / 2**53), exactly: the product fits in 64 bits
+    z >>= _S11
+    z *= _BASE
+    z >>= _S53
+    return z
+
+
+def draws(keys, positions):
+    """Value ``positions`` of the streams ``keys``, broadcast; ints below PICK_BASE."""
+    z = np.asarray(positions, dtype=np.uint64) + _ONE
+    z *= _GAMMA
+    return _scale(_mix(z + keys)).astype(np.int64)
+
+
+def pick(options, value):
+    """Option number value * len(options) // PICK_BASE, as the batched engine picks."""
+    return options[value * len(options) // PICK_BASE]
+
+
+class AgentStream:
+    """The stream of one agent, read a value at a time."""
+
+    __slots__ = ("key", "_start", "_values", "_read")
+
+    def __init__(self, seed, kind, id_):
+        self.key = int(stream_keys(seed, kind, [id_])[0])
+        self._fill(0)
+
+    def _fill(self, start):
+        # Values start.. of the stream, as draws() computes them
+        first = np.uint64((self.key + (start + 1) * int(_GAMMA)) & _MASK)
+        self._start = start
+        self._values = _scale(_mix(_BLOCK_STEPS + first)).astype(np.uint8).tobytes()
+        self._read = iter(self._values)
+
+    def next(self):
+        try:
+            return next(self._read)
+        except StopIteration:
+            self._fill(self._start + STREAM_BLOCK)
+            return next(self._read)
+
+    def choice(self, options):
+        """``pick(options, self.next())`` in one call."""
+        try:
+            value = next(self._read)
+        except StopIteration:
+            value = self.next()
+        return options[value * len(options) // PICK_BASE]
+
+    @property
+    def position(self):
+        """Number of values read so far."""
+        return self._start + STREAM_BLOCK - length_hint(self._read)
+
+    @position.setter
+    def position(self, value):
+        if not self._start <= value <= self._start + STREAM_BLOCK:
+            self._fill(value)
+        self._read = iter(self._values)
+        self._read.__setstate__(value - self._start)
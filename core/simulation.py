@@ -1,49 +1,150 @@
 import time
-from core.environment import Environment
+
+import numpy as np
+
+from core.environment import OBSTACLE_RATIO, Environment
+from core.navigation import copy_fields
 from agents.searcher import Searcher
 from agents.casualty import Casualty
 from agents.drone import Drone, DRONE_VISION_RADIUS
 from core.constants import GRID_WIDTH, GRID_HEIGHT
+from core.swarm import SEARCH, SwarmEngine
+from core.domain import TiledSwarmEngine
+from core.actors import ActorRuntime
+from core.snapshot import SimulationState
+from core.metrics import RunMetrics
+from core.rng import (DRONE, PLACEMENT, SEARCHER, AgentStream, episode_seed, generator,
+                      stream_keys)
+from core.spatial import SpatialHash, diamond
+from core.visits import VisitCounts, VisitMap
+from core.profiling import PROFILE_WINDOW, Profiler, count_is_free, uncount_is_free
 
 NUM_SEARCHERS = 3
+NUM_CASUALTIES = 1
+NUM_DRONES = 1
+FIRST_DRONE_ID = 99
+
+COMMS_MODES = ("direct", "actors")
+
+# Searcher/casualty pairs compared at once when dispatching rescuers
+DISPATCH_CHUNK = 1 << 20
 
 
 class Simulation:
-    def __init__(self):
-        # ENVIRONMENT
-        self.env = Environment(GRID_WIDTH, GRID_HEIGHT)
+    def __init__(self, step_clock=False, num_searchers=NUM_SEARCHERS, engine="objects",
+                 step_seconds=1, width=GRID_WIDTH, height=GRID_HEIGHT, profile=False,
+                 num_casualties=NUM_CASUALTIES, num_drones=NUM_DRONES, drone_mode="random",
+                 obstacle_ratio=OBSTACLE_RATIO, drone_vision_radius=DRONE_VISION_RADIUS,
+                 comms="direct", env=None, tiles=1, seed=None):
+        # CLOCK: wall time, or step_count * step_seconds when step_clock is set
+        self.step_clock = step_clock
+        self.step_seconds = step_seconds
+        self.num_searchers = num_searchers
+        self.num_casualties = num_casualties
+        self.num_drones = num_drones
+        self.drone_mode = drone_mode
+        self.obstacle_ratio = obstacle_ratio
+        self.drone_vision_radius = drone_vision_radius
+        self.comms = comms
+        self.engine = engine
+        self.tiles = tiles
+
+        # SEED: every random stream of the episode derives from it; without one,
+        # it is drawn from the global RNG. A reset reuses the seed it was given,
+        # so a seeded run replays its episode and an unseeded one draws a new one
+        self._given_seed = seed
+        self.seed = episode_seed(seed)
+
+        # ENVIRONMENT: generated, or shared with the simulation it was forked from.
+        # A shared environment is copied before its obstacles are first changed
+        if env is None:
+            env = Environment(width, height, obstacle_ratio, seed=self.seed)
+        self.env = env
+        self._env_shared = False
+        width, height = env.width, env.height
 
-        # CASUALTY
-        c = self.env.random_free_cell()
-        self.casualty = Casualty(c.x, c.y)
+        # PROFILING
+        self.profiler = None
+        if profile:
+            self.enable_profiling()
+
+        # PLACEMENT: each kind of agent in one draw from the free-cell index
+        rng = generator(self.seed, PLACEMENT)
+        free = self.env.free_cells
+
+        # CASUALTIES: distinct cells, indexed for drone sight and searcher arrival
+        if num_casualties < 1:
+            raise ValueError("num_casualties must be at least 1")
+        self.casualties = []
+        self.casualty_index = SpatialHash(drone_vision_radius)
+        self.casualty_cells = np.zeros((width, height), dtype=bool)
+        xs, ys = free.sample(num_casualties, rng)
+        for i, (x, y) in enumerate(zip(xs.tolist(), ys.tolist())):
+            casualty = Casualty(x, y, id_=i)
+            self.casualties.append(casualty)
+            self.casualty_index.insert(casualty, x, y)
+        self.casualty_cells[xs, ys] = True
+        self.casualty = self.casualties[0]
 
   
-        # SEARCHERS
-        self.searchers = []
-        for i in range(NUM_SEARCHERS):
-            while True:
-                s = self.env.random_free_cell()
-                if (s.x, s.y) != self.casualty.pos:
-                    break
-            self.searchers.append(Searcher(i + 1, s.x, s.y))
-
-    
+        # SEARCHERS: distinct cells, none on a casualty
+        xs, ys = free.sample(num_searchers, rng, exclude=self.casualty_cells)
+        positions = list(zip(xs.tolist(), ys.tolist()))
+
         # SHARED KNOWLEDGE MAP (COOPERATIVE SEARCH)
-        self.shared_visit_count = {}  
+        self.shared_visit_count = VisitMap(self.env)
 
-        # Attach to each searcher
-        for s in self.searchers:
-            s.shared_visit_count = self.shared_visit_count
+        # RUN METRICS: updated by the agents as they move
+        self.metrics = RunMetrics(width, height, num_searchers, self_memory=engine == "objects")
+
+        # SWARM ENGINE: same rules, all searchers stepped in batched array passes,
+        # optionally split into map strips stepped by worker processes
+        if tiles > 1 and engine != "swarm":
+            raise ValueError("Tiles split the swarm engine; use engine='swarm'")
+        if engine == "swarm":
+            if tiles > 1:
+                self.swarm = TiledSwarmEngine(self.env, positions, visits=self.shared_visit_count,
+                                              seed=self.seed, tiles=tiles)
+            else:
+                self.swarm = SwarmEngine(self.env, positions, visits=self.shared_visit_count,
+                                         seed=self.seed)
+            self.searchers = self.swarm.views()
+            self.swarm.metrics = self.metrics
+        elif engine == "objects":
+            self.swarm = None
+            self.searchers = [Searcher(i + 1, x, y) for i, (x, y) in enumerate(positions)]
+
+            # Attach to each searcher
+            for s in self.searchers:
+                s.shared_visit_count = self.shared_visit_count
+                s.metrics = self.metrics
+        else:
+            raise ValueError(f"Unknown engine: {engine!r}")
 
       
-        # DRONE 
-        while True:
-            d = self.env.random_free_cell()
-            dist = abs(d.x - self.casualty.x) + abs(d.y - self.casualty.y)
-            if dist > DRONE_VISION_RADIUS:
-                break
+        # DRONES: out of sight of every casualty when the map leaves enough room
+        try:
+            xs, ys = free.sample(num_drones, rng, exclude=self._in_sight(drone_vision_radius))
+        except ValueError:
+            xs, ys = free.sample(num_drones, rng)
+        self.drones = [Drone(id_=FIRST_DRONE_ID + i, x=x, y=y, vision_radius=drone_vision_radius,
+                             mode=drone_mode)
+                       for i, (x, y) in enumerate(zip(xs.tolist(), ys.tolist()))]
+        for d in self.drones:
+            d.metrics = self.metrics
+        self.drone = self.drones[0] if self.drones else None
+        self._seed_streams()
 
-        self.drone = Drone(id_=99, x=d.x, y=d.y)
+     
+        # COMMUNICATION: direct orders from the simulation, or actors and messages
+        if comms == "actors":
+            if engine != "objects":
+                raise ValueError("The actor runtime drives Searcher objects; use engine='objects'")
+            self.runtime = ActorRuntime(self)
+        elif comms in COMMS_MODES:
+            self.runtime = None
+        else:
+            raise ValueError(f"Unknown comms: {comms!r}")
 
      
         # SIMULATION STATE
@@ -54,13 +155,29 @@ class Simulation:
         # FIRST DETECTION
         self.time_to_find = None
         self.found_by = None
+        self.unfound = num_casualties
 
         # TEAM RESCUE TRACKING
         self.all_rescued_time = None
 
     # PUBLIC CONTROL METHODS
     def reset(self):
-        self.__init__()
+        self.close()
+        self.__init__(step_clock=self.step_clock, num_searchers=self.num_searchers,
+                      engine=self.engine, step_seconds=self.step_seconds,
+                      width=self.env.width, height=self.env.height,
+                      profile=self.profiler is not None,
+                      num_casualties=self.num_casualties, num_drones=self.num_drones,
+                      drone_mode=self.drone_mode, obstacle_ratio=self.obstacle_ratio,
+                      drone_vision_radius=self.drone_vision_radius, comms=self.comms,
+                      tiles=self.tiles, seed=self._given_seed)
+
+    def close(self):
+        """Stop the actor tasks or tile workers, if any. Needed with comms="actors" or tiles."""
+        if self.runtime is not None:
+            self.runtime.close()
+        if self.swarm is not None:
+            self.swarm.close()
 
     def start(self):
         self.running = True
@@ -68,24 +185,120 @@ class Simulation:
         self.start_time = time.time()
         self.time_to_find = None
         self.found_by = None
+        self.unfound = len(self.casualties)
         self.all_rescued_time = None
 
         # RESET AGENTS
-        self.shared_visit_count.clear()
-
-        for s in self.searchers:
-            s.has_found = False
-            s.at_casualty = False
-            s.arrival_time = None
-            s.steps_taken = 0
-            s.visited = {s.pos}
-            s.visit_count = {s.pos: 1}
-            s.last_pos = None
-            s.mode = "search"
-            s.target = None
+        if self.runtime is not None:
+            self.runtime.reset()
+        for c in self.casualties:
+            c.found_time = c.found_by = None
+            c.rescued_time = c.rescued_by = None
 
-        self.drone.has_found = False
-        self.drone.steps_taken = 0
+        if self.swarm is not None:
+            self.swarm.reset()
+        else:
+            self.shared_visit_count.clear()
+
+            for s in self.searchers:
+                s.has_found = False
+                s.at_casualty = False
+                s.arrival_time = None
+                s.steps_taken = 0
+                s.visit_count = VisitCounts([s.pos])
+                s.last_pos = None
+                s.mode = "search"
+                s.target = None
+                s.rng.position = 0
+
+        for d in self.drones:
+            d.has_found = False
+            d.steps_taken = 0
+            d.rng.position = 0
+            if d.mode == "coverage":
+                d.retask(self.env)
+
+        self.metrics.reset()
+        for d in self.drones:
+            self.metrics.drone_at(d)
+
+    # SNAPSHOTS
+    def snapshot(self):
+        # The state keeps this environment, so later obstacle changes go to a copy
+        self._env_shared = True
+        return SimulationState(self)
+
+    def restore(self, state):
+        """Return to a snapshot, obstacles included, of this simulation or a relative."""
+        state.restore(self)
+
+    def fork(self):
+        """Independent copy of the current episode that shares the environment."""
+        state = self.snapshot()
+        # Same seed: the fork continues the same streams
+        other = Simulation(step_clock=self.step_clock, num_searchers=self.num_searchers,
+                           engine=self.engine, step_seconds=self.step_seconds,
+                           profile=self.profiler is not None,
+                           num_casualties=self.num_casualties, num_drones=self.num_drones,
+                           drone_mode=self.drone_mode, obstacle_ratio=self.obstacle_ratio,
+                           drone_vision_radius=self.drone_vision_radius, comms=self.comms,
+                           env=self.env, tiles=self.tiles, seed=self.seed)
+        other.restore(state)
+        return other
+
+    def _seed_streams(self):
+        """Give every agent its own stream of the episode seed."""
+        if self.swarm is not None:
+            self.swarm.streams = stream_keys(self.seed, SEARCHER, self.swarm.ids)
+        else:
+            for s in self.searchers:
+                s.rng = AgentStream(self.seed, SEARCHER, s.id)
+        for d in self.drones:
+            d.rng = AgentStream(self.seed, DRONE, d.id)
+
+    def _adopt_env(self, env):
+        """Switch to ``env``, a map of the same size; visit counts are kept."""
+        if self.profiler is not None:
+            uncount_is_free(self.env)
+            count_is_free(env, self.profiler.counters)
+        self.env = env
+        self.shared_visit_count.env = env
+        if self.swarm is not None:
+            self.swarm.env = env
+            self.swarm.free[1:-1, 1:-1] = ~env.blocked
+
+    # DYNAMIC OBSTACLES
+    def add_obstacles(self, cells):
+        """Block (x, y) cells; returns the ones that were free before."""
+        xs, ys = self._cells(cells)
+        if self.casualty_cells[xs, ys].any():
+            raise ValueError("Cannot place an obstacle on a casualty")
+        return self._set_blocked(xs, ys, True)
+
+    def remove_obstacles(self, cells):
+        """Clear (x, y) cells; returns the ones that were blocked before."""
+        return self._set_blocked(*self._cells(cells), False)
+
+    def _cells(self, cells):
+        cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+        xs, ys = cells[:, 0], cells[:, 1]
+        if ((xs < 0) | (xs >= self.env.width) | (ys < 0) | (ys >= self.env.height)).any():
+            raise ValueError("Obstacle cells must lie on the map")
+        return xs, ys
+
+    def _set_blocked(self, xs, ys, value):
+        if self._env_shared:
+            env = self.env.copy()
+            copy_fields(self.env, env)
+            self._adopt_env(env)
+            self._env_shared = False
+
+        # Searchers standing on a new obstacle are not moved; they step off it
+        xs, ys = self.env.set_blocked(xs, ys, value)
+        self.shared_visit_count.update_cells(xs, ys)
+        if self.swarm is not None:
+            self.swarm.update_cells(xs, ys)
+        return list(zip(xs.tolist(), ys.tolist()))
 
     def toggle(self):
         if not self.running:
@@ -96,59 +309,242 @@ class Simulation:
         else:
             self.running = False
 
+    # PROFILING
+    def enable_profiling(self, window=PROFILE_WINDOW):
+        self.profiler = Profiler(window)
+        count_is_free(self.env, self.profiler.counters)
+        return self.profiler
+
+    def disable_profiling(self):
+        uncount_is_free(self.env)
+        self.profiler = None
+
     # UPDATE 
     def update(self):
         if not self.running:
             return
 
         self.step_count += 1
-        t = time.time() - self.start_time
+        t = self.now()
+
+        prof = self.profiler
+        if prof is not None:
+            prof.begin_step()
+
+        self._dispatch_due = False
+        runtime = self.runtime
+        if runtime is not None:
+            runtime.deliver(self.step_count)
+
+        # SWARM UPDATE: one batched step, then a vectorized arrival check
+        if self.swarm is not None:
+            self.swarm.step()
+            if prof is not None:
+                prof.lap("searcher_step")
 
-        someone_found = False
+            for i in self.swarm.arrivals(self.casualty_cells).tolist():
+                s = self.searchers[i]
+                for c in self.casualty_index.at(s.x, s.y):
+                    self._arrive(s, c, t)
 
-   
         # SEARCHERS UPDATE
-        for s in self.searchers:
-            # searcher that already reached casualty stays there
-            if not s.at_casualty:
-                s.step(self.env)
-
-            # LOCAL DETECTION (searcher physically reaches casualty)
-            if s.detect_casualty(self.casualty, t):
-                someone_found = True
-
-                # record first detection time
-                if self.time_to_find is None:
-                    self.time_to_find = t
-                    self.found_by = f"S{s.id}"
-
-       
-        # WHEN ANY SEARCHER FINDS - CALL THE OTHERS
-        if someone_found:
+        else:
+            if runtime is not None:
+                runtime.tick(runtime.searchers)
+            else:
+                for s in self.searchers:
+                    # searcher that already finished stays where it is
+                    if not s.at_casualty:
+                        s.step(self.env)
+            if prof is not None:
+                prof.lap("searcher_step")
+
+            # LOCAL DETECTION (searcher physically reaches a casualty)
             for s in self.searchers:
-                s.mode = "rescue"
-                s.target = (self.casualty.x, self.casualty.y)
+                if not s.at_casualty and self.casualty_cells[s.x, s.y]:
+                    for c in self.casualty_index.at(s.x, s.y):
+                        self._arrive(s, c, t)
 
-       
-        # DRONE UPDATE
-        self.drone.step(self.env)
+        if prof is not None:
+            prof.lap("searcher_detect")
 
-        # DRONE DETECTION ALSO TRIGGERS RESCUE
-        if self.drone.detect_casualty(self.casualty):
-            if self.time_to_find is None:
-                self.time_to_find = t
-                self.found_by = "Drone"
+        # FINDS AND RESCUES - SEND THE OTHERS TO THE NEAREST OPEN CASUALTY
+        if self._dispatch_due:
+            self._dispatch()
+        if prof is not None:
+            prof.lap("rescue_broadcast")
 
-            for s in self.searchers:
-                s.mode = "rescue"
-                s.target = (self.casualty.x, self.casualty.y)
+        # DRONES UPDATE
+        if runtime is not None:
+            runtime.tick(runtime.drones)
+        else:
+            for d in self.drones:
+                d.step(self.env)
+        if prof is not None:
+            prof.lap("drone_step")
+
+        # DRONE DETECTION ALSO TRIGGERS RESCUE
+        for d in self.drones:
+            seen = self.casualty_index.within(d.x, d.y, d.vision_radius)
+            for c in seen:
+                if not c.found:
+                    self._mark_found(c, "Drone", t)
+                if runtime is not None:
+                    runtime.observe(d, c)
+            # With actors, drones keep flying as radio relays
+            if seen and not self.unfound and runtime is None:
+                d.has_found = True
+        if self._dispatch_due:
+            self._dispatch()
+        if prof is not None:
+            prof.lap("drone_detect")
 
-        
-        # TEAM COMPLETION: all searchers at casualty
+        # TEAM COMPLETION: every searcher has finished
         if self.all_rescued_time is None:
-            if all(s.at_casualty for s in self.searchers):
+            if self.swarm is not None:
+                done = self.swarm.at_casualty.all()
+            else:
+                done = all(s.at_casualty for s in self.searchers)
+            if done:
                 self.all_rescued_time = t
 
+        self.metrics.tick(self.step_count, len(self.env.free_cells))
+
+        if prof is not None:
+            prof.end_step(self.step_count)
+
+    # CASUALTY BOOKKEEPING
+    def _mark_found(self, casualty, by, t):
+        casualty.found_time = t
+        casualty.found_by = by
+        self.unfound -= 1
+        self._dispatch_due = True
+
+        # record first detection time
+        if self.time_to_find is None:
+            self.time_to_find = t
+            self.found_by = by
+
+    def _arrive(self, s, casualty, t):
+        if not casualty.found:
+            self._mark_found(casualty, f"S{s.id}", t)
+
+        first = not casualty.rescued
+        if first:
+            casualty.rescued_time = t
+            casualty.rescued_by = s.id
+            self._dispatch_due = True
+        if self.runtime is not None:
+            self.runtime.observe(s, casualty)
+        if not first and s.target is not None and s.target != casualty.pos:
+            # passing over a reached casualty on the way to another one
+            return
+
+        # NEXT JOB: nearest open casualty, more searching, or done
+        if self.runtime is not None:
+            open_cs, unfound = self.runtime.view(s)
+        else:
+            open_cs, unfound = self.open_casualties(), self.unfound
+        if open_cs:
+            s.mode = "rescue"
+            s.target = open_cs[self._nearest([s.x], [s.y], open_cs)[0]].pos
+        elif unfound:
+            s.mode = "search"
+            s.target = None
+        else:
+            s.mode = "rescue"
+            s.target = casualty.pos
+            s.at_casualty = True
+            s.has_found = True
+            s.arrival_time = t
+
+    def open_casualties(self):
+        """Casualties found but not yet reached by a searcher."""
+        return [c for c in self.casualties if c.found and not c.rescued]
+
+    def rescue_targets(self):
+        # Open casualties first; once all are found and reached, searchers
+        # gather at the nearest one
+        open_cs = self.open_casualties()
+        if open_cs or self.unfound:
+            return open_cs
+        return self.casualties
+
+    @staticmethod
+    def _nearest(xs, ys, casualties):
+        # Manhattan-nearest casualty per searcher, lowest index on ties
+        cx = np.array([c.x for c in casualties])
+        cy = np.array([c.y for c in casualties])
+        xs, ys = np.asarray(xs), np.asarray(ys)
+        best = np.empty(xs.size, dtype=np.int64)
+        step = max(1, DISPATCH_CHUNK // cx.size)
+        for lo in range(0, xs.size, step):
+            d = (np.abs(xs[lo:lo + step, None] - cx) + np.abs(ys[lo:lo + step, None] - cy))
+            best[lo:lo + step] = d.argmin(axis=1)
+        return best
+
+    def _dispatch(self):
+        # Searchers still searching, or heading somewhere that is no longer a
+        # rescue target, take the nearest target. Actors decide for themselves.
+        self._dispatch_due = False
+        if self.runtime is not None:
+            return
+        open_cs = self.rescue_targets()
+        if not open_cs:
+            return
+
+        if self.swarm is not None:
+            sw = self.swarm
+            h = self.env.height
+            open_keys = np.array([c.x * h + c.y for c in open_cs])
+            heading = np.isin(sw.target_x * h + sw.target_y, open_keys)
+            idx = np.flatnonzero(~sw.at_casualty & ((sw.mode == SEARCH) | ~heading))
+            if idx.size:
+                j = self._nearest(sw.x[idx], sw.y[idx], open_cs)
+                sw.set_rescue(idx, np.array([c.x for c in open_cs])[j],
+                              np.array([c.y for c in open_cs])[j])
+            return
+
+        open_pos = {c.pos for c in open_cs}
+        todo = [s for s in self.searchers
+                if not s.at_casualty and (s.mode == "search" or s.target not in open_pos)]
+        if todo:
+            j = self._nearest([s.x for s in todo], [s.y for s in todo], open_cs)
+            for s, k in zip(todo, j.tolist()):
+                s.mode = "rescue"
+                s.target = open_cs[k].pos
+
+    def _in_sight(self, radius):
+        """Mask of the cells within Manhattan ``radius`` of some casualty."""
+        dx, dy = diamond(radius)
+        cx, cy = np.nonzero(self.casualty_cells)
+        xs = (cx[:, None] + dx).ravel()
+        ys = (cy[:, None] + dy).ravel()
+        inside = (xs >= 0) & (xs < self.env.width) & (ys >= 0) & (ys < self.env.height)
+        mask = np.zeros_like(self.casualty_cells)
+        mask[xs[inside], ys[inside]] = True
+        return mask
+
+    def move_casualty(self, casualty, x, y):
+        """Relocate a casualty, keeping the detection index in step."""
+        index = self.casualty_index
+        index.remove(casualty, casualty.x, casualty.y)
+        old = casualty.pos
+        casualty.x, casualty.y = x, y
+        index.insert(casualty, x, y)
+
+        for cx, cy in (old, casualty.pos):
+            if 0 <= cx < self.env.width and 0 <= cy < self.env.height:
+                self.casualty_cells[cx, cy] = bool(index.at(cx, cy))
+
+    def now(self):
+        if self.step_clock:
+            return self.step_count * self.step_seconds
+        return time.time() - self.start_time
+
+    @property
+    def finished(self):
+        return self.all_rescued_time is not None
 
     @property
     def elapsed_time(self):
@@ -156,4 +552,4 @@ class Simulation:
             return 0.0
         if self.time_to_find is not None:
             return self.time_to_find
-        return time.time() - self.start_time
+        return self.now()
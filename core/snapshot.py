@@ -0,0 +1,137 @@
+"""Snapshots of a running episode.
+
+A ``SimulationState`` holds everything that changes while an episode runs:
+
+* the clocks and episode results;
+* casualty positions and records;
+* searcher state and the shared visit counts;
+* drone state, including the coverage plan position;
+* actor knowledge and in-flight messages when agents run as actors;
+* the run metrics;
+* how far each agent has read its random stream.
+
+The environment is kept by reference, not copied. Once a simulation has
+been snapshotted or forked it treats its environment as shared, and copies
+it before changing any obstacles, so the environment a state refers to
+never changes. A fork shares the environment and its distance fields with
+its parent until either of them edits the map.
+
+A state is never written to after capture, so one snapshot can be restored
+any number of times, into the simulation it came from or into a fork of it.
+Restoring writes into the existing agent objects and arrays, so a renderer
+or actor runtime attached to the simulation stays valid. Profiler and
+message bus counters are instrumentation, not state, and are left alone.
+"""
+import time
+
+import numpy as np
+
+from core.messaging import Message
+
+CASUALTY_FIELDS = ("found_time", "found_by", "rescued_time", "rescued_by")
+SEARCHER_FIELDS = ("x", "y", "has_found", "at_casualty", "arrival_time", "steps_taken",
+                   "last_pos", "mode", "target")
+DRONE_FIELDS = ("x", "y", "has_found", "steps_taken", "plan", "plan_index", "plan_dir",
+                "joining")
+SWARM_ARRAYS = ("x", "y", "last_x", "last_y", "mode", "steps", "at_casualty", "arrival_time",
+                "has_found", "target_x", "target_y", "drawn")
+SIM_FIELDS = ("running", "step_count", "time_to_find", "found_by", "unfound",
+              "all_rescued_time")
+
+
+def _shape(sim):
+    return (sim.engine, sim.comms, sim.env.width, sim.env.height, len(sim.searchers),
+            len(sim.casualties), len(sim.drones))
+
+
+class SimulationState:
+    def __init__(self, sim):
+        self.shape = _shape(sim)
+        self.env = sim.env
+        self.seed = sim.seed
+
+        # CLOCKS AND RESULTS: elapsed wall time, so a restore resumes the clock
+        self.sim = tuple(getattr(sim, f) for f in SIM_FIELDS)
+        self.elapsed = None if sim.start_time is None else time.time() - sim.start_time
+
+        # CASUALTIES
+        self.casualties = tuple((c.x, c.y) + tuple(getattr(c, f) for f in CASUALTY_FIELDS)
+                                for c in sim.casualties)
+
+        # SEARCHERS: visit counts are the only large piece of shared state
+        self.visits = sim.shared_visit_count.counts.copy()
+        if sim.swarm is not None:
+            self.searchers = {a: getattr(sim.swarm, a).copy() for a in SWARM_ARRAYS}
+        else:
+            self.searchers = tuple((tuple(getattr(s, f) for f in SEARCHER_FIELDS),
+                                    s.visit_count.copy(), s.rng.position)
+                                   for s in sim.searchers)
+
+        # DRONES
+        self.drones = tuple((tuple(getattr(d, f) for f in DRONE_FIELDS), d.rng.position)
+                            for d in sim.drones)
+
+        # ACTORS: knowledge per actor, and messages waiting for the next tick
+        self.actors = self.outbox = None
+        runtime = sim.runtime
+        if runtime is not None:
+            index = {agent: i for i, agent in enumerate(runtime.actors)}
+            self.actors = tuple((frozenset(a.found), frozenset(a.rescued))
+                                for a in runtime.actors.values())
+            self.outbox = tuple((index[m.sender], m.kind, m.payload, m.x, m.y,
+                                 m.radius, m.step) for m in runtime.bus.outbox)
+
+        self.metrics = sim.metrics.copy()
+
+    # RESTORE
+    def restore(self, sim):
+        if _shape(sim) != self.shape:
+            raise ValueError(f"State of a {self.shape} simulation does not fit {_shape(sim)}")
+        if sim.env is not self.env:
+            sim._adopt_env(self.env)
+        sim._env_shared = True
+        if sim.seed != self.seed:
+            sim.seed = self.seed
+            sim._seed_streams()
+
+        for f, value in zip(SIM_FIELDS, self.sim):
+            setattr(sim, f, value)
+        sim.start_time = None if self.elapsed is None else time.time() - self.elapsed
+
+        for c, (x, y, *records) in zip(sim.casualties, self.casualties):
+            if (c.x, c.y) != (x, y):
+                sim.move_casualty(c, x, y)
+            for f, value in zip(CASUALTY_FIELDS, records):
+                setattr(c, f, value)
+
+        sim.shared_visit_count.set_counts(self.visits)
+        if sim.swarm is not None:
+            for a, values in self.searchers.items():
+                getattr(sim.swarm, a)[...] = values
+            empty = np.zeros(0, dtype=np.int64)
+            sim.swarm._late = (empty, empty, empty)
+            sim.swarm._late_done = 0
+        else:
+            for s, (fields, visit_count, drawn) in zip(sim.searchers, self.searchers):
+                for f, value in zip(SEARCHER_FIELDS, fields):
+                    setattr(s, f, value)
+                s.visit_count = visit_count.copy()
+                s.rng.position = drawn
+
+        for d, (fields, drawn) in zip(sim.drones, self.drones):
+            for f, value in zip(DRONE_FIELDS, fields):
+                setattr(d, f, value)
+            d.rng.position = drawn
+
+        runtime = sim.runtime
+        if runtime is not None:
+            agents = list(runtime.actors)
+            for a, (found, rescued) in zip(runtime.actors.values(), self.actors):
+                a.found = set(found)
+                a.rescued = set(rescued)
+            runtime.batches = {}
+            runtime.bus.outbox = []
+            for i, kind, payload, x, y, radius, step in self.outbox:
+                runtime.bus.outbox.append(Message(agents[i], kind, payload, x, y, radius, step))
+
+        sim.metrics.load(self.metrics)
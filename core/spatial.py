@@ -0,0 +1,73 @@
+"""Grid-bucket spatial hash for point agents, and the sight footprint.
+
+Items are bucketed by ``(x // bucket, y // bucket)``. A radius query only
+visits the buckets overlapping the query's bounding square, so its cost
+depends on local density rather than on the total number of items.
+
+``diamond`` gives the cells within a Manhattan radius, the area a drone
+sees and a casualty can be detected in.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+
+@lru_cache(maxsize=None)
+def diamond(radius):
+    """(dx, dy) offsets within Manhattan distance ``radius``; read-only, shared."""
+    d = np.arange(-radius, radius + 1)
+    dx, dy = np.meshgrid(d, d, indexing="ij")
+    keep = np.abs(dx) + np.abs(dy) <= radius
+    dx, dy = dx[keep], dy[keep]
+    dx.flags.writeable = dy.flags.writeable = False
+    return dx, dy
+
+
+class SpatialHash:
+    def __init__(self, bucket=8):
+        self.bucket = max(1, bucket)
+        self.buckets = {}
+        self.size = 0
+
+    def _key(self, x, y):
+        return x // self.bucket, y // self.bucket
+
+    def insert(self, item, x, y):
+        self.buckets.setdefault(self._key(x, y), []).append((x, y, item))
+        self.size += 1
+
+    def remove(self, item, x, y):
+        key = self._key(x, y)
+        entries = self.buckets[key]
+        for i, (ex, ey, other) in enumerate(entries):
+            if other is item:
+                del entries[i]
+                break
+        else:
+            raise KeyError(item)
+        if not entries:
+            del self.buckets[key]
+        self.size -= 1
+
+    def at(self, x, y):
+        """Items sitting exactly on cell (x, y)."""
+        entries = self.buckets.get(self._key(x, y), ())
+        return [item for ex, ey, item in entries if ex == x and ey == y]
+
+    def within(self, x, y, radius):
+        """Items whose Manhattan distance to (x, y) is at most ``radius``."""
+        b = self.bucket
+        bx0, by0 = (x - radius) // b, (y - radius) // b
+        bx1, by1 = (x + radius) // b, (y + radius) // b
+
+        found = []
+        get = self.buckets.get
+        for bx in range(bx0, bx1 + 1):
+            for by in range(by0, by1 + 1):
+                for ex, ey, item in get((bx, by), ()):
+                    if abs(ex - x) + abs(ey - y) <= radius:
+                        found.append(item)
+        return found
+
+    def __len__(self):
+        return self.size
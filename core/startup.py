@@ -0,0 +1,66 @@
+"""Startup-time measurement for headless workers and the GUI.
+
+Each probe runs in a fresh interpreter so import caches do not hide the
+cost. The headless probe also reports whether pygame got imported, which
+must never happen for ``core`` and ``agents``.
+
+    python -m core.startup
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBES = {
+    "headless": """
+import json, time, sys
+t0 = time.perf_counter()
+from core.simulation import Simulation
+t1 = time.perf_counter()
+sim = Simulation(step_clock=True)
+sim.start()
+sim.update()
+t2 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "first_step": t2 - t1, "pygame_loaded": "pygame" in sys.modules}))
+""",
+    "renderer": """
+import json, os, time
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+t0 = time.perf_counter()
+import pygame
+from renderer.renderer import Renderer, agent_image
+t1 = time.perf_counter()
+for name in ("casualty", "searcher", "drone"):
+    agent_image(name)
+t2 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "assets": t2 - t1}))
+""",
+}
+
+
+def measure(probe):
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1")
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBES[probe]],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    results = {}
+    for probe in _PROBES:
+        try:
+            results[probe] = measure(probe)
+        except subprocess.CalledProcessError as e:
+            results[probe] = {"error": e.stderr.strip().splitlines()[-1]}
+    print(json.dumps(results, indent=2))
+
+    if results["headless"].get("pygame_loaded"):
+        sys.exit("core imported pygame")
+
+
+if __name__ == "__main__":
+    main()
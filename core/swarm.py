@@ -0,0 +1,545 @@
+"""Struct-of-arrays engine that steps every searcher in batched NumPy passes.
+
+Implements the same rules as ``Searcher.step``:
+
+* search mode: move to a never-visited free neighbour, or once the
+  neighbourhood is saturated towards the nearest frontier cell, least
+  visited first; ties are broken uniformly, and do not step back onto
+  ``last_pos`` when another option exists;
+* rescue mode: follow the shared distance field to the target, falling back
+  to a random free neighbour when the target is unreachable.
+
+The object loop lets searcher ``i`` see the visits made earlier in the same
+tick by searchers ``0..i-1``. Only a mover within two cells can change the
+counts around ``i``, so a tick is resolved in rounds: each round moves, in
+one batched pass, every mover with no unresolved lower-indexed mover that
+close. Rescue moves ignore visit counts and wait only for searchers.
+
+Saturated searchers head for the nearest frontier cell at the start of the
+tick, looked up for all of them at once. The frontier only shrinks within a
+tick, so that cell stays the nearest unless a lower-indexed mover steps onto
+it. A searcher waits while an unresolved one could; if one did, it is left
+with everyone waiting on it to a serial pass in index order. Cells first
+reached in the rounds leave the frontier in index order around that pass.
+
+Every searcher reads its own stream from ``core.rng``, the values a
+Searcher object reads, so both engines give the same episode for a seed.
+``core.domain`` spreads the first round's choice over worker processes, one
+strip of the map each.
+
+Limits: the rounds follow the longest chain of movers with rising indices,
+each within two cells of the next. On crowded maps most movers sit on such
+chains and are left to the serial pass, as are searchers whose frontier
+cell was taken when too few are stuck to pay for a retargeting pass. Fewer
+than ``BATCH_MIN`` movers are stepped serially throughout. A serial move
+costs about what ``Searcher.step`` does, on top of a few fixed NumPy calls
+per tick, so up to about a hundred searchers, or on maps as crowded as the
+default one, the object engine is the faster. From a thousand searchers up
+this one is several times faster.
+"""
+import numpy as np
+
+from core.navigation import NO_STEP, OFFSETS, distance_field
+from core.rng import PICK_BASE, SEARCHER, draws, episode_seed, pick, stream_keys
+from core.visits import VisitMap, frontier_options, nearest_cells
+
+SEARCH = 0
+RESCUE = 1
+MODE_NAMES = ("search", "rescue")
+
+# Same order as Searcher.neighbours
+DX = np.array([1, -1, 0, 0])
+DY = np.array([0, 0, 1, -1])
+_DIRS = list(zip(DX.tolist(), DY.tolist()))
+
+# Offsets reachable by two agents that can touch the same cell in one tick,
+# and those of agents that can step onto a cell
+_NEAR = np.array([(dx, dy) for dx in range(-2, 3) for dy in range(-2, 3)])
+_ADJACENT = np.array([(dx, dy) for dx in range(-1, 2) for dy in range(-1, 2)])
+
+_STATE = (("last_x", np.int64), ("last_y", np.int64), ("mode", np.uint8), ("steps", np.int64),
+          ("at_casualty", bool), ("arrival_time", np.float64), ("has_found", bool),
+          ("target_x", np.int64), ("target_y", np.int64), ("drawn", np.int64))
+
+# Stream values a mover may read per step: for its choice, and for the way
+# not back; only the first is read unless it would step back
+_DRAWS = np.arange(2)
+
+# A batched pass moving fewer searchers than this costs more than stepping
+# them one by one
+BATCH_MIN = 32
+
+# Frontier target of a mover not looked up yet; -1 is no frontier left
+UNKNOWN = -2
+
+# Retargeting takes a pass over the map; below one stuck searcher per this
+# many cells the serial pass is cheaper. Pairs compared at a time in it
+RETARGET_CELLS = 4000
+RETARGET_CHUNK = 1 << 20
+_NO_OPTION = np.iinfo(np.int32).max
+_FAR = np.iinfo(np.int64).max
+
+
+def _nth(mask, u):
+    # Column of set entry number u * count // PICK_BASE in each row, as rng.pick chooses
+    k = u * mask.sum(axis=1) // PICK_BASE
+    return np.argmax(mask.cumsum(axis=1) > k[:, None], axis=1)
+
+
+def _neighbourhood(x, y, free, counts):
+    # Neighbour cells, which of them are free, and their shared visits
+    cx = x[:, None] + DX
+    cy = y[:, None] + DY
+    valid = free[cx + 1, cy + 1]
+    w, h = counts.shape
+    score = np.where(valid, counts[np.clip(cx, 0, w - 1), np.clip(cy, 0, h - 1)], _NO_OPTION)
+    return cx, cy, valid, score
+
+
+def _move(cx, cy, valid, best, last_x, last_y, u):
+    # One of ``best`` by the stream; never back onto last_pos while alternatives exist
+    rows = np.arange(cx.shape[0])
+    chosen = _nth(best, u[:, 0])
+    is_last = (cx == last_x[:, None]) & (cy == last_y[:, None])
+    back = is_last[rows, chosen] & (valid.sum(axis=1) > 1)
+    alt = _nth(valid & ~is_last, u[:, 1])
+    chosen = np.where(back, alt, chosen)
+    return cx[rows, chosen], cy[rows, chosen], back
+
+
+def choose_search(x, y, last_x, last_y, free, counts, u):
+    """Search-mode moves of searchers at (x, y) from the counts around them.
+
+    ``free`` is the padded free mask and ``u`` the (n, 2) next stream values.
+    Returns (new_x, new_y, moved, saturated, back); a saturated searcher has
+    no never-visited neighbour and heads for the frontier instead, and one
+    turned away from last_pos reads the second value.
+    """
+    cx, cy, valid, score = _neighbourhood(x, y, free, counts)
+    low = score.min(axis=1, keepdims=True)
+    new_x, new_y, back = _move(cx, cy, valid, valid & (score == low), last_x, last_y, u)
+    has_option = valid.any(axis=1)
+    return new_x, new_y, has_option, has_option & (low[:, 0] > 0), back
+
+
+def choose_frontier(x, y, last_x, last_y, free, counts, u, target):
+    """Moves of saturated searchers towards the frontier cells ``target``.
+
+    ``target`` holds flat indices x * height + y, -1 where no frontier is
+    left. As ``frontier_options``: neighbours closer to the target first,
+    least visited among them. Returns (new_x, new_y, back).
+    """
+    cx, cy, valid, score = _neighbourhood(x, y, free, counts)
+    tx, ty = np.divmod(target, counts.shape[1])
+    here = np.abs(x - tx) + np.abs(y - ty)
+    closer = valid & (np.abs(cx - tx[:, None]) + np.abs(cy - ty[:, None]) < here[:, None])
+    closer &= (target >= 0)[:, None]
+    options = np.where(closer.any(axis=1, keepdims=True), closer, valid)
+    score = np.where(options, score, _NO_OPTION)
+    best = options & (score == score.min(axis=1, keepdims=True))
+    return _move(cx, cy, valid, best, last_x, last_y, u)
+
+
+class SwarmEngine:
+    def __init__(self, env, positions, ids=None, visits=None, seed=None):
+        self.env = env
+        self.n = len(positions)
+
+        pos = np.asarray(positions, dtype=np.int64).reshape(self.n, 2)
+        self.x = self._array("x", self.n, np.int64)
+        self.y = self._array("y", self.n, np.int64)
+        self.x[:], self.y[:] = pos[:, 0], pos[:, 1]
+        self.ids = np.arange(1, self.n + 1) if ids is None else np.asarray(ids)
+
+        # Free mask padded by one cell so neighbour lookups need no bounds checks
+        self.free = self._array("free", (env.width + 2, env.height + 2), bool)
+        self.free[...] = False
+        self.free[1:-1, 1:-1] = ~env.blocked
+
+        # Grids of the rounds, allocated by the first one
+        self._lowest = None
+        self._landed = None
+
+        # Per-searcher state, set by reset()
+        for name, dtype in _STATE:
+            setattr(self, name, self._array(name, self.n, dtype))
+
+        self.visits = VisitMap(env) if visits is None else visits
+        self.metrics = None
+
+        # One counter-based stream per searcher, keyed by its id
+        self.streams = stream_keys(episode_seed(seed), SEARCHER, self.ids)
+        self.reset()
+
+    def _array(self, name, shape, dtype):
+        # Allocated once; everything writes in place
+        return np.empty(shape, dtype=dtype)
+
+    def close(self):
+        """Release resources held outside the process; none here."""
+
+    # STATE
+    def update_cells(self, xs, ys):
+        """Follow obstacle changes at (xs, ys)."""
+        self.free[xs + 1, ys + 1] = ~self.env.blocked[xs, ys]
+
+    def reset(self):
+        self.last_x[:] = -1
+        self.last_y[:] = -1
+        self.mode[:] = SEARCH
+        self.steps[:] = 0
+        self.at_casualty[:] = False
+        self.arrival_time[:] = np.nan
+        self.has_found[:] = False
+        self.target_x[:] = -1
+        self.target_y[:] = -1
+        self.drawn[:] = 0
+        self.visits.clear()
+
+        empty = np.zeros(0, dtype=np.int64)
+        self._late = (empty, empty, empty)
+        self._late_done = 0
+
+    def views(self):
+        return [SwarmSearcher(self, i) for i in range(self.n)]
+
+    def set_rescue(self, idx, tx, ty):
+        self.mode[idx] = RESCUE
+        self.target_x[idx] = tx
+        self.target_y[idx] = ty
+
+    # STEP
+    def step(self):
+        movers = np.flatnonzero(~self.at_casualty)
+        if movers.size == 0:
+            return
+
+        x, y = self.x[movers], self.y[movers]
+        u = self._draw(movers)
+        searching = (self.mode[movers] == SEARCH) | (self.target_x[movers] < 0)
+        if movers.size < BATCH_MIN:
+            # A handful of movers: one by one costs less than the rounds
+            new_x, new_y, moved = x.copy(), y.copy(), np.zeros(movers.size, dtype=bool)
+            back = np.zeros(movers.size, dtype=bool)
+            self._rescue(movers, x, y, u, new_x, new_y, moved, back)
+            pending = np.ones(movers.size, dtype=bool)
+            target = np.full(movers.size, UNKNOWN, dtype=np.int64)
+            late = []
+        else:
+            new_x, new_y, moved, saturated, back = self._choose(movers, x, y, u)
+            pending, target, late = self._rounds(movers, x, y, u, new_x, new_y, moved,
+                                                 saturated, back, searching)
+
+        # Frontier cells reached above close in index order around the serial moves
+        if late:
+            late = np.sort(np.concatenate(late))
+            self._landed[new_x[late], new_y[late]] = self.n
+        else:
+            late = np.zeros(0, dtype=np.int64)
+        self._late = (movers[late], new_x[late], new_y[late])
+        self._late_done = 0
+        for j in np.flatnonzero(pending).tolist():
+            if searching[j]:
+                cell = int(target[j])
+                hint = divmod(cell, self.env.height) if cell >= 0 else None
+                back[j] = self._step_one(movers[j], u[j], hint)
+            elif moved[j]:
+                self._apply_one(movers[j], int(new_x[j]), int(new_y[j]))
+        self._close_late(self.n)
+        self.drawn[movers] += 1 + back
+
+    def _rounds(self, movers, x, y, u, new_x, new_y, moved, saturated, back, searching):
+        # Apply every move that can be made in batches; returns the rows left
+        # for the serial pass, frontier targets, and rows reaching the frontier
+        if self._lowest is None:
+            # Lowest unresolved mover index per cell, padded by two cells for the
+            # lookups around it, and lowest index of a mover that stepped onto
+            # each frontier cell this tick
+            w, h = self.env.width, self.env.height
+            self._lowest = np.full((w + 4, h + 4), self.n, dtype=np.int32)
+            self._landed = np.full((w, h), self.n, dtype=np.int32)
+        order = np.arange(movers.size, dtype=np.int32)
+        target = np.full(movers.size, UNKNOWN, dtype=np.int64)
+        pending = np.ones(movers.size, dtype=bool)
+        stuck = np.zeros(movers.size, dtype=bool)
+        late = []
+        lowest = self._lowest
+        landed = self._landed
+        counts = self.visits.counts
+        first = True
+        progress = False
+        while True:
+            # Ready: no unresolved lower-indexed mover within two cells; rescue
+            # moves only wait for searchers
+            ready = pending & ~stuck
+            waiting = pending & searching
+            np.minimum.at(lowest, (x[waiting] + 2, y[waiting] + 2), order[waiting])
+            r = np.flatnonzero(ready & ~searching)
+            ready[r] = self._lowest_near(x[r], y[r], _NEAR) >= r
+            waiting = pending & ~searching
+            np.minimum.at(lowest, (x[waiting] + 2, y[waiting] + 2), order[waiting])
+            s = np.flatnonzero(ready & searching)
+            ready[s] = self._lowest_near(x[s], y[s], _NEAR) >= s
+
+            # Later rounds see the visits of the rounds before
+            s = np.flatnonzero(ready & searching)
+            if not first and s.size:
+                new_x[s], new_y[s], moved[s], saturated[s], back[s] = choose_search(
+                    x[s], y[s], self.last_x[movers[s]], self.last_y[movers[s]],
+                    self.free, counts, u[s])
+
+            # Saturated: wait while a lower-indexed mover could still step onto
+            # the frontier cell; once one has, look again
+            f = s[saturated[s]]
+            unknown = f[target[f] == UNKNOWN]
+            if unknown.size:
+                target[unknown] = self._frontier(unknown, x, y)
+            g = f[target[f] >= 0]
+            tx, ty = np.divmod(target[g], self.env.height)
+            taken = landed[tx, ty] < g
+            ready[g] = ~taken & (self._lowest_near(tx, ty, _ADJACENT) >= g)
+            stuck[g[taken]] = True
+            f = f[ready[f]]
+            if f.size:
+                new_x[f], new_y[f], back[f] = choose_frontier(
+                    x[f], y[f], self.last_x[movers[f]], self.last_y[movers[f]],
+                    self.free, counts, u[f], target[f])
+            lowest[x[pending] + 2, y[pending] + 2] = self.n
+
+            go = np.flatnonzero(ready)
+            if go.size >= BATCH_MIN:
+                pending[go] = False
+                go = go[moved[go]]
+                fx, fy = new_x[go], new_y[go]
+                opened = self.visits.frontier[fx, fy]
+                late.append(go[opened])
+                landed[fx[opened], fy[opened]] = np.minimum(landed[fx[opened], fy[opened]],
+                                                            go[opened])
+                self._apply(movers[go], fx, fy)
+                first = False
+                progress = True
+                continue
+
+            # Stalled, perhaps on taken cells: retarget them all at once if that pays off
+            again = np.flatnonzero(stuck)
+            if not progress or again.size * RETARGET_CELLS < counts.size:
+                break
+            taken = np.concatenate(late)
+            target[again] = self._retarget(x[again], y[again], again,
+                                           new_x[taken], new_y[taken])
+            stuck[again] = False
+            progress = False
+        return pending, target, late
+
+    def _draw(self, movers):
+        # The next values of every mover's stream, as a Searcher reads them;
+        # step() moves past those read once the moves are known
+        return draws(self.streams[movers, None], self.drawn[movers, None] + _DRAWS)
+
+    def _frontier(self, j, x, y):
+        # Nearest frontier cells of movers j at the start of the tick
+        return self.visits.nearest_frontiers(x[j], y[j])
+
+    def _retarget(self, x, y, rows, taken_x, taken_y):
+        # Nearest frontier cells of movers ``rows``, skipping those taken by
+        # lower-indexed movers: the nearest untaken one, or a taken one that
+        # only higher-indexed movers reached
+        h = self.env.height
+        span = self.env.width * h
+        frontier = self.visits.frontier.copy()
+        frontier[taken_x, taken_y] = False
+        found = nearest_cells(frontier)[x, y]
+        fx, fy = np.divmod(found, h)
+        reach = np.where(found >= 0, np.abs(x - fx) + np.abs(y - fy), span)
+        best = np.where(found >= 0, reach * span + found, _FAR)
+
+        # Only taken cells in the columns within that distance can beat it
+        by = self._landed[taken_x, taken_y]
+        sort = np.argsort(taken_x, kind="stable")
+        taken_x, taken_y, by = taken_x[sort], taken_y[sort], by[sort]
+        lo = np.searchsorted(taken_x, x - reach, side="left")
+        count = np.searchsorted(taken_x, x + reach, side="right") - lo
+        ends = np.cumsum(count)
+        start = 0
+        while start < x.size:
+            # Rows whose pairs fit in one chunk, at least one row
+            base = ends[start] - count[start]
+            stop = max(start + 1, int(np.searchsorted(ends, base + RETARGET_CHUNK, side="right")))
+            n = count[start:stop]
+            row = np.repeat(np.arange(start, stop), n)
+            k = np.arange(ends[stop - 1] - base) - np.repeat(ends[start:stop] - n - base, n)
+            k += np.repeat(lo[start:stop], n)
+            key = ((np.abs(x[row] - taken_x[k]) + np.abs(y[row] - taken_y[k])) * span
+                   + taken_x[k] * h + taken_y[k])
+            key = np.where(by[k] > rows[row], key, _FAR)
+            np.minimum.at(best, row, key)
+            start = stop
+        return np.where(best < _FAR, best % span, -1)
+
+    def _choose(self, movers, x, y, u):
+        new_x, new_y, moved, saturated, back = choose_search(
+            x, y, self.last_x[movers], self.last_y[movers], self.free, self.visits.counts, u)
+        self._rescue(movers, x, y, u, new_x, new_y, moved, back)
+        return new_x, new_y, moved, saturated, back
+
+    def _rescue(self, movers, x, y, u, new_x, new_y, moved, back):
+        # Rescue: downhill on the distance field, else any free neighbour
+        tx, ty = self.target_x[movers], self.target_y[movers]
+        r = np.flatnonzero((self.mode[movers] == RESCUE) & (tx >= 0))
+        if r.size == 0:
+            return
+        rx, ry = x[r], y[r]
+        cx = rx[:, None] + DX
+        cy = ry[:, None] + DY
+        valid = self.free[cx + 1, cy + 1]
+
+        k = self._directions(rx, ry, tx[r], ty[r])
+        on_field = k != NO_STEP
+        fallback = _nth(valid, u[r, 0])
+        rows = np.arange(r.size)
+        new_x[r] = np.where(on_field, rx + OFFSETS[k, 0], cx[rows, fallback])
+        new_y[r] = np.where(on_field, ry + OFFSETS[k, 1], cy[rows, fallback])
+        moved[r] = on_field | valid.any(axis=1)
+        back[r] = False
+
+    def _directions(self, x, y, tx, ty):
+        # One distance field per distinct target, shared by everyone heading there
+        k = np.full(x.size, NO_STEP, dtype=np.int8)
+        key = tx * self.env.height + ty
+        for target in np.unique(key).tolist():
+            sel = key == target
+            field = distance_field(self.env, divmod(target, self.env.height))
+            k[sel] = field.direction[x[sel], y[sel]]
+        return k
+
+    def _lowest_near(self, x, y, offsets):
+        # Lowest unresolved mover index around each (x, y)
+        lowest = self._lowest
+        return lowest[x[:, None] + 2 + offsets[:, 0], y[:, None] + 2 + offsets[:, 1]].min(axis=1)
+
+    def _apply(self, idx, new_x, new_y):
+        self.last_x[idx] = self.x[idx]
+        self.last_y[idx] = self.y[idx]
+        self.x[idx] = new_x
+        self.y[idx] = new_y
+        self.steps[idx] += 1
+        if self.metrics is not None:
+            self.metrics.searcher_moves(self.visits.counts[new_x, new_y],
+                                        new_x * self.env.height + new_y)
+        self.visits.add_visits(new_x, new_y)
+
+    def _step_one(self, i, u, hint=None):
+        # Returns whether the second stream value was read
+        x, y = int(self.x[i]), int(self.y[i])
+        free = self.free
+        options = [(x + dx, y + dy) for dx, dy in _DIRS if free[x + dx + 1, y + dy + 1]]
+        if not options:
+            return False
+
+        counts = [self.visits[p] for p in options]
+        if min(counts) > 0:
+            self._close_late(i)
+        best = frontier_options(options, counts, (x, y), self.visits, hint)
+        u_first, u_other = u.tolist()
+        chosen = pick(best, u_first)
+
+        last = (int(self.last_x[i]), int(self.last_y[i]))
+        back = chosen == last and len(options) > 1
+        if back:
+            chosen = pick([p for p in options if p != last], u_other)
+
+        self._apply_one(i, *chosen)
+        return back
+
+    def _apply_one(self, i, new_x, new_y):
+        self.last_x[i] = self.x[i]
+        self.last_y[i] = self.y[i]
+        self.x[i] = new_x
+        self.y[i] = new_y
+        self.steps[i] += 1
+        shared = self.visits.visit(new_x, new_y)
+        if self.metrics is not None:
+            self.metrics.searcher_move(shared)
+
+    def _close_late(self, i):
+        # Close frontier cells first reached this tick by searchers before i
+        late_idx, late_x, late_y = self._late
+        done = self._late_done
+        upto = int(np.searchsorted(late_idx, i))
+        if upto > done:
+            self.visits.close_frontier(late_x[done:upto], late_y[done:upto])
+            self._late_done = upto
+
+    # DETECTION
+    def arrivals(self, mask):
+        """Indices of searchers still moving that stand on a cell set in ``mask``."""
+        return np.flatnonzero(mask[self.x, self.y] & ~self.at_casualty)
+
+
+class SwarmSearcher:
+    """View of one engine row, shaped like a Searcher for Simulation and the renderer."""
+
+    __slots__ = ("_engine", "_i", "id")
+
+    def __init__(self, engine, index):
+        self._engine = engine
+        self._i = index
+        self.id = int(engine.ids[index])
+
+    @property
+    def x(self):
+        return int(self._engine.x[self._i])
+
+    @property
+    def y(self):
+        return int(self._engine.y[self._i])
+
+    @property
+    def pos(self):
+        return self.x, self.y
+
+    @property
+    def mode(self):
+        return MODE_NAMES[self._engine.mode[self._i]]
+
+    @mode.setter
+    def mode(self, value):
+        self._engine.mode[self._i] = MODE_NAMES.index(value)
+
+    @property
+    def target(self):
+        tx = int(self._engine.target_x[self._i])
+        return None if tx < 0 else (tx, int(self._engine.target_y[self._i]))
+
+    @target.setter
+    def target(self, value):
+        self._engine.target_x[self._i], self._engine.target_y[self._i] = value or (-1, -1)
+
+    @property
+    def steps_taken(self):
+        return int(self._engine.steps[self._i])
+
+    @property
+    def at_casualty(self):
+        return bool(self._engine.at_casualty[self._i])
+
+    @at_casualty.setter
+    def at_casualty(self, value):
+        self._engine.at_casualty[self._i] = value
+
+    @property
+    def has_found(self):
+        return bool(self._engine.has_found[self._i])
+
+    @has_found.setter
+    def has_found(self, value):
+        self._engine.has_found[self._i] = value
+
+    @property
+    def arrival_time(self):
+        t = self._engine.arrival_time[self._i]
+        return None if np.isnan(t) else t.item()
+
+    @arrival_time.setter
+    def arrival_time(self, value):
+        self._engine.arrival_time[self._i] = np.nan if value is None else value
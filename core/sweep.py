@@ -0,0 +1,248 @@
+"""Resumable parameter sweeps over headless episodes.
+
+Every (config, seed) pair is identified by a hash of its fully specified
+config, so results are addressed by content: a pair already present in the
+results store is never run again, whichever sweep produced it. New results
+are appended to the store as columnar ``part-*.npz`` files, written
+atomically every ``FLUSH_EVERY`` episodes, so an interrupted sweep keeps
+what it finished and an extended one only runs the new cells.
+
+    python -m core.sweep results/ --seeds 200 \\
+        --grid num_searchers=3,5,10 --grid obstacle_ratio=0.05,0.1,0.2
+"""
+import argparse
+import glob
+import hashlib
+import itertools
+import json
+import os
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from agents.drone import DRONE_VISION_RADIUS
+from core.batch import DEFAULT_MAX_STEPS, run_episode
+from core.constants import GRID_HEIGHT, GRID_WIDTH
+from core.environment import OBSTACLE_RATIO
+from core.simulation import NUM_CASUALTIES, NUM_DRONES, NUM_SEARCHERS
+
+# Every sweepable parameter and its default; part of each pair's identity
+PARAMS = {
+    "num_searchers": NUM_SEARCHERS,
+    "drone_vision_radius": DRONE_VISION_RADIUS,
+    "obstacle_ratio": OBSTACLE_RATIO,
+    "width": GRID_WIDTH,
+    "height": GRID_HEIGHT,
+    "num_casualties": NUM_CASUALTIES,
+    "num_drones": NUM_DRONES,
+    "drone_mode": "random",
+    "engine": "objects",
+    "max_steps": DEFAULT_MAX_STEPS,
+}
+
+METRICS = ("steps", "time_to_find", "all_rescued_time", "found_by")
+
+# Bump when simulation behaviour changes so old results stop matching
+SWEEP_VERSION = 3
+
+FLUSH_EVERY = 256
+
+
+# CONFIGS AND KEYS
+def expand(grid):
+    """Full configs for the cartesian product of ``grid`` (param -> values)."""
+    unknown = set(grid) - set(PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+    names = sorted(grid)
+    for values in itertools.product(*(grid[n] for n in names)):
+        yield dict(PARAMS, **dict(zip(names, values)))
+
+
+def pair_key(config, seed):
+    blob = json.dumps({"config": config, "seed": seed, "version": SWEEP_VERSION},
+                      sort_keys=True)
+    return hashlib.sha256(blob.encode()).digest()
+
+
+# RESULTS STORE
+class SweepStore:
+    """Directory of columnar result parts, one row per (config, seed) pair."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._keys = None
+
+    def parts(self):
+        return sorted(glob.glob(os.path.join(self.path, "part-*.npz")))
+
+    def keys(self):
+        if self._keys is None:
+            self._keys = set()
+            for part in self.parts():
+                with np.load(part) as data:
+                    self._keys.update(data["key"].tolist())
+        return self._keys
+
+    def append(self, rows):
+        if not rows:
+            return
+        columns = {"key": np.array([r["key"] for r in rows], dtype="S32"),
+                   "seed": np.array([r["seed"] for r in rows], dtype=np.int64)}
+        for name in PARAMS:
+            columns[name] = np.array([r["config"][name] for r in rows])
+        for name in METRICS:
+            values = [r[name] for r in rows]
+            if name == "found_by":
+                columns[name] = np.array([v or "" for v in values])
+            else:
+                columns[name] = np.array([np.nan if v is None else v for v in values],
+                                         dtype=np.float64)
+
+        parts = self.parts()
+        n = int(os.path.basename(parts[-1])[5:-4]) + 1 if parts else 0
+        final = os.path.join(self.path, f"part-{n:06d}.npz")
+        tmp = final + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, **columns)
+        os.replace(tmp, final)
+        self.keys().update(columns["key"].tolist())
+
+    def load(self):
+        """All parts concatenated into one dict of columns."""
+        parts = [np.load(p) for p in self.parts()]
+        if not parts:
+            return {}
+        try:
+            return {name: np.concatenate([p[name] for p in parts]) for name in parts[0].files}
+        finally:
+            for p in parts:
+                p.close()
+
+    def compact(self):
+        """Merge every part into one."""
+        old = self.parts()
+        if len(old) < 2:
+            return
+        columns = self.load()
+        tmp = os.path.join(self.path, "compact.tmp")
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, **columns)
+
+        # Replace the first part, then drop the rest: a crash in between
+        # leaves duplicate rows, never missing ones
+        os.replace(tmp, old[0])
+        for p in old[1:]:
+            os.remove(p)
+
+
+# RUNNING
+def _run_pair(pair):
+    config, seed = pair
+    kwargs = dict(config)
+    max_steps = kwargs.pop("max_steps")
+    result = run_episode(seed, max_steps, **kwargs)
+    return {name: result[name] for name in METRICS}
+
+
+def run_sweep(store, grid, seeds, workers=None, flush_every=FLUSH_EVERY):
+    """Run every missing (config, seed) pair; returns (ran, skipped)."""
+    done = store.keys()
+    todo, skipped = [], 0
+    for config in expand(grid):
+        for seed in seeds:
+            key = pair_key(config, seed)
+            if key in done:
+                skipped += 1
+            else:
+                todo.append((key, config, seed))
+
+    pending = []
+
+    def collect(item, result):
+        key, config, seed = item
+        pending.append(dict(result, key=key, config=config, seed=seed))
+        if len(pending) >= flush_every:
+            store.append(pending)
+            pending.clear()
+
+    try:
+        pairs = [(config, seed) for _, config, seed in todo]
+        if workers == 1:
+            for item, pair in zip(todo, pairs):
+                collect(item, _run_pair(pair))
+        elif todo:
+            workers = workers or os.cpu_count() or 1
+            chunksize = max(1, len(todo) // (workers * 8))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for item, result in zip(todo, pool.map(_run_pair, pairs, chunksize=chunksize)):
+                    collect(item, result)
+    finally:
+        # Keep whatever finished, also when interrupted
+        store.append(pending)
+
+    return len(todo), skipped
+
+
+# SUMMARY
+def summarize(columns, grid):
+    """Mean outcomes per swept config over the stored rows that match it."""
+    rows = []
+    size = columns["seed"].size if columns else 0
+    for config in expand(grid):
+        match = np.ones(size, dtype=bool)
+        for name, value in config.items():
+            if size:
+                match &= columns[name] == value
+        summary = {name: config[name] for name in sorted(grid)}
+        summary["episodes"] = int(match.sum())
+        for metric in ("time_to_find", "all_rescued_time"):
+            values = columns[metric][match] if size else np.zeros(0)
+            values = values[~np.isnan(values)]
+            summary[metric] = statistics.fmean(values.tolist()) if values.size else None
+        rows.append(summary)
+    return rows
+
+
+def _parse_grid(specs):
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        parsed = []
+        for token in values.split(","):
+            try:
+                parsed.append(json.loads(token))
+            except ValueError:
+                parsed.append(token)
+        grid[name] = parsed
+    return grid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a resumable parameter sweep.")
+    parser.add_argument("store", help="results directory; reused across runs")
+    parser.add_argument("--grid", action="append", default=[],
+                        help="param=v1,v2,... (repeatable); params: " + ", ".join(PARAMS))
+    parser.add_argument("--seeds", type=int, default=100, help="seeds 0..N-1 per config")
+    parser.add_argument("--seed", type=int, default=0, help="first seed")
+    parser.add_argument("--workers", type=int, default=None, help="defaults to all cores")
+    parser.add_argument("--compact", action="store_true", help="merge result parts afterwards")
+    args = parser.parse_args(argv)
+
+    grid = _parse_grid(args.grid)
+    store = SweepStore(args.store)
+    seeds = range(args.seed, args.seed + args.seeds)
+
+    ran, skipped = run_sweep(store, grid, seeds, args.workers)
+    print(f"Ran {ran} episodes, {skipped} already cached")
+    if args.compact:
+        store.compact()
+
+    for row in summarize(store.load(), grid):
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,474 @@
+"""Compact append-only binary traces of a run, with memory-mapped replay.
+
+File layout::
+
+    magic | uint32 header length | JSON header | packed obstacle bitmap
+    [keyframe 0][record 0 .. K-1][keyframe 1][record K .. 2K-1] ...
+
+Every record has the same size, and a keyframe (the full shared visit map)
+is written in front of every K-th record. The offset of any step is
+therefore a closed-form expression. Visit counts at step ``n`` are the
+keyframe at or before ``n`` plus the moves of the fewer than K records
+after it; a move is a searcher whose step count went up.
+
+Obstacle changes go to an append-only sidecar, ``<trace>.obstacles``, as
+int32 rows of (record, x, y, blocked), in the order they were made. The
+bitmap in the header is the map before the first record.
+
+    python -m core.trace record run.trace --seed 7 --steps 5000
+    python -m renderer.replay run.trace
+"""
+import argparse
+import json
+import struct
+
+import numpy as np
+
+from agents.drone import DRONE_VISION_RADIUS
+from core.environment import Environment
+from core.swarm import MODE_NAMES
+from core.visits import VisitMap
+
+MAGIC = b"SRTRACE2"
+KEYFRAME_INTERVAL = 256
+OBSTACLES_SUFFIX = ".obstacles"
+
+_MODE_CODES = {name: code for code, name in enumerate(MODE_NAMES)}
+
+# Casualty state bits
+FOUND = 1
+RESCUED = 2
+
+
+def record_dtype(num_searchers, num_casualties=1, num_drones=1):
+    n, m, k = num_searchers, num_casualties, num_drones
+    return np.dtype([
+        ("step", "<u4"),
+        ("time", "<f8"),
+        ("time_to_find", "<f8"),
+        ("all_rescued_time", "<f8"),
+        ("found_by", "<i4"),
+        ("running", "u1"),
+        ("casualty", "<u2", (m, 2)),
+        ("casualty_state", "u1", (m,)),
+        ("drone", "<u2", (k, 2)),
+        ("drone_found", "u1", (k,)),
+        ("drone_steps", "<u4", (k,)),
+        ("x", "<u2", (n,)),
+        ("y", "<u2", (n,)),
+        ("mode", "u1", (n,)),
+        ("target", "<i4", (n, 2)),
+        ("at_casualty", "u1", (n,)),
+        ("steps", "<u4", (n,)),
+        ("arrival", "<f4", (n,)),
+    ])
+
+
+def _encode_found_by(found_by):
+    if found_by is None:
+        return -1
+    if found_by == "Drone":
+        return 0
+    return int(found_by[1:])
+
+
+def _decode_found_by(code):
+    if code < 0:
+        return None
+    if code == 0:
+        return "Drone"
+    return f"S{code}"
+
+
+def _nan(value):
+    return np.nan if value is None else value
+
+
+def _last_change(rows, height):
+    """Unique cells among obstacle ``rows`` and the last value written to each."""
+    flat = (rows[:, 1].astype(np.int64) * height + rows[:, 2])[::-1]
+    cells, first = np.unique(flat, return_index=True)
+    return cells // height, cells % height, rows[::-1, 3][first].astype(bool)
+
+
+# WRITER
+class TraceWriter:
+    def __init__(self, path, sim, keyframe_interval=KEYFRAME_INTERVAL):
+        env = sim.env
+        if max(env.width, env.height) > np.iinfo(np.uint16).max:
+            raise ValueError("Trace coordinates are stored as uint16")
+
+        self.keyframe_interval = keyframe_interval
+        self.dtype = record_dtype(len(sim.searchers), len(sim.casualties), len(sim.drones))
+        self.count = 0
+        self._record = np.zeros((), dtype=self.dtype)
+
+        header = json.dumps({
+            "width": env.width,
+            "height": env.height,
+            "num_searchers": len(sim.searchers),
+            "searcher_ids": [s.id for s in sim.searchers],
+            "num_casualties": len(sim.casualties),
+            "drone_ids": [d.id for d in sim.drones],
+            "drone_vision_radius": [d.vision_radius for d in sim.drones],
+            "keyframe_interval": keyframe_interval,
+            "step_seconds": getattr(sim, "step_seconds", 1),
+        }).encode()
+
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+        self.file.write(struct.pack("<I", len(header)))
+        self.file.write(header)
+        self.file.write(np.packbits(env.blocked, axis=None).tobytes())
+
+        # OBSTACLES: compared against the map as last written
+        self.path = path
+        self.env = env
+        self.version = env.version
+        self.blocked = env.blocked.copy()
+        self.obstacles = None
+
+    def _write_obstacles(self, env):
+        changes = env.changes_since(self.version) if env is self.env else None
+        if changes is None:
+            xs, ys = np.nonzero(env.blocked != self.blocked)
+        else:
+            xs, ys = changes
+            xs, ys = np.unique(np.stack([xs, ys]), axis=1)
+            keep = env.blocked[xs, ys] != self.blocked[xs, ys]
+            xs, ys = xs[keep], ys[keep]
+        self.env = env
+        self.version = env.version
+        if not xs.size:
+            return
+
+        value = env.blocked[xs, ys]
+        self.blocked[xs, ys] = value
+        rows = np.stack([np.full(xs.size, self.count), xs, ys, value], axis=1)
+        if self.obstacles is None:
+            self.obstacles = open(self.path + OBSTACLES_SUFFIX, "wb")
+        self.obstacles.write(rows.astype("<i4").tobytes())
+        self.obstacles.flush()
+
+    def write(self, sim):
+        """Append the current state of ``sim`` as the next step."""
+        if sim.env is not self.env or sim.env.version != self.version:
+            self._write_obstacles(sim.env)
+
+        r = self._record
+        r["step"] = sim.step_count
+        r["time"] = sim.now() if sim.start_time is not None else 0.0
+        r["time_to_find"] = _nan(sim.time_to_find)
+        r["all_rescued_time"] = _nan(sim.all_rescued_time)
+        r["found_by"] = _encode_found_by(sim.found_by)
+        r["running"] = sim.running
+        r["casualty"] = [c.pos for c in sim.casualties]
+        r["casualty_state"] = [FOUND * c.found | RESCUED * c.rescued for c in sim.casualties]
+        r["drone"] = [d.pos for d in sim.drones]
+        r["drone_found"] = [d.has_found for d in sim.drones]
+        r["drone_steps"] = [d.steps_taken for d in sim.drones]
+
+        swarm = getattr(sim, "swarm", None)
+        if swarm is not None:
+            r["x"], r["y"], r["mode"] = swarm.x, swarm.y, swarm.mode
+            r["target"][:, 0], r["target"][:, 1] = swarm.target_x, swarm.target_y
+            r["at_casualty"], r["steps"] = swarm.at_casualty, swarm.steps
+            r["arrival"] = swarm.arrival_time
+        else:
+            searchers = sim.searchers
+            r["x"] = [s.x for s in searchers]
+            r["y"] = [s.y for s in searchers]
+            r["mode"] = [_MODE_CODES[s.mode] for s in searchers]
+            r["target"] = [s.target or (-1, -1) for s in searchers]
+            r["at_casualty"] = [s.at_casualty for s in searchers]
+            r["steps"] = [s.steps_taken for s in searchers]
+            r["arrival"] = [_nan(s.arrival_time) for s in searchers]
+
+        if self.count % self.keyframe_interval == 0:
+            counts = sim.shared_visit_count.counts
+            self.file.write(counts.astype("<u4", copy=False).tobytes())
+        self.file.write(r.tobytes())
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+        if self.obstacles is not None:
+            self.obstacles.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# READER
+class TraceReader:
+    def __init__(self, path):
+        self.path = path
+        self.raw = np.memmap(path, dtype=np.uint8, mode="r")
+
+        if bytes(self.raw[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not a trace file")
+        pos = len(MAGIC)
+        (header_len,) = struct.unpack("<I", bytes(self.raw[pos:pos + 4]))
+        pos += 4
+        self.header = json.loads(bytes(self.raw[pos:pos + header_len]))
+        pos += header_len
+
+        self.width = self.header["width"]
+        self.height = self.header["height"]
+        self.keyframe_interval = self.header["keyframe_interval"]
+        cells = self.width * self.height
+
+        bitmap = np.unpackbits(self.raw[pos:pos + (cells + 7) // 8], count=cells)
+        self.blocked = bitmap.astype(bool).reshape(self.width, self.height)
+        pos += (cells + 7) // 8
+
+        self.dtype = record_dtype(self.header["num_searchers"], self.header["num_casualties"],
+                                  len(self.header["drone_ids"]))
+        self.record_size = self.dtype.itemsize
+        self.keyframe_size = cells * 4
+        self.data_start = pos
+        self.load_obstacles()
+
+    def load_obstacles(self):
+        """(record, x, y, blocked) rows of the obstacle sidecar; empty without one."""
+        try:
+            data = np.fromfile(self.path + OBSTACLES_SUFFIX, dtype="<i4")
+        except FileNotFoundError:
+            data = np.zeros(0, dtype="<i4")
+        # A row still being written is left for the next load
+        self.obstacles = data[:data.size - data.size % 4].reshape(-1, 4)
+        return self.obstacles
+
+    def __len__(self):
+        # Only whole records count, so a trace still being written is readable
+        group = self.keyframe_size + self.keyframe_interval * self.record_size
+        size = self.raw.size - self.data_start
+        full, rest = divmod(size, group)
+        partial = max(0, rest - self.keyframe_size) // self.record_size
+        return full * self.keyframe_interval + partial
+
+    def _record_offset(self, i):
+        keyframes = i // self.keyframe_interval + 1
+        return self.data_start + keyframes * self.keyframe_size + i * self.record_size
+
+    def record(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return np.ndarray((), dtype=self.dtype, buffer=self.raw, offset=self._record_offset(i))
+
+    def keyframe(self, g):
+        offset = self.data_start + g * (self.keyframe_size + self.keyframe_interval * self.record_size)
+        flat = np.ndarray(self.width * self.height, dtype="<u4", buffer=self.raw, offset=offset)
+        return flat.reshape(self.width, self.height)
+
+    def visits(self, i):
+        """Shared visit counts after step ``i``."""
+        base = i - i % self.keyframe_interval
+        counts = self.keyframe(base // self.keyframe_interval).astype(np.int32)
+
+        prev = self.record(base)
+        for j in range(base + 1, i + 1):
+            rec = self.record(j)
+            moved = rec["steps"] > prev["steps"]
+            np.add.at(counts, (rec["x"][moved], rec["y"][moved]), 1)
+            prev = rec
+        return counts
+
+
+# REPLAY
+class ReplaySearcher:
+    __slots__ = ("id", "x", "y", "mode", "at_casualty", "has_found", "steps_taken",
+                 "arrival_time", "target")
+
+    @property
+    def pos(self):
+        return self.x, self.y
+
+
+class ReplayAgent:
+    __slots__ = ("id", "x", "y", "has_found", "steps_taken", "vision_radius")
+
+    @property
+    def pos(self):
+        return self.x, self.y
+
+
+class ReplayCasualty:
+    __slots__ = ("id", "x", "y", "found", "rescued")
+
+    @property
+    def pos(self):
+        return self.x, self.y
+
+
+class TraceReplay:
+    """Simulation look-alike driven by a trace, so the Renderer can draw it."""
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.env = Environment.from_blocked(reader.blocked)
+        self.shared_visit_count = VisitMap(self.env)
+        self.casualties = []
+        for i in range(reader.header["num_casualties"]):
+            c = ReplayCasualty()
+            c.id = i
+            self.casualties.append(c)
+        self.casualty = self.casualties[0]
+
+        self.drones = []
+        # Traces written before radii were recorded get the default
+        ids = reader.header["drone_ids"]
+        radii = reader.header.get("drone_vision_radius", [DRONE_VISION_RADIUS] * len(ids))
+        for did, radius in zip(ids, radii):
+            d = ReplayAgent()
+            d.id = did
+            d.vision_radius = radius
+            self.drones.append(d)
+        self.drone = self.drones[0] if self.drones else None
+
+        self.searchers = []
+        for sid in reader.header["searcher_ids"]:
+            s = ReplaySearcher()
+            s.id = sid
+            self.searchers.append(s)
+
+        self.running = False
+        self.start_time = 0.0
+        self._obstacles_applied = 0
+        self.seek(0)
+
+    def seek(self, i):
+        i = max(0, min(i, len(self.reader) - 1))
+        self.index = i
+        r = self.reader.record(i)
+        self._seek_obstacles(i)
+
+        self.step_count = int(r["step"])
+        self.time = float(r["time"])
+        self.time_to_find = None if np.isnan(r["time_to_find"]) else float(r["time_to_find"])
+        self.all_rescued_time = None if np.isnan(r["all_rescued_time"]) else float(r["all_rescued_time"])
+        self.found_by = _decode_found_by(int(r["found_by"]))
+
+        for c, (x, y), state in zip(self.casualties, r["casualty"].tolist(),
+                                    r["casualty_state"].tolist()):
+            c.x, c.y = x, y
+            c.found = bool(state & FOUND)
+            c.rescued = bool(state & RESCUED)
+        self.unfound = sum(not c.found for c in self.casualties)
+
+        columns = zip(r["drone"].tolist(), r["drone_found"].tolist(), r["drone_steps"].tolist())
+        for d, ((x, y), found, steps) in zip(self.drones, columns):
+            d.x, d.y = x, y
+            d.has_found = bool(found)
+            d.steps_taken = steps
+
+        columns = zip(r["x"].tolist(), r["y"].tolist(), r["mode"].tolist(), r["target"].tolist(),
+                      r["at_casualty"].tolist(), r["steps"].tolist(), r["arrival"].tolist())
+        for s, (x, y, mode, target, at, steps, arrival) in zip(self.searchers, columns):
+            s.x, s.y = x, y
+            s.mode = MODE_NAMES[mode]
+            s.target = None if target[0] < 0 else tuple(target)
+            s.at_casualty = s.has_found = bool(at)
+            s.steps_taken = steps
+            s.arrival_time = None if arrival != arrival else arrival
+
+        self.shared_visit_count.set_counts(self.reader.visits(i))
+
+    def _seek_obstacles(self, i):
+        # Through the environment API, so the renderer repaints only changed cells
+        rows = self.reader.obstacles
+        upto = int(np.searchsorted(rows[:, 0], i, side="right"))
+        if upto == self._obstacles_applied:
+            return
+        h = self.env.height
+        if upto > self._obstacles_applied:
+            xs, ys, value = _last_change(rows[self._obstacles_applied:upto], h)
+        else:
+            # Back to the header map, then to the last value before ``upto``
+            xs, ys, _ = _last_change(rows[upto:self._obstacles_applied], h)
+            value = self.reader.blocked[xs, ys]
+            earlier = rows[:upto]
+            earlier = earlier[np.isin(earlier[:, 1].astype(np.int64) * h + earlier[:, 2], xs * h + ys)]
+            if earlier.size:
+                ex, ey, evalue = _last_change(earlier, h)
+                value[np.searchsorted(xs * h + ys, ex * h + ey)] = evalue
+        self.env.set_blocked(xs[value], ys[value], True)
+        self.env.set_blocked(xs[~value], ys[~value], False)
+        self._obstacles_applied = upto
+
+    # Same controls as Simulation
+    def toggle(self):
+        self.running = not self.running
+
+    def reset(self):
+        self.seek(0)
+
+    def update(self):
+        if self.running and self.index + 1 < len(self.reader):
+            self.seek(self.index + 1)
+
+    def now(self):
+        return self.time
+
+    @property
+    def finished(self):
+        return self.index + 1 >= len(self.reader)
+
+    @property
+    def elapsed_time(self):
+        if self.time_to_find is not None:
+            return self.time_to_find
+        return self.time
+
+
+# RECORDING
+def record_episode(path, seed, max_steps, keyframe_interval=KEYFRAME_INTERVAL, **sim_kwargs):
+    from core.simulation import Simulation
+
+    sim = Simulation(step_clock=True, seed=seed, **sim_kwargs)
+    sim.start()
+    with TraceWriter(path, sim, keyframe_interval) as writer:
+        writer.write(sim)
+        while not sim.finished and sim.step_count < max_steps:
+            sim.update()
+            writer.write(sim)
+    return sim
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record a headless episode to a trace file.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record")
+    rec.add_argument("path")
+    rec.add_argument("--seed", type=int, default=0)
+    rec.add_argument("--steps", type=int, default=5000)
+    rec.add_argument("--searchers", type=int, default=None)
+    rec.add_argument("--casualties", type=int, default=None)
+    rec.add_argument("--drones", type=int, default=None)
+    rec.add_argument("--engine", default="objects", choices=("objects", "swarm"))
+    rec.add_argument("--keyframe-interval", type=int, default=KEYFRAME_INTERVAL)
+
+    info = sub.add_parser("info")
+    info.add_argument("path")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        kwargs = {"engine": args.engine}
+        for name in ("searchers", "casualties", "drones"):
+            if getattr(args, name) is not None:
+                kwargs[f"num_{name}"] = getattr(args, name)
+        sim = record_episode(args.path, args.seed, args.steps, args.keyframe_interval, **kwargs)
+        print(f"Recorded {sim.step_count + 1} steps to {args.path}")
+    else:
+        reader = TraceReader(args.path)
+        print(json.dumps(dict(reader.header, steps=len(reader), obstacle_changes=len(reader.obstacles)),
+                         indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""Dense shared visit map with an incrementally maintained frontier index.
+
+The frontier is the set of free cells no searcher has visited yet. Besides
+the per-cell ``frontier`` mask, the grid is split into square blocks and each
+block keeps how many frontier cells it still holds. ``nearest_frontier``
+searches growing windows of blocks around the query and, inside a window,
+only scans blocks that can still beat the best candidate found so far.
+``nearest_frontiers`` answers many queries at once from a Manhattan
+distance transform of the whole frontier, kept until the frontier changes.
+
+``VisitCounts`` is the private memory of one searcher: uint16 counts in
+small tiles, allocated only where the searcher has been.
+"""
+from array import array
+
+import numpy as np
+
+FRONTIER_BLOCK = 16
+
+# Grid cells per query above which one distance transform beats lookups
+FIELD_CELLS_PER_QUERY = 1000
+_FAR = np.int64(1) << 62
+
+# Per-agent memory tiles are 2**TILE_BITS cells a side
+TILE_BITS = 3
+TILE_MASK = (1 << TILE_BITS) - 1
+COUNT_MAX = 0xFFFF
+_EMPTY_TILE = bytes(2 << (2 * TILE_BITS))
+
+
+class VisitMap:
+    def __init__(self, env, block=FRONTIER_BLOCK):
+        self.env = env
+        self.width = env.width
+        self.height = env.height
+        self.block = block
+
+        self.counts = np.zeros((self.width, self.height), dtype=np.int32)
+        self.frontier = np.zeros((self.width, self.height), dtype=bool)
+        self.block_frontier = np.zeros((-(-self.width // block), -(-self.height // block)),
+                                       dtype=np.int64)
+
+        # Flat indices of visited cells, recorded only while a list is attached
+        # (by the heatmap overlay); epoch changes when counts are reset wholesale
+        self.log = None
+        self.epoch = 0
+        self._nearest = None
+        self.clear()
+
+    # MAPPING-STYLE ACCESS
+    def __getitem__(self, pos):
+        return int(self.counts[pos])
+
+    def get(self, pos, default=0):
+        x, y = pos
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return int(self.counts[x, y])
+        return default
+
+    def clear(self):
+        self.set_counts(0)
+
+    def set_counts(self, counts):
+        self.counts[...] = counts
+        self.epoch += 1
+        self._nearest = None
+        self.frontier[...] = ~self.env.blocked & (self.counts == 0)
+
+        b = self.block
+        nbx = -(-self.width // b)
+        nby = -(-self.height // b)
+        padded = np.zeros((nbx * b, nby * b), dtype=np.int32)
+        padded[:self.width, :self.height] = self.frontier
+        self.block_frontier[...] = padded.reshape(nbx, b, nby, b).sum(axis=(1, 3))
+
+    def update_cells(self, xs, ys):
+        """Re-derive the frontier of cells whose obstacle state changed."""
+        now = ~self.env.blocked[xs, ys] & (self.counts[xs, ys] == 0)
+        delta = now.astype(np.int64) - self.frontier[xs, ys]
+        self.frontier[xs, ys] = now
+        self._nearest = None
+        np.add.at(self.block_frontier, (xs // self.block, ys // self.block), delta)
+
+    # UPDATES
+    def visit(self, x, y):
+        """Count a visit; returns the count the cell had before."""
+        c = self.counts[x, y]
+        self.counts[x, y] = c + 1
+        if self.log is not None:
+            self.log.append(x * self.height + y)
+        if self.frontier[x, y]:
+            self.frontier[x, y] = False
+            self._nearest = None
+            self.block_frontier[x // self.block, y // self.block] -= 1
+        return c
+
+    def add_visits(self, xs, ys):
+        # Counts only; the caller decides when these cells leave the frontier
+        np.add.at(self.counts, (xs, ys), 1)
+        if self.log is not None:
+            self.log.extend((xs * self.height + ys).tolist())
+
+    def close_frontier(self, xs, ys):
+        keep = self.frontier[xs, ys]
+        if not keep.any():
+            return
+        flat = np.unique(xs[keep] * self.height + ys[keep])
+        xs, ys = flat // self.height, flat % self.height
+        self.frontier[xs, ys] = False
+        self._nearest = None
+        np.subtract.at(self.block_frontier, (xs // self.block, ys // self.block), 1)
+
+    # QUERIES
+    def nearest_frontier(self, x, y):
+        """Closest frontier cell by Manhattan distance, ties broken by (x, y)."""
+        b = self.block
+        nbx, nby = self.block_frontier.shape
+        bx, by = x // b, y // b
+
+        # Search growing windows of blocks; stop once nothing outside can win
+        r = 2
+        while True:
+            x0, x1 = max(0, bx - r), min(nbx, bx + r + 1)
+            y0, y1 = max(0, by - r), min(nby, by + r + 1)
+            found = self._nearest_in_window(x0, x1, y0, y1, x, y)
+            whole = x0 == 0 and y0 == 0 and x1 == nbx and y1 == nby
+            if whole:
+                return found and found[1]
+
+            # Any cell outside the window is at least this far away
+            margin = min(x - x0 * b + 1 if x0 else self.width,
+                         x1 * b - x if x1 < nbx else self.width,
+                         y - y0 * b + 1 if y0 else self.height,
+                         y1 * b - y if y1 < nby else self.height)
+            if found and found[0] // (self.width * self.height) < margin:
+                return found[1]
+            r *= 2
+
+    def nearest_frontiers(self, xs, ys):
+        """Flat index x * height + y of ``nearest_frontier`` per query, -1 for none."""
+        if xs.size * FIELD_CELLS_PER_QUERY < self.width * self.height and self._nearest is None:
+            found = [self.nearest_frontier(x, y) for x, y in zip(xs.tolist(), ys.tolist())]
+            return np.array([-1 if c is None else c[0] * self.height + c[1] for c in found],
+                            dtype=np.int64)
+        if self._nearest is None:
+            self._nearest = nearest_cells(self.frontier)
+        return self._nearest[xs, ys]
+
+    def _nearest_in_window(self, x0, x1, y0, y1, x, y):
+        bxs, bys = np.nonzero(self.block_frontier[x0:x1, y0:y1])
+        if bxs.size == 0:
+            return None
+        bxs += x0
+        bys += y0
+
+        # Lower bound on the distance from (x, y) to any cell of each block
+        b = self.block
+        gap_x = np.maximum(0, np.maximum(bxs * b - x, x - (bxs * b + b - 1)))
+        gap_y = np.maximum(0, np.maximum(bys * b - y, y - (bys * b + b - 1)))
+        bound = gap_x + gap_y
+
+        # The closest block gives an upper bound; only blocks under it are scanned
+        first = int(np.argmin(bound))
+        best = self._nearest_in_block(bxs[first], bys[first], x, y)
+        span = self.width * self.height
+
+        rest = np.flatnonzero(bound * span <= best[0])
+        for k in rest[np.argsort(bound[rest], kind="stable")].tolist():
+            if k == first:
+                continue
+            if bound[k] * span > best[0]:
+                break
+            found = self._nearest_in_block(bxs[k], bys[k], x, y)
+            if found[0] < best[0]:
+                best = found
+        return best
+
+    def _nearest_in_block(self, bx, by, x, y):
+        b = self.block
+        x0, y0 = bx * b, by * b
+        cx, cy = np.nonzero(self.frontier[x0:x0 + b, y0:y0 + b])
+        cx += x0
+        cy += y0
+        keys = (np.abs(cx - x) + np.abs(cy - y)) * (self.width * self.height) + cx * self.height + cy
+        i = int(np.argmin(keys))
+        return int(keys[i]), (int(cx[i]), int(cy[i]))
+
+
+class VisitCounts:
+    """Sparse visit counts of one agent, saturating at ``COUNT_MAX``.
+
+    Mapping-style like VisitMap: ``counts[pos]`` and ``pos in counts``, with
+    ``len`` and iteration over the distinct cells visited. Coordinates must
+    be non-negative.
+    """
+
+    __slots__ = ("tiles", "cells")
+
+    def __init__(self, cells=()):
+        # (tile x << 32 | tile y) -> array("H") of that tile's counts
+        self.tiles = {}
+        self.cells = 0
+        for x, y in cells:
+            self.add(x, y)
+
+    def add(self, x, y):
+        """Count a visit; returns the count the cell had before."""
+        key = (x >> TILE_BITS) << 32 | (y >> TILE_BITS)
+        tile = self.tiles.get(key)
+        if tile is None:
+            tile = self.tiles[key] = array("H", _EMPTY_TILE)
+        i = (x & TILE_MASK) << TILE_BITS | (y & TILE_MASK)
+        c = tile[i]
+        if c == 0:
+            self.cells += 1
+        if c < COUNT_MAX:
+            tile[i] = c + 1
+        return c
+
+    def copy(self):
+        other = VisitCounts()
+        other.tiles = {key: array("H", tile) for key, tile in self.tiles.items()}
+        other.cells = self.cells
+        return other
+
+    # MAPPING-STYLE ACCESS
+    def __getitem__(self, pos):
+        x, y = pos
+        tile = self.tiles.get((x >> TILE_BITS) << 32 | (y >> TILE_BITS))
+        return 0 if tile is None else tile[(x & TILE_MASK) << TILE_BITS | (y & TILE_MASK)]
+
+    def get(self, pos, default=0):
+        return self[pos] or default
+
+    def __contains__(self, pos):
+        return self[pos] > 0
+
+    def __len__(self):
+        return self.cells
+
+    def __iter__(self):
+        for key, tile in self.tiles.items():
+            x0, y0 = (key >> 32) << TILE_BITS, (key & 0xFFFFFFFF) << TILE_BITS
+            for i, c in enumerate(tile):
+                if c:
+                    yield x0 + (i >> TILE_BITS), y0 + (i & TILE_MASK)
+
+
+def nearest_cells(mask):
+    """Flat index of the set cell of ``mask`` nearest to every cell, -1 for none.
+
+    Manhattan distance, ties broken by (x, y) as in ``nearest_frontier``.
+    """
+    # Keys distance * span + flat index, relaxed along y and then along x:
+    # Manhattan distance is separable
+    w, h = mask.shape
+    span = w * h
+    key = np.where(mask, np.arange(span).reshape(w, h), _FAR)
+    for axis, n in ((1, h), (0, w)):
+        s = np.arange(n, dtype=np.int64) * span
+        if axis == 0:
+            s = s[:, None]
+        ahead = key - s
+        np.minimum.accumulate(ahead, axis=axis, out=ahead)
+        ahead += s
+        key += s
+        behind = np.flip(key, axis)
+        np.minimum.accumulate(behind, axis=axis, out=behind)
+        key -= s
+        np.minimum(ahead, key, out=key)
+    return np.where(key < _FAR // 2, key % span, -1)
+
+
+def frontier_options(options, counts, pos, visits, hint=None):
+    """Options worth taking in search mode.
+
+    Never-visited neighbours win. Once the neighbourhood is saturated, head
+    for the nearest frontier cell, least visited first. ``hint`` is the
+    nearest frontier cell from ``pos`` found earlier in the same tick; the
+    frontier only shrinks within a tick, so it still is while it is open.
+    """
+    low = min(counts)
+    if low == 0:
+        return [p for p, c in zip(options, counts) if c == 0]
+
+    if hint is not None and visits.frontier[hint]:
+        target = hint
+    else:
+        target = visits.nearest_frontier(*pos)
+    if target is not None:
+        tx, ty = target
+        here = abs(pos[0] - tx) + abs(pos[1] - ty)
+        closer = [(p, c) for p, c in zip(options, counts)
+                  if abs(p[0] - tx) + abs(p[1] - ty) < here]
+        if closer:
+            options, counts = zip(*closer)
+            low = min(counts)
+
+    return [p for p, c in zip(options, counts) if c == low]
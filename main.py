@@ -1,25 +1,91 @@
+import argparse
+import math
 import pygame
 import sys
+import time
 
 from core.simulation import Simulation
 from renderer.renderer import Renderer
-from core.constants import WINDOW_WIDTH, WINDOW_HEIGHT
+from renderer.export import FORMATS, FrameWriter
+from core.constants import WINDOW_WIDTH, WINDOW_HEIGHT, GRID_WIDTH, GRID_HEIGHT
+from core.simulation import COMMS_MODES, NUM_SEARCHERS
 
-FPS = 10
+# Simulation steps per second at 1x, independent of how often we draw
+SIM_TICK_RATE = 10
+RENDER_FPS = 30
+FRAME_BUDGET = 1 / RENDER_FPS
 
-def main():
+# Profiling results are written here when a profiled run is closed
+PROFILE_EXPORT = "profile"
+
+# Fast-forward modes; None runs as many steps as fit in a frame
+SPEEDS = {
+    pygame.K_1: 1,
+    pygame.K_2: 10,
+    pygame.K_3: 100,
+    pygame.K_4: None,
+}
+
+def speed_label(speed):
+    return "max" if speed is None else f"{speed}x"
+
+def toggle_obstacle(sim, camera, pos):
+    """Block or clear the cell under the mouse; casualty cells are left alone."""
+    if not camera.view.collidepoint(pos):
+        return
+    x, y = (math.floor(v) for v in camera.to_world(*pos))
+    if not (0 <= x < sim.env.width and 0 <= y < sim.env.height) or sim.casualty_cells[x, y]:
+        return
+    if sim.env.blocked[x, y]:
+        sim.remove_obstacles([(x, y)])
+    else:
+        sim.add_obstacles([(x, y)])
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Search & rescue multi-agent simulation.")
+    parser.add_argument("--width", type=int, default=GRID_WIDTH)
+    parser.add_argument("--height", type=int, default=GRID_HEIGHT)
+    parser.add_argument("--searchers", type=int, default=NUM_SEARCHERS)
+    parser.add_argument("--engine", default="objects", choices=("objects", "swarm"))
+    parser.add_argument("--comms", default="direct", choices=COMMS_MODES)
+    parser.add_argument("--tiles", type=int, default=1,
+                        help="swarm engine: map strips stepped by this many worker processes")
+    parser.add_argument("--record", metavar="DIR", help="also write drawn frames here")
+    parser.add_argument("--record-every", type=int, default=1, help="record every Nth frame")
+    parser.add_argument("--record-format", choices=FORMATS, default="png")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
     pygame.init()
     pygame.display.set_caption("Search & Rescue MAS")
 
     screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
     clock = pygame.time.Clock()
 
-    sim = Simulation()
+    # Time is counted in simulation steps so fast-forward does not distort it
+    sim = Simulation(step_clock=True, step_seconds=1 / SIM_TICK_RATE,
+                     num_searchers=args.searchers, engine=args.engine,
+                     width=args.width, height=args.height, comms=args.comms, tiles=args.tiles)
     renderer = Renderer(screen, sim)
 
+    # Recording never holds up the window: frames are dropped if the writer falls behind
+    recorder = None
+    if args.record:
+        recorder = FrameWriter(args.record, args.record_format, block=False, fps=RENDER_FPS)
+    frame = 0
+
+    speed = 1
+    accumulator = 0.0
+    last = time.perf_counter()
+
     running = True
     while running:
         for event in pygame.event.get():
+            # Mouse and +/-/0 drive the camera
+            if renderer.camera.handle_event(event):
+                continue
+
             if event.type == pygame.QUIT:
                 running = False
 
@@ -28,15 +94,55 @@ def main():
                     sim.toggle()
                 elif event.key == pygame.K_r:
                     sim.reset()
+                elif event.key == pygame.K_h:
+                    renderer.toggle_heatmap()
+                elif event.key == pygame.K_o:
+                    toggle_obstacle(sim, renderer.camera, pygame.mouse.get_pos())
+                elif event.key == pygame.K_p:
+                    if sim.profiler is None:
+                        sim.enable_profiling()
+                    else:
+                        sim.disable_profiling()
+                elif event.key in SPEEDS:
+                    speed = SPEEDS[event.key]
+                    renderer.speed_label = speed_label(speed)
                 elif event.key in (pygame.K_ESCAPE, pygame.K_q):
                     running = False
 
-        sim.update()
-        renderer.draw()
+        now = time.perf_counter()
+        elapsed, last = now - last, now
+        deadline = now + FRAME_BUDGET
+
+        # FIXED TIMESTEP: catch up on owed steps, but never past this frame's budget
+        if speed is None:
+            while sim.running and time.perf_counter() < deadline:
+                sim.update()
+        elif sim.running:
+            accumulator += elapsed * SIM_TICK_RATE * speed
+            while accumulator >= 1:
+                sim.update()
+                accumulator -= 1
+                if time.perf_counter() >= deadline:
+                    # Can't keep up: drop the backlog instead of freezing the window
+                    accumulator = 0.0
+        else:
+            accumulator = 0.0
+
+        pygame.display.update(renderer.draw())
+        if recorder is not None and frame % max(1, args.record_every) == 0:
+            recorder.capture(screen)
+        frame += 1
+        clock.tick(RENDER_FPS)
+
+    if sim.profiler is not None and sim.profiler.steps:
+        sim.profiler.to_csv(PROFILE_EXPORT + ".csv")
+        sim.profiler.to_json(PROFILE_EXPORT + ".json")
 
-        pygame.display.flip()
-        clock.tick(FPS)
+    if recorder is not None:
+        recorder.close()
+        print(f"Recorded {recorder.written} frames to {args.record}, dropped {recorder.dropped}")
 
+    sim.close()
     pygame.quit()
     sys.exit()
 
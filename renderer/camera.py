@@ -0,0 +1,143 @@
+"""Pan/zoom camera over the grid.
+
+The camera maps world cells to screen pixels inside a fixed view rect. Zoom
+moves through ``ZOOM_LEVELS`` (pixels per cell). Levels below one pixel per
+cell show aggregated blocks of cells. The world origin sits at whole-pixel
+offsets so tiles and cells always land on exact pixels.
+"""
+import math
+
+import pygame
+
+from core.constants import CELL_SIZE
+
+ZOOM_LEVELS = (0.125, 0.25, 0.5, 1, 2, 3, 5, 8, 12, 20, 32, 50, 80)
+
+# The initial view never zooms in past this
+DEFAULT_SCALE = CELL_SIZE
+
+PAN_BUTTONS = (1, 2, 3)
+
+
+class Camera:
+    def __init__(self, view_rect):
+        self.view = pygame.Rect(view_rect)
+        self.world = None
+        self.level = ZOOM_LEVELS.index(DEFAULT_SCALE)
+        self.ox = 0
+        self.oy = 0
+        self.dragging = False
+
+    @property
+    def scale(self):
+        return ZOOM_LEVELS[self.level]
+
+    @property
+    def key(self):
+        """Changes whenever anything on screen would move."""
+        return self.level, self.ox, self.oy, self.world
+
+    # WORLD
+    def set_world(self, width, height):
+        if self.world != (width, height):
+            self.world = (width, height)
+            self.fit()
+
+    def fit(self):
+        """Largest zoom showing the whole map, capped at the default cell size."""
+        w, h = self.world
+        level = 0
+        for i, s in enumerate(ZOOM_LEVELS):
+            if s <= DEFAULT_SCALE and w * s <= self.view.width and h * s <= self.view.height:
+                level = i
+        self.level = level
+        self.ox = self.oy = 0
+        self._clamp()
+
+    # TRANSFORMS
+    def to_screen(self, x, y):
+        s = self.scale
+        return self.view.x + self.ox + math.floor(x * s), self.view.y + self.oy + math.floor(y * s)
+
+    def to_world(self, px, py):
+        s = self.scale
+        return (px - self.view.x - self.ox) / s, (py - self.view.y - self.oy) / s
+
+    def cell_rect(self, x, y, size=None):
+        px, py = self.to_screen(x, y)
+        size = size or max(1, math.ceil(self.scale))
+        return pygame.Rect(px, py, size, size)
+
+    def visible_cells(self):
+        """(x0, y0, x1, y1): half-open cell range intersecting the view."""
+        w, h = self.world
+        s = self.scale
+        x0 = max(0, math.floor(-self.ox / s))
+        y0 = max(0, math.floor(-self.oy / s))
+        x1 = min(w, math.ceil((self.view.width - self.ox) / s))
+        y1 = min(h, math.ceil((self.view.height - self.oy) / s))
+        return x0, y0, x1, y1
+
+    # MOVEMENT
+    def pan(self, dx, dy):
+        self.ox += dx
+        self.oy += dy
+        self._clamp()
+
+    def zoom(self, steps, at=None):
+        level = max(0, min(len(ZOOM_LEVELS) - 1, self.level + steps))
+        if level == self.level:
+            return
+        # Keep the world point under ``at`` where it is
+        at = at or self.view.center
+        wx, wy = self.to_world(*at)
+        self.level = level
+        s = self.scale
+        self.ox = round(at[0] - self.view.x - wx * s)
+        self.oy = round(at[1] - self.view.y - wy * s)
+        self._clamp()
+
+    def _clamp(self):
+        # Center a map smaller than the view, otherwise keep the view on the map
+        s = self.scale
+        w, h = self.world
+        self.ox = self._clamp_axis(self.ox, w * s, self.view.width)
+        self.oy = self._clamp_axis(self.oy, h * s, self.view.height)
+
+    @staticmethod
+    def _clamp_axis(offset, world_px, view_px):
+        world_px = math.ceil(world_px)
+        if world_px <= view_px:
+            return (view_px - world_px) // 2
+        return int(min(0, max(view_px - world_px, offset)))
+
+    # INPUT
+    def handle_event(self, event):
+        """Mouse wheel zooms, dragging pans, +/- zoom and 0 refits. True if used."""
+        if event.type == pygame.MOUSEWHEEL:
+            pos = pygame.mouse.get_pos()
+            if self.view.collidepoint(pos):
+                self.zoom(event.y, pos)
+                return True
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button in PAN_BUTTONS:
+            if self.view.collidepoint(event.pos):
+                self.dragging = True
+                return True
+        elif event.type == pygame.MOUSEBUTTONUP and event.button in PAN_BUTTONS:
+            was = self.dragging
+            self.dragging = False
+            return was
+        elif event.type == pygame.MOUSEMOTION and self.dragging:
+            self.pan(*event.rel)
+            return True
+        elif event.type == pygame.KEYDOWN:
+            if event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):
+                self.zoom(1)
+                return True
+            if event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                self.zoom(-1)
+                return True
+            if event.key in (pygame.K_0, pygame.K_KP0):
+                self.fit()
+                return True
+        return False
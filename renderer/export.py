@@ -0,0 +1,238 @@
+"""Offscreen rendering and frame export.
+
+    python -m renderer.export frames/ --steps 2000 --every 5
+    python -m renderer.export frames/ --trace run.trace --format raw
+
+An ordinary Renderer draws onto an offscreen surface, so no window is
+needed. ``FrameWriter`` copies each captured frame to bytes and hands it to
+background threads through a bounded queue. They write a numbered PNG
+sequence, or append to a single raw RGB24 stream with a JSON sidecar for
+ffmpeg. PNGs are compressed with zlib, which releases the GIL, so several
+encoder threads run alongside the simulation; the raw stream needs one.
+When the queue is full, ``capture`` waits for the writer, or drops the
+frame when the writer was opened with ``block=False``.
+"""
+import argparse
+import json
+import os
+import queue
+import struct
+import threading
+import zlib
+
+import numpy as np
+import pygame
+
+from agents.drone import DRONE_MODES
+from core.constants import WINDOW_WIDTH, WINDOW_HEIGHT
+from core.simulation import Simulation
+from core.trace import TraceReader, TraceReplay
+from renderer.renderer import Renderer
+
+FORMATS = ("png", "raw")
+QUEUE_SIZE = 32
+PNG_LEVEL = 3
+PNG_THREADS = min(4, os.cpu_count() or 1)
+EXPORT_FPS = 30
+
+RAW_FILE = "frames.rgb"
+RAW_META = "frames.json"
+
+
+def rgb_rows(data, width, height):
+    """(height, width * 3) RGB24 rows from captured RGBX bytes."""
+    pixels = np.frombuffer(data, dtype=np.uint8).reshape(height, width, 4)
+    return pixels[:, :, :3].reshape(height, width * 3)
+
+
+def encode_png(rows, level=PNG_LEVEL):
+    """PNG file bytes for (height, width * 3) RGB24 ``rows``."""
+    height, width = rows.shape[0], rows.shape[1] // 3
+    # Filter type 0 (none) in front of every row
+    raw = np.hstack([np.zeros((height, 1), dtype=np.uint8), rows]).tobytes()
+
+    def chunk(kind, body):
+        return (struct.pack(">I", len(body)) + kind + body
+                + struct.pack(">I", zlib.crc32(kind + body) & 0xFFFFFFFF))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(raw, level)) + chunk(b"IEND", b""))
+
+
+class FrameWriter:
+    def __init__(self, path, fmt="png", queue_size=QUEUE_SIZE, block=True, fps=EXPORT_FPS,
+                 threads=PNG_THREADS):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown frame format: {fmt!r}")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.fmt = fmt
+        self.block = block
+        self.fps = fps
+
+        self.size = None
+        self.captured = 0
+        self.written = 0
+        self.dropped = 0
+        self.error = None
+
+        self._raw = open(os.path.join(path, RAW_FILE), "wb") if fmt == "raw" else None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        # Raw frames must land in order: one writer
+        count = 1 if fmt == "raw" else max(1, threads)
+        self._threads = [threading.Thread(target=self._run, name=f"frame-writer-{i}", daemon=True)
+                         for i in range(count)]
+        for t in self._threads:
+            t.start()
+
+    # MAIN THREAD
+    def capture(self, surface):
+        """Queue a copy of ``surface``; returns False when the frame was dropped."""
+        if self.error is not None:
+            raise self.error
+        size = surface.get_size()
+        if self.size is None:
+            self.size = size
+        elif size != self.size:
+            raise ValueError(f"Frame size changed from {self.size} to {size}")
+
+        # RGBX copies about twice as fast as RGB; the writers drop the padding
+        item = (self.captured, pygame.image.tobytes(surface, "RGBX"))
+        try:
+            self._queue.put(item, block=self.block)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.captured += 1
+        return True
+
+    def close(self):
+        """Wait for queued frames to be written and finish the output."""
+        if not self._threads:
+            return
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join()
+        self._threads = []
+
+        if self._raw is not None:
+            self._raw.close()
+            width, height = self.size or (0, 0)
+            meta = {"width": width, "height": height, "pix_fmt": "rgb24", "fps": self.fps,
+                    "frames": self.written,
+                    "ffmpeg": f"ffmpeg -f rawvideo -pix_fmt rgb24 -s {width}x{height} "
+                              f"-r {self.fps} -i {RAW_FILE} -pix_fmt yuv420p frames.mp4"}
+            with open(os.path.join(self.path, RAW_META), "w") as f:
+                json.dump(meta, f, indent=2)
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # WRITER THREAD
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self.error is not None:
+                # Keep draining so a blocked capture never hangs
+                continue
+            index, data = item
+            try:
+                self._write(index, data)
+            except Exception as exc:
+                self.error = exc
+            else:
+                with self._lock:
+                    self.written += 1
+
+    def _write(self, index, data):
+        rows = rgb_rows(data, *self.size)
+        if self._raw is not None:
+            self._raw.write(rows.tobytes())
+            return
+        name = os.path.join(self.path, f"frame-{index:06d}.png")
+        tmp = name + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(encode_png(rows))
+        os.replace(tmp, name)
+
+
+# HEADLESS RUNS
+def export(source, writer, steps, every=1, heatmap=False):
+    """Draw ``source`` (a Simulation or TraceReplay) offscreen every ``every`` steps."""
+    pygame.init()
+    surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+    renderer = Renderer(surface, source)
+    renderer.speed_label = "export"
+    if heatmap:
+        renderer.toggle_heatmap()
+
+    replay = isinstance(source, TraceReplay)
+    if replay:
+        steps = min(steps, len(source.reader) - 1)
+        source.seek(0)
+    else:
+        source.start()
+
+    for step in range(steps + 1):
+        if step:
+            if replay:
+                source.seek(step)
+            else:
+                source.update()
+        last = step == steps or (not replay and source.finished)
+
+        # Drawing is incremental, so skipped steps need no draw at all
+        if step % every == 0 or last:
+            renderer.draw()
+            writer.capture(surface)
+        if last:
+            break
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render an episode offscreen to frames.")
+    parser.add_argument("out", help="output directory")
+    parser.add_argument("--format", choices=FORMATS, default="png")
+    parser.add_argument("--every", type=int, default=1, help="capture every Nth step")
+    parser.add_argument("--steps", type=int, default=5000, help="at most this many steps")
+    parser.add_argument("--fps", type=int, default=EXPORT_FPS, help="frame rate noted for raw output")
+    parser.add_argument("--queue", type=int, default=QUEUE_SIZE, help="frames buffered for the writer")
+    parser.add_argument("--heatmap", action="store_true", help="draw the coverage heatmap")
+    parser.add_argument("--trace", help="render a recorded trace instead of a new episode")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--searchers", type=int, default=None)
+    parser.add_argument("--casualties", type=int, default=None)
+    parser.add_argument("--drones", type=int, default=None)
+    parser.add_argument("--drone-mode", choices=DRONE_MODES, default=None)
+    args = parser.parse_args(argv)
+
+    # No window: pygame draws to memory only
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+    if args.trace:
+        source = TraceReplay(TraceReader(args.trace))
+    else:
+        sim_kwargs = {f"num_{name}": getattr(args, name)
+                      for name in ("searchers", "casualties", "drones")
+                      if getattr(args, name) is not None}
+        if args.drone_mode is not None:
+            sim_kwargs["drone_mode"] = args.drone_mode
+        source = Simulation(step_clock=True, seed=args.seed, **sim_kwargs)
+
+    with FrameWriter(args.out, args.format, args.queue, fps=args.fps) as writer:
+        export(source, writer, args.steps, max(1, args.every), args.heatmap)
+    print(f"Wrote {writer.written} frames to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
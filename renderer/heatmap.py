@@ -0,0 +1,137 @@
+"""Coverage heatmap overlay: shared visit counts and the drones' sensed area.
+
+The overlay is a per-pixel-alpha surface with one pixel per cell. A cell's
+colour depends only on its own visit count, looked up in a fixed table over
+log counts. Each frame recolours only the cells visited since the last frame
+and the cells entering or leaving a drone's sight. Visited cells come from
+the visit log of the VisitMap. The renderer scales the visible part and
+draws it with a single blit.
+"""
+import numpy as np
+import pygame
+
+from core.spatial import diamond
+
+# Visit count at which the colour tops out
+HEAT_SATURATION = 64
+HEAT_ALPHA_MIN = 70
+HEAT_ALPHA_MAX = 190
+
+# Colour ramp from a single visit to saturation
+HEAT_STOPS = ((0.0, (37, 99, 235)), (0.35, (34, 211, 238)), (0.7, (250, 204, 21)),
+              (1.0, (239, 68, 68)))
+
+SENSED_COLOR = (129, 140, 248)
+SENSED_ALPHA = 110
+
+# Past this share of the grid in one frame, recolour everything instead
+FULL_REBUILD_SHARE = 0.25
+
+
+def heat_table():
+    """(rgb, alpha) lookup tables indexed by min(count, HEAT_SATURATION)."""
+    counts = np.arange(HEAT_SATURATION + 1)
+    t = np.log1p(np.maximum(counts - 1, 0)) / np.log1p(HEAT_SATURATION - 1)
+    at = [p for p, _ in HEAT_STOPS]
+    rgb = np.stack([np.interp(t, at, [c[i] for _, c in HEAT_STOPS]) for i in range(3)], axis=1)
+    alpha = HEAT_ALPHA_MIN + (HEAT_ALPHA_MAX - HEAT_ALPHA_MIN) * t
+    alpha[0] = 0
+    return rgb.astype(np.uint8), alpha.astype(np.uint8)
+
+
+class Heatmap:
+    def __init__(self):
+        self.rgb, self.alpha = heat_table()
+        self.surface = None
+        self.visits = None
+        self.epoch = None
+        self.sensed = np.zeros(0, dtype=np.int64)
+
+    def detach(self):
+        # Stop the visit log so it does not grow while nobody reads it
+        if self.visits is not None:
+            self.visits.log = None
+        self.visits = None
+
+    # UPDATE
+    def update(self, sim):
+        visits = sim.shared_visit_count
+        sensed = self._sensed(sim, visits.width, visits.height)
+
+        if visits is not self.visits or visits.epoch != self.epoch or visits.log is None:
+            self._rebuild(visits, sensed)
+            return
+
+        log = visits.log
+        if len(log) + sensed.size > FULL_REBUILD_SHARE * visits.counts.size:
+            log.clear()
+            self._rebuild(visits, sensed)
+            return
+
+        changed = np.unique(np.concatenate([np.array(log, dtype=np.int64), self.sensed, sensed]))
+        log.clear()
+        if changed.size:
+            xs, ys = np.divmod(changed, visits.height)
+            self._paint(xs, ys, visits.counts[xs, ys], np.isin(changed, sensed))
+        self.sensed = sensed
+
+    def _rebuild(self, visits, sensed):
+        self.detach()
+        size = (visits.width, visits.height)
+        if self.surface is None or self.surface.get_size() != size:
+            self.surface = pygame.Surface(size, pygame.SRCALPHA)
+
+        mask = np.zeros(visits.counts.size, dtype=bool)
+        mask[sensed] = True
+        self._paint(slice(None), slice(None), visits.counts, mask.reshape(size))
+
+        self.visits = visits
+        self.epoch = visits.epoch
+        self.sensed = sensed
+        visits.log = []
+
+    def _paint(self, xs, ys, counts, sensed):
+        i = np.minimum(counts, HEAT_SATURATION)
+        rgb = self.rgb[i]
+        alpha = self.alpha[i]
+
+        # Sensed cells: tinted where visited, plain sensor colour elsewhere
+        tint = np.where(alpha[..., None] > 0, (rgb.astype(np.uint16) + SENSED_COLOR) // 2,
+                        SENSED_COLOR)
+        rgb = np.where(sensed[..., None], tint, rgb).astype(np.uint8)
+        alpha = np.where(sensed, np.maximum(alpha, SENSED_ALPHA), alpha).astype(np.uint8)
+
+        pixels = pygame.surfarray.pixels3d(self.surface)
+        pixels[xs, ys] = rgb
+        del pixels
+        pixels = pygame.surfarray.pixels_alpha(self.surface)
+        pixels[xs, ys] = alpha
+        del pixels
+
+    def _sensed(self, sim, width, height):
+        """Flat indices of the cells some drone can see now."""
+        cells = []
+        for d in sim.drones:
+            dx, dy = diamond(d.vision_radius)
+            xs, ys = d.x + dx, d.y + dy
+            inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+            cells.append(xs[inside] * height + ys[inside])
+        if not cells:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(cells))
+
+    # DRAW
+    def draw(self, screen, camera, clip):
+        """Scale the visible cells to the camera and draw them in one blit."""
+        x0, y0, x1, y1 = camera.visible_cells()
+        if x1 <= x0 or y1 <= y0:
+            return
+        s = camera.scale
+        part = self.surface.subsurface((x0, y0, x1 - x0, y1 - y0))
+        size = (max(1, round((x1 - x0) * s)), max(1, round((y1 - y0) * s)))
+        if s != 1:
+            part = pygame.transform.scale(part, size)
+
+        screen.set_clip(clip)
+        screen.blit(part, camera.to_screen(x0, y0))
+        screen.set_clip(None)
@@ -1,23 +1,14 @@
 import pygame
+import math
 import os
 from core.constants import GRID_WIDTH, GRID_HEIGHT, CELL_SIZE, SIDE_PANEL_WIDTH, WINDOW_WIDTH, WINDOW_HEIGHT
 from agents.searcher import Searcher
 from agents.casualty import Casualty
 from agents.drone import Drone
-
-# LOAD AGENT IMAGES
-
-ASSETS_PATH = "assets"
-
-DRONE_IMAGE = pygame.image.load(os.path.join(ASSETS_PATH, "drone.png"))
-DRONE_IMAGE = pygame.transform.smoothscale(DRONE_IMAGE, (CELL_SIZE, CELL_SIZE))
-
-SEARCHER_IMAGE = pygame.image.load(os.path.join(ASSETS_PATH, "rescuer.png"))
-SEARCHER_IMAGE = pygame.transform.smoothscale(SEARCHER_IMAGE, (CELL_SIZE, CELL_SIZE))
-
-CASUALTY_IMAGE = pygame.image.load(os.path.join(ASSETS_PATH, "casualty.png"))
-CASUALTY_IMAGE = pygame.transform.smoothscale(CASUALTY_IMAGE, (CELL_SIZE, CELL_SIZE))
-
+from core.swarm import MODE_NAMES
+from renderer.camera import Camera
+from renderer.heatmap import Heatmap
+from renderer.tiles import StaticTiles, cells_per_tile
 
 # COLORS 
 COLOR_BG = (10, 10, 20)
@@ -32,6 +23,51 @@ COLOR_HIGHLIGHT = (129, 140, 248)
 COLOR_BORDER = (55, 65, 81)
 
 
+# AGENT IMAGES: loaded on first use, relative to the package, and cached
+
+ASSETS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets")
+
+ASSET_FILES = {
+    "drone": "drone.png",
+    "searcher": "rescuer.png",
+    "casualty": "casualty.png",
+}
+
+# Drawn instead when an asset is missing or unreadable
+PLACEHOLDER_COLORS = {
+    "drone": COLOR_HIGHLIGHT,
+    "searcher": COLOR_SEARCHER,
+    "casualty": COLOR_CASUALTY,
+}
+
+_IMAGES = {}
+
+# Sprites are drawn from this many pixels per cell up, solid markers below
+AGENT_IMAGE_MIN_SCALE = 8
+AGENT_MIN_PX = 2
+
+# Above this many changed cells a frame repaints the whole view instead
+MAX_DIRTY_CELLS = 256
+
+# Searchers listed one per line in the panel; larger teams are summed per mode
+PANEL_SEARCHER_ROWS = 8
+
+
+def agent_image(name, size=CELL_SIZE):
+    image = _IMAGES.get((name, size))
+    if image is None:
+        try:
+            image = pygame.image.load(os.path.join(ASSETS_PATH, ASSET_FILES[name]))
+            image = pygame.transform.smoothscale(image, (size, size))
+        except (FileNotFoundError, pygame.error):
+            image = pygame.Surface((size, size), pygame.SRCALPHA)
+            pygame.draw.circle(image, PLACEHOLDER_COLORS[name], (size // 2, size // 2), size // 3)
+        if pygame.display.get_surface() is not None:
+            image = image.convert_alpha()
+        _IMAGES[(name, size)] = image
+    return image
+
+
 class Renderer:
     def __init__(self, screen: pygame.Surface, sim):
         self.screen = screen
@@ -41,100 +77,192 @@ class Renderer:
         self.font_med = pygame.font.SysFont("consolas", 20, bold=True)
         self.font_big = pygame.font.SysFont("consolas", 24, bold=True)
 
-  
-    # GRID + OBSTACLES
-  
-    def draw_grid(self):
-        for x in range(GRID_WIDTH):
-            for y in range(GRID_HEIGHT):
-                rect = pygame.Rect(
-                    x * CELL_SIZE,
-                    y * CELL_SIZE,
-                    CELL_SIZE,
-                    CELL_SIZE
-                )
-                pygame.draw.rect(self.screen, COLOR_GRID, rect, 1)
-
-    def draw_obstacles(self):
-        for (x, y) in self.sim.env.obstacles:
-            rect = pygame.Rect(
-                x * CELL_SIZE,
-                y * CELL_SIZE,
-                CELL_SIZE,
-                CELL_SIZE
-            )
-            pygame.draw.rect(self.screen, COLOR_OBSTACLE, rect)
+        # Camera over the map area, and static map tiles rebuilt when the map changes
+        self.view_rect = pygame.Rect(0, 0, GRID_WIDTH * CELL_SIZE, WINDOW_HEIGHT)
+        self.camera = Camera(self.view_rect)
+        self.tiles = None
+        self._view_key = None
 
-   
-    # DRAW AGENTS 
+        # Coverage heatmap overlay, off until toggled
+        self.heatmap = None
 
-    def draw_agents(self):
-        # Casualty image
-        cx, cy = self.sim.casualty.pos
-        self.screen.blit(CASUALTY_IMAGE, (cx * CELL_SIZE, cy * CELL_SIZE))
+        # Cell each agent was last drawn in, for dirty-rect updates
+        self._drawn = {}
 
-        # Searchers images
-        for s in self.sim.searchers:
-            sx, sy = s.pos
-            self.screen.blit(SEARCHER_IMAGE, (sx * CELL_SIZE, sy * CELL_SIZE))
+        # Fast-forward label shown in the panel, set by the main loop
+        self.speed_label = "1x"
 
-        # Drone image
-        dx, dy = self.sim.drone.pos
-        self.screen.blit(DRONE_IMAGE, (dx * CELL_SIZE, dy * CELL_SIZE))
+        # Panel: rendered text per line slot, and the last drawn line list
+        self._text_cache = {}
+        self._panel_ops = None
 
-   
-    # SIDE PANEL
-  
-    def draw_panel(self):
-        panel_rect = pygame.Rect(
+        self.panel_rect = pygame.Rect(
             GRID_WIDTH * CELL_SIZE,
             0,
             SIDE_PANEL_WIDTH,
             WINDOW_HEIGHT
         )
-        pygame.draw.rect(self.screen, COLOR_PANEL_BG, panel_rect)
-        pygame.draw.rect(self.screen, COLOR_BORDER, panel_rect, 1)
 
+  
+    # GRID + OBSTACLES
+
+    def draw_map(self, clip):
+        """Blit the static tiles covering ``clip``; outside the map stays background."""
+        cam = self.camera
+        s = cam.scale
+        c = cells_per_tile(s)
+        tile_px = c * s
+
+        self.screen.set_clip(clip)
+        self.screen.fill(COLOR_BG, clip)
+
+        # Tile range under the clip rect, limited to the map
+        wx0, wy0 = cam.to_world(clip.left, clip.top)
+        wx1, wy1 = cam.to_world(clip.right, clip.bottom)
+        w, h = cam.world
+        for tx in range(max(0, int(wx0 // c)), min(-(-w // c), int(wx1 // c) + 1)):
+            for ty in range(max(0, int(wy0 // c)), min(-(-h // c), int(wy1 // c) + 1)):
+                at = (self.view_rect.x + cam.ox + round(tx * tile_px),
+                      self.view_rect.y + cam.oy + round(ty * tile_px))
+                self.screen.blit(self.tiles.tile(s, tx, ty), at)
+        self.screen.set_clip(None)
+
+    def restore_cell(self, x, y):
+        """Repaint the map under an agent at (x, y); returns the screen rect touched."""
+        cam = self.camera
+        s = cam.scale
+        rect = self.cell_rect(x, y)
+        visible = rect.clip(self.view_rect)
+        if not (visible.width and visible.height):
+            return None
+
+        # Whole cell inside the view: one blit straight from its tile
+        if visible == rect and s >= AGENT_MIN_PX:
+            c = cells_per_tile(s)
+            tx, ty = x // c, y // c
+            area = pygame.Rect((x - tx * c) * s, (y - ty * c) * s, s, s)
+            self.screen.blit(self.tiles.tile(s, tx, ty), rect, area)
+        else:
+            self.draw_map(visible)
+        return visible
+
+    # HEATMAP OVERLAY
+    def toggle_heatmap(self):
+        if self.heatmap is None:
+            self.heatmap = Heatmap()
+        else:
+            self.heatmap.detach()
+            self.heatmap = None
+        # The overlay covers the whole view: repaint it next frame
+        self._view_key = None
+
+    def draw_heatmap(self):
+        self.heatmap.update(self.sim)
+        self.heatmap.draw(self.screen, self.camera, self.view_rect)
+
+    def static_changed(self):
+        return self.tiles is None or self.tiles.stale(self.sim.env)
+
+   
+    # DRAW AGENTS 
+
+    def agent_cells(self):
+        cells = {}
+        for c in self.sim.casualties:
+            cells[("casualty", c.id)] = c.pos
+        for s in self.sim.searchers:
+            cells[("searcher", s.id)] = s.pos
+        for d in self.sim.drones:
+            cells[("drone", d.id)] = d.pos
+        return cells
+
+    def agent_size(self):
+        return max(AGENT_MIN_PX, math.ceil(self.camera.scale))
+
+    def draw_agents(self, cells, only=None):
+        cam = self.camera
+        x0, y0, x1, y1 = cam.visible_cells()
+        scale = cam.scale
+        size = self.agent_size()
+        sx, sy = cam.to_screen(0, 0)
+        sprites = scale >= AGENT_IMAGE_MIN_SCALE
+        images = {name: agent_image(name, scale) if sprites else PLACEHOLDER_COLORS[name]
+                  for name in ASSET_FILES}
+        screen = self.screen
+        screen.set_clip(self.view_rect)
+
+        # Blit in a fixed order so overlaps look the same on partial redraws
+        for key, (x, y) in cells.items():
+            if only is not None and (x, y) not in only:
+                continue
+            if not (x0 <= x < x1 and y0 <= y < y1):
+                continue
+            at = (sx + int(x * scale), sy + int(y * scale))
+            if sprites:
+                screen.blit(images[key[0]], at)
+            else:
+                # Too small for sprites: a solid marker of at least AGENT_MIN_PX
+                screen.fill(images[key[0]], (*at, size, size))
+        screen.set_clip(None)
+
+    def cell_rect(self, x, y):
+        return self.camera.cell_rect(x, y, self.agent_size())
+
+   
+    # SIDE PANEL
+
+    def panel_ops(self):
+        """Panel content as a list of text and divider operations."""
+        ops = []
         x0 = GRID_WIDTH * CELL_SIZE + 16
         y = 16
 
-        # Title
-        title = self.font_big.render("Search & Rescue MAS", True, COLOR_TEXT)
-        self.screen.blit(title, (x0, y))
-        y += 32
+        def text(font, line, color, dy):
+            nonlocal y
+            ops.append(("text", font, line, color, (x0, y)))
+            y += dy
 
+        def divider():
+            nonlocal y
+            ops.append(("line", y))
+            y += 16
+
+        # Title
+        text(self.font_big, "Search & Rescue MAS", COLOR_TEXT, 32)
 
         # Status
         status = "RUNNING" if self.sim.running else "PAUSED"
         status_color = COLOR_HIGHLIGHT if self.sim.running else COLOR_TEXT
-        status_text = self.font_med.render(f"Status: {status}", True, status_color)
-        self.screen.blit(status_text, (x0, y))
-        y += 28
+        text(self.font_med, f"Status: {status}", status_color, 28)
 
-        
+        text(self.font_small, f"Speed: {self.speed_label}", COLOR_TEXT, 22)
 
-        self.screen.blit(self.font_small.render(f"Time: {self.sim.elapsed_time:.1f}s", True, COLOR_TEXT), (x0, y))
-        y += 22
+        scale = self.camera.scale
+        zoom = f"{scale}px/cell" if scale >= 1 else f"1px/{round(1 / scale)}x{round(1 / scale)} cells"
+        text(self.font_small, f"Zoom: {zoom}", COLOR_TEXT, 22)
+
+        text(self.font_small, f"Time: {self.sim.elapsed_time:.1f}s", COLOR_TEXT, 22)
+
+        # Several casualties: progress over all of them
+        casualties = self.sim.casualties
+        if len(casualties) > 1:
+            found = sum(c.found for c in casualties)
+            rescued = sum(c.rescued for c in casualties)
+            line = f"Casualties: found {found}/{len(casualties)}, reached {rescued}/{len(casualties)}"
+            text(self.font_small, line, COLOR_HIGHLIGHT if found else COLOR_TEXT, 22)
 
         # Found info
         if self.sim.time_to_find is not None:
-            self.screen.blit(self.font_small.render(
-                f"Casualty found by: {self.sim.found_by}", True, COLOR_HIGHLIGHT), (x0, y))
-            y += 22
-
-            self.screen.blit(self.font_small.render(
-                f"in {self.sim.time_to_find:.1f}s", True, COLOR_HIGHLIGHT), (x0, y))
-            y += 26
+            text(self.font_small, f"Casualty found by: {self.sim.found_by}", COLOR_HIGHLIGHT, 22)
+            text(self.font_small, f"in {self.sim.time_to_find:.1f}s", COLOR_HIGHLIGHT, 26)
 
             # Arrival times per searcher
             arrivals = [s for s in self.sim.searchers if s.arrival_time is not None]
             if arrivals:
                 arrivals.sort(key=lambda a: a.arrival_time)
-                self.screen.blit(self.font_small.render(
-                    "Arrival times:", True, COLOR_HIGHLIGHT), (x0, y))
-                y += 22
+                text(self.font_small, "Arrival times:", COLOR_HIGHLIGHT, 22)
 
-                for i, s in enumerate(arrivals, start=1):
+                for i, s in enumerate(arrivals[:PANEL_SEARCHER_ROWS], start=1):
                     if i == 1:
                         suffix = "st"
                     elif i == 2:
@@ -144,70 +272,213 @@ class Renderer:
                     else:
                         suffix = "th"
 
-                    line = f"{i}{suffix}: S{s.id} at {s.arrival_time:.1f}s"
-                    self.screen.blit(self.font_small.render(line, True, COLOR_TEXT), (x0, y))
-                    y += 20
+                    text(self.font_small, f"{i}{suffix}: S{s.id} at {s.arrival_time:.1f}s", COLOR_TEXT, 20)
+                if len(arrivals) > PANEL_SEARCHER_ROWS:
+                    more = len(arrivals) - PANEL_SEARCHER_ROWS
+                    text(self.font_small, f"... {more} more", COLOR_TEXT, 20)
 
                 if self.sim.all_rescued_time is not None:
                     msg = f"All rescuers reached casualty at {self.sim.all_rescued_time:.1f}s"
-                    self.screen.blit(self.font_small.render(msg, True, COLOR_HIGHLIGHT), (x0, y))
-                    y += 24
+                    text(self.font_small, msg, COLOR_HIGHLIGHT, 24)
 
         else:
-            self.screen.blit(self.font_small.render("Casualty not yet found", True, COLOR_TEXT), (x0, y))
-            y += 26
+            text(self.font_small, "Casualty not yet found", COLOR_TEXT, 26)
 
-        # Divider
-        pygame.draw.line(self.screen, COLOR_BORDER,
-                         (GRID_WIDTH * CELL_SIZE + 12, y),
-                         (WINDOW_WIDTH - 16, y), 1)
-        y += 16
+        divider()
 
         # Searcher list
-        header = self.font_med.render("Searchers", True, COLOR_TEXT)
-        self.screen.blit(header, (x0, y))
-        y += 28
+        text(self.font_med, "Searchers", COLOR_TEXT, 28)
 
-        for s in self.sim.searchers:
-            self.screen.blit(self.font_small.render(
-                f"S{s.id}: mode={s.mode}, steps={s.steps_taken}", True, COLOR_TEXT), (x0, y))
-            y += 20
+        searchers = self.sim.searchers
+        if len(searchers) <= PANEL_SEARCHER_ROWS:
+            for s in searchers:
+                text(self.font_small, f"S{s.id}: mode={s.mode}, steps={s.steps_taken}", COLOR_TEXT, 20)
+        else:
+            # Too many to list: one line per mode, so the panel keeps its height
+            for mode, (count, steps) in self.searcher_modes().items():
+                text(self.font_small, f"{mode}: {count}, steps={steps}", COLOR_TEXT, 20)
 
         # Drone info
         y += 6
-        self.screen.blit(self.font_small.render(
-            f"Drone: steps={self.sim.drone.steps_taken}",
-            True,
-            COLOR_HIGHLIGHT
-        ), (x0, y))
-        y += 26
-
-        # Divider
-        pygame.draw.line(self.screen, COLOR_BORDER,
-                         (GRID_WIDTH * CELL_SIZE + 12, y),
-                         (WINDOW_WIDTH - 16, y), 1)
-        y += 16
+        drones = self.sim.drones
+        if len(drones) == 1:
+            text(self.font_small, f"Drone: steps={drones[0].steps_taken}", COLOR_HIGHLIGHT, 26)
+        elif drones:
+            steps = sum(d.steps_taken for d in drones)
+            text(self.font_small, f"Drones: {len(drones)}, steps={steps}", COLOR_HIGHLIGHT, 26)
+
+        # Run metrics, read from the counters the agents keep up to date
+        metrics = getattr(self.sim, "metrics", None)
+        if metrics is not None:
+            m = metrics.current(len(self.sim.env.free_cells))
+            line = f"Coverage: {100 * m['coverage']:.1f}%, redundant {100 * m['redundancy']:.0f}%"
+            text(self.font_small, line, COLOR_TEXT, 20)
+            if m["overlap"] == m["overlap"]:
+                line = (f"Overlap: {100 * m['overlap']:.0f}%,"
+                        f" revisits/searcher {m['revisits_per_searcher']:.1f}")
+                text(self.font_small, line, COLOR_TEXT, 20)
+            if drones:
+                text(self.font_small, f"Sensed by drones: {100 * m['sensed']:.1f}%", COLOR_TEXT, 20)
+
+        # Message bus totals when agents run as actors
+        runtime = getattr(self.sim, "runtime", None)
+        if runtime is not None:
+            stats = runtime.bus.stats()
+            line = (f"Msgs: sent {stats['sent']}, delivered {stats['delivered']},"
+                    f" lat {stats['mean_latency_ticks']:.1f} ticks")
+            text(self.font_small, line, COLOR_TEXT, 20)
+
+        divider()
+
+        # Profiling summary over the rolling window
+        profiler = getattr(self.sim, "profiler", None)
+        if profiler is not None:
+            summary = profiler.summary()
+            text(self.font_med, f"Profile (last {summary['steps']})", COLOR_TEXT, 26)
+
+            total = sum(summary["phases"].values()) or 1.0
+            for phase, seconds in summary["phases"].items():
+                line = f"{phase:<16} {seconds * 1000:6.3f}ms {100 * seconds / total:3.0f}%"
+                text(self.font_small, line, COLOR_TEXT, 20)
+            for counter, per_step in summary["counters"].items():
+                text(self.font_small, f"{counter}/step: {per_step:.1f}", COLOR_TEXT, 20)
+
+            y += 6
+            divider()
 
         # Controls
-        ctrl = self.font_med.render("Controls", True, COLOR_TEXT)
-        self.screen.blit(ctrl, (x0, y))
-        y += 26
+        text(self.font_med, "Controls", COLOR_TEXT, 26)
 
         controls_list = [
             "SPACE - Start/Pause",
             "R     - Reset",
+            "1-4   - Speed 1x/10x/100x/max",
+            "P     - Profiling on/off",
+            "Wheel/+/- - Zoom, drag - Pan",
+            "0     - Fit map",
+            "H     - Heatmap on/off",
+            "O     - Obstacle under mouse",
             "ESC/Q - Quit"
         ]
 
         for line in controls_list:
-            self.screen.blit(self.font_small.render(line, True, COLOR_TEXT), (x0, y))
-            y += 20
+            text(self.font_small, line, COLOR_TEXT, 20)
+
+        return ops
+
+    def searcher_modes(self):
+        """{mode: (searchers, total steps)} over the whole team."""
+        swarm = getattr(self.sim, "swarm", None)
+        if swarm is not None:
+            # Read the engine's arrays rather than one view per searcher
+            modes = {}
+            for i, mode in enumerate(MODE_NAMES):
+                members = swarm.mode == i
+                modes[mode] = (int(members.sum()), int(swarm.steps[members].sum()))
+            return modes
+        modes = {}
+        for s in self.sim.searchers:
+            count, steps = modes.get(s.mode, (0, 0))
+            modes[s.mode] = (count + 1, steps + s.steps_taken)
+        return modes
+
+    def render_text(self, slot, font, line, color):
+        # Re-render a panel line only when its text or colour changed
+        cached = self._text_cache.get(slot)
+        if cached is None or cached[0] != (font, line, color):
+            cached = ((font, line, color), font.render(line, True, color))
+            self._text_cache[slot] = cached
+        return cached[1]
+
+    def draw_panel(self, ops=None):
+        ops = self.panel_ops() if ops is None else ops
+
+        pygame.draw.rect(self.screen, COLOR_PANEL_BG, self.panel_rect)
+        pygame.draw.rect(self.screen, COLOR_BORDER, self.panel_rect, 1)
+
+        for slot, op in enumerate(ops):
+            if op[0] == "line":
+                y = op[1]
+                pygame.draw.line(self.screen, COLOR_BORDER,
+                                 (GRID_WIDTH * CELL_SIZE + 12, y),
+                                 (WINDOW_WIDTH - 16, y), 1)
+            else:
+                _, font, line, color, at = op
+                self.screen.blit(self.render_text(slot, font, line, color), at)
 
     
+    def redraw_moved(self, cells, changed=()):
+        """Restore the map under moved agents and ``changed`` cells; returns rects."""
+        dirty_cells = set(changed)
+        for key, pos in cells.items():
+            old = self._drawn.get(key)
+            if old != pos:
+                dirty_cells.add(pos)
+                if old is not None:
+                    dirty_cells.add(old)
+        for key, old in self._drawn.items():
+            if key not in cells:
+                dirty_cells.add(old)
+
+        if len(dirty_cells) > MAX_DIRTY_CELLS:
+            # Cheaper to repaint the visible map once than cell by cell
+            self.draw_map(self.view_rect)
+            self.draw_agents(cells)
+            return [self.view_rect]
+
+        rects = []
+        for (x, y) in dirty_cells:
+            rect = self.restore_cell(x, y)
+            if rect is not None:
+                rects.append(rect)
+        self.draw_agents(cells, only=dirty_cells)
+        return rects
+
     # MASTER DRAW FUNCTION
     def draw(self):
-        self.screen.fill(COLOR_BG)
-        self.draw_grid()
-        self.draw_obstacles()
-        self.draw_agents()
-        self.draw_panel()
+        """Draw a frame and return the list of screen rects that changed."""
+        cells = self.agent_cells()
+        ops = self.panel_ops()
+
+        # Full redraw when the view or the whole map changed
+        env = self.sim.env
+        cam = self.camera
+        cam.set_world(env.width, env.height)
+        changed = ()
+        if self.static_changed():
+            # Obstacle edits repaint only their cells
+            changed = None if self.tiles is None else self.tiles.sync(env)
+            if changed is None:
+                self.tiles = StaticTiles(env, (COLOR_BG, COLOR_GRID, COLOR_OBSTACLE))
+                self._view_key = None
+
+        if cam.key != self._view_key:
+            self.screen.fill(COLOR_BG)
+            self.draw_map(self.view_rect)
+            if self.heatmap is not None:
+                self.draw_heatmap()
+            self.draw_agents(cells)
+            self.draw_panel(ops)
+            self._drawn = cells
+            self._panel_ops = ops
+            self._view_key = cam.key
+            return [self.screen.get_rect()]
+
+        rects = []
+        if self.heatmap is not None:
+            # Overlay on: map, one overlay blit and agents over the whole view
+            self.draw_map(self.view_rect)
+            self.draw_heatmap()
+            self.draw_agents(cells)
+            rects.append(self.view_rect)
+        else:
+            rects.extend(self.redraw_moved(cells, changed))
+        self._drawn = cells
+
+        # Panel: only when a line changed
+        if ops != self._panel_ops:
+            self.draw_panel(ops)
+            self._panel_ops = ops
+            rects.append(self.panel_rect)
+
+        return rects
@@ -0,0 +1,70 @@
+"""Replay a recorded trace in the pygame window.
+
+    python -m renderer.replay run.trace
+
+SPACE plays/pauses, LEFT/RIGHT step by one, DOWN/UP jump by 100,
+HOME/END go to the first/last step, H toggles the coverage heatmap. The
+mouse wheel and +/- zoom, dragging pans and 0 fits the map to the window.
+"""
+import sys
+
+import pygame
+
+from core.constants import WINDOW_WIDTH, WINDOW_HEIGHT
+from core.trace import TraceReader, TraceReplay
+from renderer.renderer import Renderer
+
+REPLAY_FPS = 30
+
+JUMPS = {
+    pygame.K_LEFT: -1,
+    pygame.K_RIGHT: 1,
+    pygame.K_DOWN: -100,
+    pygame.K_UP: 100,
+}
+
+
+def main(path):
+    pygame.init()
+    pygame.display.set_caption(f"Search & Rescue MAS - replay {path}")
+
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    clock = pygame.time.Clock()
+
+    replay = TraceReplay(TraceReader(path))
+    renderer = Renderer(screen, replay)
+    renderer.speed_label = "replay"
+
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if renderer.camera.handle_event(event):
+                continue
+
+            if event.type == pygame.QUIT:
+                running = False
+
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    replay.toggle()
+                elif event.key in JUMPS:
+                    replay.seek(replay.index + JUMPS[event.key])
+                elif event.key == pygame.K_h:
+                    renderer.toggle_heatmap()
+                elif event.key == pygame.K_HOME:
+                    replay.seek(0)
+                elif event.key == pygame.K_END:
+                    replay.seek(len(replay.reader) - 1)
+                elif event.key in (pygame.K_ESCAPE, pygame.K_q):
+                    running = False
+
+        replay.update()
+        pygame.display.update(renderer.draw())
+        clock.tick(REPLAY_FPS)
+
+    pygame.quit()
+    sys.exit()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1])
@@ -0,0 +1,102 @@
+"""Pre-rendered static map tiles (background, grid lines, obstacles).
+
+Tiles are about ``TILE_PX`` pixels square and cover ``cells_per_tile(scale)``
+cells a side. They are built on demand from ``env.blocked`` with NumPy and
+kept in an LRU cache keyed by (scale, tile x, tile y), so drawing a frame
+touches only the tiles in view. Below one pixel per cell, each pixel is a
+block of cells shaded by how much of it is obstacle. When obstacles change,
+only the cached tiles covering the changed cells are dropped.
+"""
+import math
+
+import numpy as np
+import pygame
+
+TILE_PX = 256
+TILE_CACHE_SIZE = 512
+
+# Cell outlines are only drawn from this many pixels per cell up
+GRID_LINES_MIN_SCALE = 8
+
+
+def cells_per_tile(scale):
+    if scale >= 1:
+        return max(1, TILE_PX // scale)
+    return round(TILE_PX / scale)
+
+
+class StaticTiles:
+    def __init__(self, env, colors):
+        self.env = env
+        self.version = env.version
+        self.bg, self.grid, self.obstacle = (np.array(c, dtype=np.float32) for c in colors)
+        self._tiles = {}
+
+    def stale(self, env):
+        return env is not self.env or env.version != self.version
+
+    def sync(self, env):
+        """Drop tiles touched by obstacle changes; returns the changed (x, y) cells.
+
+        Returns None when the changes are no longer known and the tiles must
+        be rebuilt.
+        """
+        changes = env.changes_since(self.version) if env is self.env else None
+        if changes is None:
+            return None
+        xs, ys = changes
+        for scale in {key[0] for key in self._tiles}:
+            c = cells_per_tile(scale)
+            for tx, ty in set(zip((xs // c).tolist(), (ys // c).tolist())):
+                self._tiles.pop((scale, tx, ty), None)
+        self.version = env.version
+        return set(zip(xs.tolist(), ys.tolist()))
+
+    def tile(self, scale, tx, ty):
+        key = (scale, tx, ty)
+        surface = self._tiles.pop(key, None)
+        if surface is None:
+            surface = self._build(scale, tx, ty)
+            if len(self._tiles) >= TILE_CACHE_SIZE:
+                # Least recently used first: dicts keep insertion order
+                del self._tiles[next(iter(self._tiles))]
+        self._tiles[key] = surface
+        return surface
+
+    def _build(self, scale, tx, ty):
+        c = cells_per_tile(scale)
+        x0, y0 = tx * c, ty * c
+        blocked = self.env.blocked[x0:x0 + c, y0:y0 + c]
+
+        if scale >= 1:
+            pixels = self._cells(blocked, scale)
+        else:
+            pixels = self._aggregated(blocked, round(1 / scale))
+
+        surface = pygame.surfarray.make_surface(pixels)
+        return surface.convert() if pygame.display.get_surface() else surface
+
+    def _cells(self, blocked, s):
+        # One s x s square per cell, outlined like pygame.draw.rect(..., 1)
+        pixels = np.where(blocked[:, :, None], self.obstacle, self.bg).astype(np.uint8)
+        pixels = np.repeat(np.repeat(pixels, s, axis=0), s, axis=1)
+        if s >= GRID_LINES_MIN_SCALE:
+            ex = np.arange(pixels.shape[0]) % s
+            ey = np.arange(pixels.shape[1]) % s
+            edge = ((ex == 0) | (ex == s - 1))[:, None] | ((ey == 0) | (ey == s - 1))[None, :]
+            free = ~np.repeat(np.repeat(blocked, s, axis=0), s, axis=1)
+            pixels[edge & free] = self.grid
+        return pixels
+
+    def _aggregated(self, blocked, k):
+        # One pixel per k x k block, shaded by its obstacle fraction
+        w, h = blocked.shape
+        pw, ph = math.ceil(w / k), math.ceil(h / k)
+        padded = np.zeros((pw * k, ph * k), dtype=np.float32)
+        inside = np.zeros_like(padded)
+        padded[:w, :h] = blocked
+        inside[:w, :h] = 1
+        full = padded.reshape(pw, k, ph, k).sum(axis=(1, 3))
+        cells = inside.reshape(pw, k, ph, k).sum(axis=(1, 3))
+        density = (full / np.maximum(cells, 1))[:, :, None]
+        return (self.bg + (self.obstacle - self.bg) * density).astype(np.uint8)